@@ -0,0 +1,293 @@
+"""ASGI entry point: serve CodeDonki from an event loop (uvicorn).
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The Gemini-bound endpoints (/api/hint, /api/dialogue, /api/ai-suggestion) and
+the live event stream (/api/events/stream) run as native async handlers, so a
+request waiting on the model or on the next event holds no thread. They reuse
+the prompt plans from routes/ai.py and await the provider from llm.py. Every other
+route goes to the Flask app through uvicorn's WSGI bridge, which runs it on a
+pool of ASGI_WSGI_THREADS threads.
+"""
+import asyncio
+import json
+import os
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import jwt
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import CORS_ORIGINS, create_app
+from events import bus as event_bus, format_sse
+from hint_cache import cache as hint_cache
+from hint_rules import classifier as hint_classifier
+from metrics import metrics
+from rate_limit import limiter, retry_after_header
+from routes.ai import hint_cache_key, llm, plan_ai_suggestion, plan_dialogue, plan_hint
+from routes.progress import SSE_HEARTBEAT_SECONDS
+
+MAX_BODY_BYTES = 64 * 1024
+
+flask_app = create_app()
+wsgi_bridge = WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_WSGI_THREADS", "16")))
+
+
+async def run_ai_request_async(plan):
+    """Async twin of routes.ai.run_ai_request: any failure returns the fallback payload."""
+    if not plan.contents:
+        return plan.fallback
+    try:
+        text = await llm.agenerate(plan.endpoint, plan.model, plan.contents)
+        return plan.finish(text) if text else plan.fallback
+    except Exception as e:
+        print(f"❌ AI {plan.endpoint} error: {e}")
+        return plan.fallback
+
+
+# --- Request helpers ---
+def header(scope, name):
+    name = name.lower().encode()
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def cors_headers(scope):
+    """Mirror flask-cors for the native routes: echo allowed origins, with credentials."""
+    origin = header(scope, 'origin')
+    if origin not in CORS_ORIGINS:
+        return []
+    return [(b'access-control-allow-origin', origin.encode()),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin')]
+
+
+def token_identity(token):
+    try:
+        return jwt.decode(token, flask_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+
+
+def bearer_identity(scope):
+    parts = (header(scope, 'authorization') or '').split()
+    if len(parts) != 2 or parts[0].lower() != 'bearer':
+        return None
+    return token_identity(parts[1])
+
+
+def session_user_id(scope):
+    """user_id from Flask's signed session cookie, if present and valid."""
+    cookie_header = header(scope, 'cookie')
+    if not cookie_header:
+        return None
+    morsel = SimpleCookie(cookie_header).get(flask_app.config["SESSION_COOKIE_NAME"])
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if morsel is None or serializer is None:
+        return None
+    try:
+        data = serializer.loads(morsel.value,
+                                max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return None
+    return (data.get('user') or {}).get('user_id')
+
+
+async def read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            return None
+        if not message.get('more_body'):
+            break
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def send_json(scope, send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + cors_headers(scope) + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def request_client(scope, identity=None):
+    """Same rate limit client key as rate_limit.request_client in the Flask routes."""
+    identity = identity or bearer_identity(scope)
+    user_id = identity.get('user_id') if identity else session_user_id(scope)
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{(scope.get('client') or ('unknown',))[0]}"
+
+
+async def throttled(scope, send, endpoint, identity=None):
+    """Send a 429 and return True if the client is over the 'ai' limit for `endpoint`.
+    The sqlite backend takes a write lock (and may wait on it), so the check runs off the event loop."""
+    wait = await asyncio.to_thread(limiter.check, 'ai', endpoint, request_client(scope, identity))
+    if not wait:
+        return False
+    await send_json(scope, send, {"error": "Too many requests, please slow down",
+                                  "retry_after": int(retry_after_header(wait))}, 429,
+                    [(b'retry-after', retry_after_header(wait).encode())])
+    return True
+
+
+# --- Native async routes ---
+async def hint(scope, receive, send):
+    if await throttled(scope, send, 'ai.ai_hint'):
+        return
+    data = await read_json(receive)
+    if data is None:
+        return await send_json(scope, send, {"error": "Request body too large"}, 413)
+    key = hint_cache_key(data)
+    diagnosis = hint_classifier.diagnose(*key)
+    if diagnosis:
+        return await send_json(scope, send, {"hint": diagnosis.hint})
+    # The hint cache reads and writes the shared SQLite store and periodically rewrites its JSON
+    # file, so it is used from a thread rather than on the event loop
+    payload = await asyncio.to_thread(hint_cache.get, *key) if llm.available else None
+    if not payload:
+        plan = plan_hint(data)
+        payload = await run_ai_request_async(plan)
+        if payload is not plan.fallback:
+            await asyncio.to_thread(hint_cache.put, *key, payload["hint"])
+    return await send_json(scope, send, payload)
+
+
+async def dialogue(scope, receive, send):
+    if await throttled(scope, send, 'ai.ai_dialogue'):
+        return
+    data = await read_json(receive)
+    if data is None:
+        return await send_json(scope, send, {"error": "Request body too large"}, 413)
+    return await send_json(scope, send, await run_ai_request_async(plan_dialogue(data)))
+
+
+async def ai_suggestion(scope, receive, send):
+    identity = bearer_identity(scope)
+    if not identity:
+        return await send_json(scope, send, {"error": "Invalid or missing token"}, 401)
+    if await throttled(scope, send, 'ai.get_ai_suggestion', identity):
+        return
+    data = await read_json(receive)
+    if data is None:
+        return await send_json(scope, send, {"error": "Request body too large"}, 413)
+    lesson_title = data.get('title')
+    if not lesson_title:
+        return await send_json(scope, send, {"error": "Missing lesson title"}, 400)
+    plan = plan_ai_suggestion(lesson_title)
+    return await send_json(scope, send, await run_ai_request_async(plan))
+
+
+async def event_stream(scope, receive, send):
+    """Async twin of routes.progress.event_stream: waits on the bus without holding a thread."""
+    token = parse_qs(scope['query_string'].decode()).get('token', [None])[0]
+    user_id = session_user_id(scope)
+    if token:
+        identity = token_identity(token)
+        if not identity:
+            return await send_json(scope, send, {"error": "Invalid token"}, 401)
+        user_id = identity.get('user_id')
+    if not user_id:
+        return await send_json(scope, send, {"error": "Login required"}, 401)
+
+    subscriber = event_bus.subscribe(user_id)
+    if subscriber is None:
+        return await send_json(scope, send, {"error": "Too many live connections, fall back to polling"}, 503)
+
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass  # loop already closed (server shutting down)
+
+    subscriber.on_put = wake
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b'content-type', b'text/event-stream; charset=utf-8'),
+                        (b'cache-control', b'no-cache'),
+                        (b'x-accel-buffering', b'no')] + cors_headers(scope),
+        })
+        await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+        while True:
+            woken = asyncio.ensure_future(wakeup.wait())
+            done, _ = await asyncio.wait({woken, disconnected}, timeout=SSE_HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if woken not in done:
+                woken.cancel()
+            if disconnected in done:
+                break
+            if not done:
+                await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                continue
+            wakeup.clear()
+            chunk = ''.join(format_sse(event) for event in subscriber.get(0))
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    finally:
+        disconnected.cancel()
+        event_bus.unsubscribe(subscriber)
+
+
+ASYNC_ROUTES = {
+    ('POST', '/api/hint'): hint,
+    ('POST', '/api/dialogue'): dialogue,
+    ('POST', '/api/ai-suggestion'): ai_suggestion,
+    ('GET', '/api/events/stream'): event_stream,
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({"type": "lifespan.startup.complete"})
+        elif message['type'] == 'lifespan.shutdown':
+            await llm.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    handler = ASYNC_ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if handler is None:
+        return await wsgi_bridge(scope, receive, send)
+
+    status = {}
+
+    async def send_tracking_status(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        await send(message)
+
+    start = time.perf_counter()
+    try:
+        await handler(scope, receive, send_tracking_status)
+    finally:
+        metrics.observe_request(scope['method'], scope['path'], status.get('code', 500),
+                                time.perf_counter() - start, 0, 0.0)
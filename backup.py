@@ -0,0 +1,390 @@
+"""Online backup and restore of codedonki.db.
+
+Backups are taken with the sqlite3 backup API `pages_per_step` pages at a time,
+sleeping `step_sleep_ms` between steps, so the app keeps serving while a large
+database is copied:
+
+- WAL databases are copied inside one read transaction: the copy is a
+  consistent snapshot, and the app's writes go on into the WAL meanwhile.
+- Rollback-journal databases (the default) hold their read lock only during a
+  step, so writes go through between steps. SQLite restarts the copy when one
+  does; after `max_restarts` restarts the rest is copied in a single read
+  transaction without sleeping, which makes writes wait until it is done but
+  always finishes.
+
+Each copy is checked with PRAGMA integrity_check, gzip-compressed into the
+backup directory as <database>-<UTC time>.db.gz next to a .json manifest (size,
+SHA-256 of the database file, timings), and all but the newest `keep` backups
+are removed. verify_backup() decompresses a backup and checks both again.
+restore_backup() verifies it, saves the current database as a pre-restore
+backup, and copies the backup into the live file with the backup API, so open
+connections see either the old database or the new one. It then expires the
+analytics snapshot and the shared cache, whose contents came from the old data.
+
+    python backup.py backup [--pages-per-step 1024] [--step-sleep-ms 10] [--keep 7]
+    python backup.py list
+    python backup.py verify [BACKUP]
+    python backup.py restore BACKUP
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_BYTES = 1024 * 1024
+# How long a step waits before retrying when the app holds the write lock (sqlite3's default: 250 ms)
+BUSY_RETRY_SECONDS = 0.005
+
+
+class BackupError(Exception):
+    """A backup failed its integrity or checksum verification."""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path():
+    return os.getenv("DATABASE_PATH", "codedonki.db")
+
+
+def _uri(path, mode):
+    return f"{pathlib.Path(path).resolve().as_uri()}?mode={mode}"
+
+
+def _prefix(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def list_backups(directory, db_path=None):
+    """Manifests of the backups in `directory` (of `db_path` only, if given), newest first."""
+    if not os.path.isdir(directory):
+        return []
+    prefix = f"{_prefix(db_path)}-" if db_path else ''
+    found = []
+    for filename in os.listdir(directory):
+        # <prefix>-<YYYYmmdd>-...: codedonki-archive-* backups are not codedonki.db's
+        if filename.endswith('.db.gz') and (not db_path or (filename.startswith(prefix)
+                                                            and filename[len(prefix):][:8].isdigit())):
+            path = os.path.join(directory, filename)
+            manifest = read_manifest(path)
+            if manifest:
+                found.append(dict(manifest, path=path))
+    # Names don't sort by age ("-1" and "-pre-restore" come after "."), so go by the manifest's time,
+    # and by the file's mtime within the same second
+    found.sort(key=lambda m: (m.get('created_at') or '', _mtime(m['path'])), reverse=True)
+    return found
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def read_manifest(path):
+    try:
+        with open(f"{path[:-len('.db.gz')]}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _copy(db_path, target_path, pages_per_step, step_sleep_ms, max_restarts):
+    """Copy db_path into target_path with the backup API. Returns (restarts, mode)."""
+    source = sqlite3.connect(_uri(db_path, 'ro'), uri=True, isolation_level=None, timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+        restarts = 0
+        last = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last
+            # A step that copied pages without getting closer to the end: another connection wrote
+            # to the source, and SQLite started over (status 0 is SQLITE_OK; BUSY steps copy nothing)
+            if status == 0 and last is not None and remaining >= last:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _TooManyRestarts()
+            last = remaining
+            if step_sleep_ms:
+                time.sleep(step_sleep_ms / 1000)
+
+        if wal:
+            _in_read_transaction(source, lambda: source.backup(target, pages=pages_per_step, progress=progress,
+                                                               sleep=BUSY_RETRY_SECONDS))
+            mode = 'wal-snapshot'
+        else:
+            try:
+                source.backup(target, pages=pages_per_step, progress=progress, sleep=BUSY_RETRY_SECONDS)
+                mode = 'stepped'
+            except _TooManyRestarts:
+                _in_read_transaction(source, lambda: source.backup(target, pages=-1))
+                mode = 'stepped-then-locked'
+        # A self-contained file: no -wal/-shm next to the copy or wherever it is restored
+        target.execute("PRAGMA journal_mode = DELETE")
+        return restarts, mode
+    finally:
+        target.close()
+        source.close()
+
+
+def _in_read_transaction(conn, func):
+    conn.execute("BEGIN")
+    try:
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        return func()
+    finally:
+        conn.execute("COMMIT")
+
+
+def check_integrity(path, quick=False):
+    """PRAGMA integrity_check (or quick_check) of a database file: 'ok' or the first problems found."""
+    conn = sqlite3.connect(_uri(path, 'ro'), uri=True)
+    try:
+        rows = conn.execute(f"PRAGMA {'quick_check' if quick else 'integrity_check'}(20)").fetchall()
+    finally:
+        conn.close()
+    return '; '.join(row[0] for row in rows)
+
+
+def _compress(source_path, target_path, level):
+    """gzip source_path into target_path. Returns the SHA-256 of the uncompressed bytes."""
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as src, gzip.open(target_path, 'wb', compresslevel=level) as dst:
+        while True:
+            chunk = src.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+def _decompress(source_path, target_path):
+    """gunzip source_path into target_path. Returns the SHA-256 of the uncompressed bytes."""
+    digest = hashlib.sha256()
+    with gzip.open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        while True:
+            chunk = src.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def rotate(directory, db_path, keep):
+    """Delete all but the newest `keep` backups of db_path. Returns the removed paths."""
+    removed = []
+    for manifest in list_backups(directory, db_path)[keep:]:
+        path = manifest['path']
+        _remove(path, f"{path[:-len('.db.gz')]}.json")
+        removed.append(path)
+    return removed
+
+
+def backup_database(db_path, directory, keep=7, pages_per_step=1024, step_sleep_ms=10, max_restarts=20,
+                    compress_level=1, quick_check=False, label=None):
+    """Take a verified, compressed backup of db_path into `directory`. Returns its manifest."""
+    os.makedirs(directory, exist_ok=True)
+    created = datetime.datetime.now(datetime.timezone.utc)
+    name = f"{_prefix(db_path)}-{created.strftime('%Y%m%d-%H%M%S')}{f'-{label}' if label else ''}"
+    while os.path.exists(os.path.join(directory, f"{name}.db.gz")):
+        name += '-1'
+    path = os.path.join(directory, f"{name}.db.gz")
+    partial = os.path.join(directory, f".{name}.db.partial")
+
+    try:
+        started = time.perf_counter()
+        restarts, mode = _copy(db_path, partial, pages_per_step, step_sleep_ms, max_restarts)
+        copied = time.perf_counter()
+        integrity = check_integrity(partial, quick=quick_check)
+        if integrity != 'ok':
+            raise BackupError(f"integrity check of the copy failed: {integrity}")
+        checked = time.perf_counter()
+        conn = sqlite3.connect(_uri(partial, 'ro'), uri=True)
+        page_size, page_count = (conn.execute(f"PRAGMA {p}").fetchone()[0] for p in ('page_size', 'page_count'))
+        conn.close()
+        sha256 = _compress(partial, f"{path}.partial", compress_level)
+        os.replace(f"{path}.partial", path)
+        compressed = time.perf_counter()
+        manifest = {
+            "file": os.path.basename(path),
+            "database": os.path.abspath(db_path),
+            "created_at": created.isoformat(timespec='seconds'),
+            "label": label,
+            "bytes": os.path.getsize(partial),
+            "compressed_bytes": os.path.getsize(path),
+            "sha256": sha256,
+            "page_size": page_size,
+            "pages": page_count,
+            "integrity": integrity,
+            "mode": mode,
+            "restarts": restarts,
+            "pages_per_step": pages_per_step,
+            "step_sleep_ms": step_sleep_ms,
+            "copy_seconds": round(copied - started, 3),
+            "check_seconds": round(checked - copied, 3),
+            "compress_seconds": round(compressed - checked, 3),
+        }
+        with open(os.path.join(directory, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    finally:
+        _remove(partial, f"{path}.partial")
+    rotate(directory, db_path, keep)
+    return dict(manifest, path=path)
+
+
+def verify_backup(path, quick_check=False, keep_as=None):
+    """Decompress a backup and check its SHA-256 and integrity. Returns its manifest.
+
+    The decompressed database is written to `keep_as` and left there, or to a temporary file
+    next to the backup that is removed afterwards."""
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise BackupError(f"{path} has no readable manifest")
+    target = keep_as or f"{path[:-len('.db.gz')]}.verify.db"
+    try:
+        try:
+            sha256 = _decompress(path, target)
+        except (OSError, EOFError) as e:
+            raise BackupError(f"cannot decompress {path}: {e}") from e
+        if sha256 != manifest['sha256']:
+            raise BackupError(f"checksum mismatch: {sha256} != {manifest['sha256']}")
+        integrity = check_integrity(target, quick=quick_check)
+        if integrity != 'ok':
+            raise BackupError(f"integrity check failed: {integrity}")
+    except Exception:
+        _remove(target)
+        raise
+    if not keep_as:
+        _remove(target)
+    return dict(manifest, path=path)
+
+
+def restore_backup(path, db_path, directory=None, quick_check=False):
+    """Verify a backup and copy it into db_path, saving the current database first when
+    `directory` is given. Returns the manifest of that pre-restore backup (or None)."""
+    restored = f"{db_path}.restore"
+    verify_backup(path, quick_check=quick_check, keep_as=restored)
+    try:
+        saved = None
+        if directory and os.path.exists(db_path):
+            # Rotation must not delete backups here; the next regular backup rotates
+            saved = backup_database(db_path, directory, keep=len(list_backups(directory, db_path)) + 1,
+                                    step_sleep_ms=0, quick_check=True, label='pre-restore')
+        source = sqlite3.connect(_uri(restored, 'ro'), uri=True)
+        # Writes wait for this one step; readers see the old or the new database, never a mix
+        target = sqlite3.connect(db_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        _remove(restored)
+    _expire_derived_data(db_path)
+    return saved
+
+
+def _expire_derived_data(db_path):
+    """Drop what the running app built from the data that was just replaced."""
+    from db_router import router as db_router
+    from shared_cache import cache as shared_cache
+
+    db_router.expire(db_path)
+    cache_path = os.getenv("SHARED_CACHE_PATH")
+    if cache_path:
+        # A process-local cache (no SHARED_CACHE_PATH) lives until its TTLs or a restart
+        shared_cache.configure(path=cache_path)
+        shared_cache.invalidate(*shared_cache.policies)
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backup and restore of the SQLite database")
+    parser.add_argument('--db', default=database_path())
+    parser.add_argument('--dir', default=os.getenv("BACKUP_DIR", "backups"), help="backup directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    take = sub.add_parser('backup', help="take a backup while the app runs")
+    take.add_argument('--keep', type=int, default=int(os.getenv("BACKUP_KEEP", "7")))
+    take.add_argument('--pages-per-step', type=int, default=int(os.getenv("BACKUP_PAGES_PER_STEP", "1024")))
+    take.add_argument('--step-sleep-ms', type=float, default=float(os.getenv("BACKUP_STEP_SLEEP_MS", "10")))
+    take.add_argument('--max-restarts', type=int, default=int(os.getenv("BACKUP_MAX_RESTARTS", "20")))
+    take.add_argument('--compress-level', type=int, default=int(os.getenv("BACKUP_COMPRESS_LEVEL", "1")))
+    take.add_argument('--quick-check', action='store_true', help="PRAGMA quick_check instead of integrity_check")
+
+    sub.add_parser('list', help="list backups, newest first")
+
+    check = sub.add_parser('verify', help="check a backup's checksum and integrity (default: the newest)")
+    check.add_argument('backup', nargs='?')
+    check.add_argument('--quick-check', action='store_true')
+
+    put = sub.add_parser('restore', help="restore a backup into the database")
+    put.add_argument('backup')
+    put.add_argument('--no-pre-restore-backup', action='store_true',
+                     help="do not back up the current database first")
+    put.add_argument('--quick-check', action='store_true')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'backup':
+            m = backup_database(args.db, args.dir, keep=args.keep, pages_per_step=args.pages_per_step,
+                                step_sleep_ms=args.step_sleep_ms, max_restarts=args.max_restarts,
+                                compress_level=args.compress_level, quick_check=args.quick_check)
+            print(f"[SUCCESS] {m['path']}: {_mb(m['bytes'])} -> {_mb(m['compressed_bytes'])}, "
+                  f"copy {m['copy_seconds']}s ({m['mode']}, {m['restarts']} restarts), "
+                  f"check {m['check_seconds']}s, compress {m['compress_seconds']}s")
+        elif args.command == 'list':
+            for m in list_backups(args.dir, args.db):
+                print(f"{m['file']:<48} {m['created_at']}  {_mb(m['bytes']):>10}  {_mb(m['compressed_bytes']):>10}"
+                      f"  {m['integrity']}")
+        elif args.command == 'verify':
+            path = args.backup
+            if not path:
+                backups = list_backups(args.dir, args.db)
+                if not backups:
+                    print(f"❌ No backups of {args.db} in {args.dir}")
+                    return 1
+                path = backups[0]['path']
+            verify_backup(path, quick_check=args.quick_check)
+            print(f"[SUCCESS] {path}: checksum and integrity ok")
+        elif args.command == 'restore':
+            saved = restore_backup(args.backup, args.db, quick_check=args.quick_check,
+                                   directory=None if args.no_pre_restore_backup else args.dir)
+            if saved:
+                print(f"[INFO] Saved the previous database as {saved['path']}")
+            print(f"[SUCCESS] Restored {args.db} from {args.backup}")
+    except (BackupError, sqlite3.Error, OSError) as e:
+        print(f"❌ {args.command} failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
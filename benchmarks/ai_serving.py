@@ -0,0 +1,199 @@
+"""Benchmark the Gemini-bound endpoints: threaded WSGI vs ASGI serving.
+
+Starts benchmarks/stub_model_server.py as a fake Gemini with a fixed reply
+latency, then serves the app in each mode against it and fires many
+concurrent /api/hint requests:
+
+- threaded: the Flask app on a WSGI server with a fixed pool of --threads
+  worker threads (like one gunicorn gthread worker)
+- asgi:     asgi.application under uvicorn; hints run on the event loop
+
+Each mode runs in its own process. Reports throughput, p50/p95/p99 latency and
+how many replies came from the (stub) model rather than the fallback text.
+
+Usage:
+    python benchmarks/ai_serving.py --concurrency 200 --requests 2000 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import percentile  # noqa: E402
+
+HINT_BODY = {"code": "print(hello)", "topic": "print", "challenge": 1, "student_name": "Bench"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited early with status {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def serve_threaded(port, threads):
+    """Serve the Flask app from a WSGI server with a bounded worker thread pool."""
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    pool = ThreadPoolExecutor(max_workers=threads)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        request_queue_size = 4096
+
+        def process_request(self, request, client_address):
+            pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer('127.0.0.1', port, create_app()).serve_forever()
+
+
+async def fire(base_url, total, concurrency):
+    import aiohttp
+
+    latencies, statuses, model_replies = [], {}, 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as client:
+        async def one():
+            nonlocal model_replies
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with client.post(base_url + '/api/hint', json=HINT_BODY) as resp:
+                        status = resp.status
+                        if status == 200 and (await resp.json()).get('hint', '').startswith('Stub'):
+                            model_replies += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    status = 'error'
+                latencies.append(time.perf_counter() - start)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "statuses": statuses,
+        "model_replies": model_replies,
+    }
+
+
+def run_mode(mode, args, stub_port, workdir):
+    port = free_port()
+    env = dict(os.environ,
+               GEMINI_API_KEY='stub',
+               GEMINI_API_ENDPOINT=f'http://127.0.0.1:{stub_port}',
+               DATABASE_PATH=os.path.join(workdir, 'ai_serving.db'),
+               JWT_SECRET_KEY='bench-jwt-secret',
+               HINT_RULES_ENABLED='0',      # every request identical: measure the model path
+               HINT_CACHE_MAX_ENTRIES='0',
+               HINT_CACHE_PATH='',
+               RATE_LIMIT_ENABLED='0',
+               ASGI_AI_MAX_CONCURRENCY=str(args.ai_concurrency))
+    if mode == 'threaded':
+        cmd = [sys.executable, os.path.abspath(__file__), '--serve-threaded', str(port),
+               '--threads', str(args.threads)]
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--backlog', '4096']
+    server = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, server)
+        asyncio.run(fire(f'http://127.0.0.1:{port}', min(args.concurrency, args.requests),
+                         args.concurrency))  # warm-up
+        return asyncio.run(fire(f'http://127.0.0.1:{port}', args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threaded vs ASGI serving for /api/hint")
+    parser.add_argument('--mode', choices=('both', 'threaded', 'asgi'), default='both')
+    parser.add_argument('--concurrency', type=int, default=200, help="in-flight client requests")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.5, help="stub model reply delay (s)")
+    parser.add_argument('--threads', type=int, default=16, help="worker threads in threaded mode")
+    parser.add_argument('--ai-concurrency', type=int, default=256,
+                        help="ASGI_AI_MAX_CONCURRENCY for asgi mode")
+    parser.add_argument('--output', help="write the results JSON here")
+    parser.add_argument('--serve-threaded', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_threaded:
+        serve_threaded(args.serve_threaded, args.threads)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix='codedonki-ai-')
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'stub_model_server.py'),
+                             '--port', str(stub_port), '--latency', str(args.latency)], cwd=ROOT)
+    results = {"config": {"concurrency": args.concurrency, "requests": args.requests,
+                          "stub_latency": args.latency, "threads": args.threads}}
+    try:
+        wait_for_port(stub_port, stub)
+        modes = ('threaded', 'asgi') if args.mode == 'both' else (args.mode,)
+        for mode in modes:
+            print(f"[INFO] {mode}: {args.requests} hints, {args.concurrency} in flight, "
+                  f"stub latency {args.latency}s")
+            results[mode] = run_mode(mode, args, stub_port, workdir)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    print(f"\n{'mode':<10} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'model':>7}  statuses")
+    for mode in ('threaded', 'asgi'):
+        if mode in results:
+            r = results[mode]
+            print(f"{mode:<10} {r['throughput_rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+                  f"{r['p99_ms']:>9} {r['model_replies']:>7}  {r['statuses']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Benchmark quiz submissions while admins run the analytics queries.
+
+Serves the app from two processes on local ports, as two workers would (see
+load_test.start_server), and runs two kinds of threads for --duration seconds:
+
+- students: log in to the first, then POST /api/quiz/submit in a loop
+- admins:   GET /api/admin/users and /api/admin/dashboard/analytics from the
+            second, in a loop
+
+Separate processes share the database file and its locks but not the GIL. The
+run is repeated three ways: with no admins (the baseline), with analytics read
+from codedonki.db (read-only connections, the snapshot off), and with analytics
+read from the snapshot (db_router.py), whose table scans hold no lock on the
+primary. Reports submit latency (p99 and max) and errors (a submit that waited
+past SQLite's busy timeout fails with "database is locked"), analytics latency,
+the oldest X-Data-Age seen, and the snapshot refreshes taken during the run.
+
+The database is first put in --journal mode. The default, delete, is the
+rollback journal the app's schema uses; there a reader's lock blocks commits,
+which is what the snapshot and its stepped copy must avoid; under steady submits
+the copy keeps restarting and ends with one locked copy per refresh. seed_db.py leaves
+its databases in WAL. --snapshot-max-age is short by default so the snapshot is
+refreshed several times while students submit.
+
+Usage:
+    python benchmarks/seed_db.py --db bench.db --users 20000
+    python benchmarks/analytics_isolation.py --db bench.db --students 8 --admins 2 --duration 15 [--journal wal]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import load_answer_key, percentile, start_server  # noqa: E402
+from seed_db import BENCH_PASSWORD, bench_email, seed  # noqa: E402
+
+ANALYTICS = ('/api/admin/users', '/api/admin/dashboard/analytics')
+
+
+class Samples:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {'submit': [], 'analytics': []}
+        self.errors = {'submit': 0, 'analytics': 0}
+        self.max_age = 0
+
+    def record(self, name, seconds, ok, age=0):
+        with self._lock:
+            self.values[name].append(seconds)
+            self.errors[name] += 0 if ok else 1
+            self.max_age = max(self.max_age, age)
+
+    def summary(self, elapsed):
+        out = {}
+        for name, values in self.values.items():
+            ordered = sorted(values)
+            out[name] = {"requests": len(values), "errors": self.errors[name],
+                         "per_second": round(len(values) / elapsed, 1),
+                         "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+                         "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+                         "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+                         "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0}
+        out["max_data_age_s"] = self.max_age
+        return out
+
+
+def run_student(base_url, samples, answer_key, student_count, deadline, rng):
+    import requests
+
+    session = requests.Session()
+    resp = session.post(base_url + '/api/login', timeout=30,
+                        json={"email": bench_email(rng.randint(1, student_count)), "password": BENCH_PASSWORD})
+    headers = {"Authorization": f"Bearer {resp.json()['token']}"}
+    lessons = list(answer_key)
+    while time.perf_counter() < deadline:
+        lesson_id = rng.choice(lessons)
+        answers = {qid: (correct if rng.random() < 0.5 else rng.choice('ABCD'))
+                   for qid, correct in answer_key[lesson_id].items()}
+        start = time.perf_counter()
+        try:
+            resp = session.post(base_url + '/api/quiz/submit', headers=headers, timeout=30,
+                                json={"lesson_id": lesson_id, "answers": answers, "time_taken": 60})
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        samples.record('submit', time.perf_counter() - start, ok)
+
+
+def run_admin(base_url, samples, token, deadline, rng):
+    import requests
+
+    session = requests.Session()
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            resp = session.get(base_url + rng.choice(ANALYTICS), headers=headers, timeout=60)
+            ok = resp.status_code < 400
+            age = int(resp.headers.get('X-Data-Age', 0))
+        except requests.RequestException:
+            ok, age = False, 0
+        samples.record('analytics', time.perf_counter() - start, ok, age)
+
+
+def serve_analytics(db_path, snapshot, max_age, ready, stop):
+    """Child process: the worker the admins' requests go to."""
+    os.environ["ANALYTICS_SNAPSHOT_ENABLED"] = "1" if snapshot else "0"
+    os.environ["ANALYTICS_SNAPSHOT_MAX_AGE"] = str(max_age)
+    os.environ["SHARED_CACHE_ENABLED"] = "0"
+    server, base_url = start_server(db_path)
+    if snapshot:
+        from db_router import router
+        router.refresh(db_path)
+    ready.put(base_url)
+    stop.wait()
+    server.shutdown()
+
+
+def snapshot_refreshes(analytics_url, admin_token):
+    """(refreshes, refresh errors, the last refresh) of the analytics worker's snapshot."""
+    import requests
+
+    routing = requests.get(analytics_url + '/api/admin/metrics', timeout=30,
+                           headers={"Authorization": f"Bearer {admin_token}"}).json()['db_routing']
+    return routing['refreshes'], routing['refresh_errors'], routing['last_refresh']
+
+
+def set_journal_mode(db_path, mode):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"PRAGMA journal_mode = {mode}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run(student_url, analytics_url, args, admins, answer_key, student_count, admin_token):
+    samples = Samples()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=run_student, args=(student_url, samples, answer_key, student_count,
+                                                          deadline, random.Random(i)))
+               for i in range(args.students)]
+    threads += [threading.Thread(target=run_admin, args=(analytics_url, samples, admin_token, deadline,
+                                                         random.Random(1000 + i)))
+                for i in range(admins)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples.summary(time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quiz submissions under concurrent admin analytics")
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help="(re)seed the database with this many users before running")
+    parser.add_argument('--students', type=int, default=8)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=15.0, help="seconds per run")
+    parser.add_argument('--snapshot-max-age', type=int, default=5)
+    parser.add_argument('--journal', choices=('delete', 'wal'), default='delete', help="delete is the app's default")
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    if args.seed_users or not os.path.exists(db_path):
+        seed(db_path, users=args.seed_users or 20_000)
+    print(f"[INFO] journal_mode={set_journal_mode(db_path, args.journal)}, "
+          f"{os.path.getsize(db_path) / 2**20:.0f} MB")
+    answer_key, student_count = load_answer_key(db_path)
+    if not student_count:
+        print(f"[ERROR] {db_path} has no synthetic students; run benchmarks/seed_db.py first")
+        return 2
+
+    # Every analytics request should reach the database, not the response cache
+    os.environ["SHARED_CACHE_ENABLED"] = "0"
+    server, student_url = start_server(db_path)
+    import jwt
+
+    admin_token = jwt.encode({'user_id': 1, 'role': 'admin'}, os.environ["JWT_SECRET_KEY"], algorithm="HS256")
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in ('no admins', 'primary', 'snapshot'):
+        ready, stop = ctx.Queue(), ctx.Event()
+        worker = ctx.Process(target=serve_analytics, daemon=True,
+                             args=(db_path, mode == 'snapshot', args.snapshot_max_age, ready, stop))
+        worker.start()
+        analytics_url = ready.get(timeout=60)
+        admins = 0 if mode == 'no admins' else args.admins
+        print(f"[INFO] {mode}: {args.students} students submitting, {admins} admins on analytics, "
+              f"{args.duration}s")
+        results[mode] = run(student_url, analytics_url, args, admins, answer_key, student_count, admin_token)
+        if mode == 'snapshot':
+            refreshes, errors, last = snapshot_refreshes(analytics_url, admin_token)
+            results[mode]['snapshot_refreshes'] = {"refreshes": refreshes, "errors": errors, "last": last}
+            print(f"[INFO] snapshot: {refreshes} refreshes ({errors} failed), last took "
+                  + (f"{last['seconds']}s, {last['mode']} with {last['restarts']} restarts" if last else '-'))
+        stop.set()
+        worker.join(timeout=30)
+    server.shutdown()
+
+    print(f"\n{'analytics from':<15} {'submits/s':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'analytics/s':>11} {'p50 ms':>8} {'max age s':>9}")
+    for mode, r in results.items():
+        s, a = r['submit'], r['analytics']
+        print(f"{mode:<15} {s['per_second']:>9} {s['errors']:>7} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+              f"{s['p99_ms']:>8} {s['max_ms']:>8} {a['per_second']:>11} {a['p50_ms']:>8} {r['max_data_age_s']:>9}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
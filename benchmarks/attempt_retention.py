@@ -0,0 +1,185 @@
+"""Benchmark quiz attempt retention: archive time, write stalls, bytes reclaimed, query speed.
+
+Copies a seeded database (see seed_db.py --attempts-per-user) to a temporary
+directory and runs retention.apply_retention() on the copy with VACUUM, while
+a writer thread inserts one quiz attempt every --write-interval-ms like
+submit_quiz does. Reports:
+
+- rows archived, batches and rows/s; the slowest insert while batches ran
+- VACUUM time, bytes reclaimed, and the slowest insert during VACUUM
+- database and archive sizes
+- before and after: the admin activity query (a user's last 20 attempts) and
+  a full scan of user_quiz_attempts (attempts per lesson)
+
+Usage:
+    python benchmarks/seed_db.py --db retention_bench.db --users 20000 --questions-per-lesson 10 \\
+        --attempts-per-user 50
+    python benchmarks/attempt_retention.py --db retention_bench.db --days 90
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_db import seed  # noqa: E402
+
+ACTIVITY = """
+    SELECT l.title, uqa.score, uqa.passed, uqa.attempted_at
+    FROM user_quiz_attempts uqa JOIN lessons l ON l.id = uqa.lesson_id
+    WHERE uqa.user_id = ? ORDER BY uqa.attempted_at DESC LIMIT 20
+"""
+SCAN = "SELECT lesson_id, COUNT(*), AVG(score) FROM user_quiz_attempts GROUP BY lesson_id"
+
+
+def query_ms(db_path, runs):
+    """(median activity query ms over random users, median full scan ms)."""
+    conn = sqlite3.connect(db_path)
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    rng = random.Random(7)
+    activity = []
+    for _ in range(runs * 20):
+        start = time.perf_counter()
+        conn.execute(ACTIVITY, (rng.choice(user_ids),)).fetchall()
+        activity.append((time.perf_counter() - start) * 1000)
+    scan = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(SCAN).fetchall()
+        scan.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return statistics.median(activity), statistics.median(scan)
+
+
+class Writer(threading.Thread):
+    """Inserts one attempt every interval and records how long each insert took, by phase."""
+
+    def __init__(self, db_path, interval_ms):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.interval = interval_ms / 1000
+        self.phase = 'archive'
+        self.stop = threading.Event()
+        self.waits = {'archive': [], 'vacuum': []}
+        self.inserts = []  # (start, end) perf_counter of every insert
+        self.errors = 0
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        user_id, lesson_id = conn.execute(
+            "SELECT user_id, lesson_id FROM user_quiz_attempts ORDER BY id DESC LIMIT 1").fetchone()
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO user_quiz_attempts (user_id, lesson_id, quiz_questions, user_answers, score,
+                                                    passed, xp_awarded)
+                    VALUES (?, ?, '[]', '{}', 80, 1, 40)
+                    """, (user_id, lesson_id)
+                )
+                conn.commit()
+            except sqlite3.Error:
+                self.errors += 1
+            end = time.perf_counter()
+            self.waits[self.phase].append((end - start) * 1000)
+            self.inserts.append((start, end))
+            time.sleep(self.interval)
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark quiz attempt retention and VACUUM")
+    parser.add_argument('--db', default='retention_bench.db')
+    parser.add_argument('--users', type=int, default=20_000, help="when seeding a missing --db")
+    parser.add_argument('--attempts-per-user', type=int, default=50, help="when seeding a missing --db")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--pause-ms', type=float, default=50)
+    parser.add_argument('--write-interval-ms', type=float, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    source = os.path.abspath(args.db)
+    if not os.path.exists(source):
+        seed(source, users=args.users, questions_per_lesson=10, attempts_per_user=args.attempts_per_user)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(source))
+    db_path = os.path.join(tmp, 'retention.db')
+    shutil.copyfile(source, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = DELETE")  # the app's default
+    rows = conn.execute("SELECT COUNT(*) FROM user_quiz_attempts").fetchone()[0]
+    conn.close()
+
+    from retention import apply_retention, vacuum
+
+    activity_before, scan_before = query_ms(db_path, args.runs)
+    print(f"[INFO] {rows} attempts, {os.path.getsize(db_path) / 2**20:.0f} MB; archiving those older than "
+          f"{args.days} days")
+    writer = Writer(db_path, args.write_interval_ms)
+    writer.start()
+
+    def log(message):
+        if writer.phase == 'archive' and 'attempts archived' in message:
+            print(message)
+
+    report = apply_retention(db_path, days=args.days, batch_size=args.batch_size, pause_ms=args.pause_ms,
+                             run_vacuum=False, log=log)
+    writer.phase = 'vacuum'
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    vacuum_started = time.perf_counter()
+    free, reclaimed = vacuum(conn, db_path)
+    vacuum_seconds = time.perf_counter() - vacuum_started
+    conn.close()
+    writer.stop.set()
+    writer.join()
+    activity_after, scan_after = query_ms(db_path, args.runs)
+
+    result = {
+        "attempts": rows, "archived": report['rows'], "batches": report['batches'],
+        "archive_seconds": report['seconds'], "rows_per_second": round(report['rows'] / report['seconds']),
+        "summaries": report['summaries'],
+        "max_insert_ms_archiving": round(max(writer.waits['archive'], default=0), 1),
+        "p99_insert_ms_archiving": round(sorted(writer.waits['archive'])[int(len(writer.waits['archive']) * 0.99)]
+                                         if writer.waits['archive'] else 0, 1),
+        "vacuum_seconds": round(vacuum_seconds, 2), "free_bytes": free, "reclaimed_bytes": reclaimed,
+        "max_insert_ms_vacuum": round(max(writer.waits['vacuum'], default=0), 1),
+        "insert_errors": writer.errors,
+        "db_bytes_before": report['bytes_before'], "db_bytes_after": os.path.getsize(db_path),
+        "archive_bytes": os.path.getsize(report['archive']),
+        "activity_ms": [round(activity_before, 3), round(activity_after, 3)],
+        "scan_ms": [round(scan_before, 1), round(scan_after, 1)],
+    }
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    mb = 2 ** 20
+    print(f"\narchived {result['archived']} of {rows} attempts in {result['archive_seconds']}s "
+          f"({result['rows_per_second']} rows/s, {result['batches']} batches), {result['summaries']} summary rows")
+    print(f"insert while archiving: p99 {result['p99_insert_ms_archiving']} ms, "
+          f"max {result['max_insert_ms_archiving']} ms")
+    print(f"VACUUM {result['vacuum_seconds']}s, reclaimed {reclaimed / mb:.0f} MB "
+          f"(max insert wait {result['max_insert_ms_vacuum']} ms); {result['insert_errors']} insert errors")
+    print(f"database {result['db_bytes_before'] / mb:.0f} MB -> {result['db_bytes_after'] / mb:.0f} MB, "
+          f"archive {result['archive_bytes'] / mb:.0f} MB")
+    print(f"activity query {activity_before:.3f} -> {activity_after:.3f} ms, "
+          f"full scan {scan_before:.0f} -> {scan_after:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "result": result}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Benchmark response compression on the heavy responses.
+
+Seeds a database and requests each response through the Flask test client three
+ways: identity, gzip and brotli (when the `brotli` package is installed). It
+reports wire bytes, the time of the first compressed request, and the time of a
+repeat request, which reuses the compressed variant cached by compression.py.
+
+- admin users:   GET /api/admin/users
+- quiz bank:     GET /api/admin/quiz (the full legacy listing)
+- lesson status: GET /api/lessons/all-status
+- lesson page:   a lesson HTML file from uploads/ (the repo's python_if_traffic.html)
+
+Usage:
+    python benchmarks/compression.py --users 5000 --questions-per-lesson 10 --runs 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from seed_db import seed  # noqa: E402
+
+LESSON_PAGE = 'python_if_traffic.html'
+
+
+def timed_get(client, url, headers, runs):
+    """(wire bytes, first request ms, median repeat ms)."""
+    times = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        times.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} -> {response.status_code}")
+    return len(body), times[0], statistics.median(times[1:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark gzip/brotli response compression")
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--lessons-per-category', type=int, default=50)
+    parser.add_argument('--questions-per-lesson', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmp.name, 'compression.db')
+    summary = seed(db_path, users=args.users, categories=args.categories,
+                   lessons_per_category=args.lessons_per_category,
+                   questions_per_lesson=args.questions_per_lesson, quiet=True)
+    print(f"[INFO] Seeded {summary['users']} users and {summary['questions']} questions")
+
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["HINT_CACHE_PATH"] = ""
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    # Measure compression, not the response cache in front of it
+    os.environ["SHARED_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import jwt
+    from app import create_app
+    from compression import brotli_module, compressor
+
+    flask_app = create_app({"UPLOAD_FOLDER": tmp.name})
+    shutil.copy(os.path.join(ROOT, LESSON_PAGE), os.path.join(tmp.name, LESSON_PAGE))
+    client = flask_app.test_client()
+    token = jwt.encode({'user_id': 1, 'role': 'admin'}, flask_app.config["JWT_SECRET_KEY"], algorithm="HS256")
+    auth = {"Authorization": f"Bearer {token}"}
+
+    responses = [
+        ('admin users', '/api/admin/users'),
+        ('quiz bank', '/api/admin/quiz'),
+        ('lesson status', '/api/lessons/all-status'),
+        ('lesson page', f'/uploads/{LESSON_PAGE}'),
+    ]
+    encodings = ['identity', 'gzip'] + (['br'] if brotli_module() else [])
+    if not brotli_module():
+        print("[INFO] brotli is not installed; measuring gzip only")
+
+    results = {}
+    print(f"\n{'response':<14} {'encoding':<9} {'bytes':>10} {'ratio':>7} {'first ms':>9} {'repeat ms':>10}")
+    for name, url in responses:
+        results[name] = {}
+        for encoding in encodings:
+            compressor.configure(min_bytes=compressor.min_bytes, gzip_level=compressor.gzip_level,
+                                 brotli_quality=compressor.brotli_quality, cache_bytes=compressor.cache_bytes)
+            size, first_ms, repeat_ms = timed_get(client, url, dict(auth, **{"Accept-Encoding": encoding}), args.runs)
+            identity = results[name].get('identity', {}).get('bytes', size)
+            results[name][encoding] = {"bytes": size, "ratio": round(size / identity, 4),
+                                       "first_ms": round(first_ms, 2), "repeat_ms": round(repeat_ms, 2)}
+            print(f"{name:<14} {encoding:<9} {size:>10} {size / identity:>7.3f} {first_ms:>9.2f} {repeat_ms:>10.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"runs": args.runs, "responses": results}, f, indent=2)
+    tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
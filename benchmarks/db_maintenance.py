@@ -0,0 +1,176 @@
+"""Benchmark the database maintenance tasks: time, write stalls, pages returned and plan changes.
+
+Copies a seeded database (see seed_db.py --attempts-per-user) to a temporary
+directory and prepares the copy the way production finds it: rollback journal
+(or WAL with --journal wal), no planner statistics (the app never ran ANALYZE), and --delete-users users
+deleted the way the admin delete_user route does, which leaves free pages.
+With --legacy the copy is first rebuilt with auto_vacuum=NONE, as databases
+created before maintenance.py were, and the incremental_vacuum run is passed
+convert_auto_vacuum, so it has to convert it.
+
+Then each maintenance task runs on its own (maintenance.run_maintenance) while
+a writer thread inserts one quiz attempt every --write-interval-ms like
+submit_quiz does. Reports per task: status, seconds, p99 and max insert wait,
+and what it did; then the probe queries from the migrations, timed before and
+after, with the plans ANALYZE changed.
+
+Usage:
+    python benchmarks/seed_db.py --db maintenance_bench.db --users 20000 --questions-per-lesson 10 \\
+        --attempts-per-user 50
+    python benchmarks/db_maintenance.py --db maintenance_bench.db [--legacy] [--journal wal]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from attempt_retention import Writer  # noqa: E402
+from seed_db import seed  # noqa: E402
+
+
+def probe_ms(db_path, probes, runs):
+    """{probe: median ms over `runs` runs} on a connection that has already loaded the schema."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    timings = {}
+    for sql in probes:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[sql] = statistics.median(samples)
+    conn.close()
+    return timings
+
+
+def delete_users(db_path, count):
+    """Delete `count` users and their rows like routes/admin.delete_user. Returns attempts deleted."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id DESC LIMIT ?", (count,))]
+    attempts = 0
+    for user_id in user_ids:
+        attempts += conn.execute("DELETE FROM user_quiz_attempts WHERE user_id = ?", (user_id,)).rowcount
+        for table in ('quiz_attempt_summaries', 'user_badges', 'lesson_progress'):
+            conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+    conn.close()
+    return attempts
+
+
+def _p99(values):
+    return sorted(values)[int(len(values) * 0.99)] if values else 0
+
+
+def _summary(task):
+    d = task['detail']
+    if task['task'] == 'analyze':
+        return f"{d.get('indexes', '-')} indexes, {len(d.get('stats_changed', []))} stats changed"
+    if task['status'] == 'over_budget' and 'reason' in d:
+        return f"stopped at the {d['budget_seconds']}s budget, {d['reason']}"
+    if task['task'] == 'incremental_vacuum' and 'free_pages_before' in d:
+        freed = d['free_pages_before'] - d.get('free_pages_after', d['free_pages_before'])
+        mb = (d['bytes_before'] - d.get('bytes_after', d['bytes_before'])) / 2**20
+        how = 'VACUUM to incremental' if d.get('converted') else f"{d.get('steps', 0)} steps"
+        return f"{freed} of {d['free_pages_before']} free pages, {mb:.0f} MB returned ({how})"
+    if task['task'] == 'integrity_check':
+        return f"{d.get('check')}: {d.get('result')}"
+    if task['task'] == 'wal_checkpoint' and 'databases' in d:
+        return '; '.join(f"{db['wal_bytes_before'] / 2**20:.1f} MB WAL -> {db['wal_bytes_after'] / 2**20:.1f} MB"
+                         f"{' (busy)' if db['busy'] else ''}" for db in d['databases'])
+    return d.get('reason') or json.dumps(d)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the database maintenance tasks")
+    parser.add_argument('--db', default='maintenance_bench.db')
+    parser.add_argument('--users', type=int, default=20_000, help="when seeding a missing --db")
+    parser.add_argument('--attempts-per-user', type=int, default=50, help="when seeding a missing --db")
+    parser.add_argument('--legacy', action='store_true', help="rebuild the copy with auto_vacuum=NONE first")
+    parser.add_argument('--journal', choices=('delete', 'wal'), default='delete', help="delete is the app's default")
+    parser.add_argument('--delete-users', type=int, default=2000)
+    parser.add_argument('--budget-seconds', type=float, default=30)
+    parser.add_argument('--analysis-limit', type=int, default=1000)
+    parser.add_argument('--integrity', choices=('quick', 'full'), default='quick')
+    parser.add_argument('--write-interval-ms', type=float, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    source = os.path.abspath(args.db)
+    if not os.path.exists(source):
+        seed(source, users=args.users, questions_per_lesson=10, attempts_per_user=args.attempts_per_user)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(source))
+    db_path = os.path.join(tmp, 'maintenance.db')
+    shutil.copyfile(source, db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    if args.legacy:
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+    conn.execute(f"PRAGMA journal_mode = {args.journal}")
+    conn.close()
+
+    from maintenance import TASKS, run_maintenance
+    from schema_migrations import declared_probes
+
+    deleted = delete_users(db_path, args.delete_users)
+    size = os.path.getsize(db_path)
+    print(f"[INFO] {size / 2**20:.0f} MB after deleting {args.delete_users} users ({deleted} attempts); "
+          f"{'auto_vacuum=NONE' if args.legacy else 'auto_vacuum=INCREMENTAL'}, journal_mode={args.journal}")
+    probes = declared_probes()
+    before = probe_ms(db_path, probes, args.runs)
+
+    writer = Writer(db_path, args.write_interval_ms)
+    writer.start()
+    time.sleep(0.5)
+    tasks, planner_changes = [], {}
+    for task in TASKS:
+        started = time.perf_counter()
+        run = run_maintenance(db_path, tasks=[task], budget_seconds=args.budget_seconds,
+                              analysis_limit=args.analysis_limit, convert_auto_vacuum=args.legacy,
+                              integrity=args.integrity, wal_paths=[], log=lambda message: None)
+        tasks.append(dict(run['tasks'][0], interval=(started, time.perf_counter())))
+        planner_changes.update(run['planner_changes'])
+    writer.stop.set()
+    writer.join()
+    for t in tasks:
+        # Every insert that overlapped the task, including one that started just before it and waited it out
+        start, end = t.pop('interval')
+        waits = [(e - s) * 1000 for s, e in writer.inserts if s < end and e > start]
+        t.update(p99_insert_ms=round(_p99(waits), 1), max_insert_ms=round(max(waits, default=0), 1))
+    after = probe_ms(db_path, probes, args.runs)
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'task':<19} {'status':<11} {'seconds':>8} {'p99 ms':>7} {'max ms':>7}  result")
+    for t in tasks:
+        print(f"{t['task']:<19} {t['status']:<11} {t['seconds']:>8.2f} {t['p99_insert_ms']:>7} "
+              f"{t['max_insert_ms']:>7}  {_summary(t)}")
+    print(f"{writer.errors} insert errors\n\nprobe queries (median ms before -> after ANALYZE):")
+    for sql in probes:
+        mark = '  plan changed' if sql in planner_changes else ''
+        print(f"  {before[sql]:>8.3f} -> {after[sql]:>8.3f}  {sql[:90]}{mark}")
+    for sql, change in planner_changes.items():
+        print(f"\n{sql}\n  before: {change['before']}\n  after:  {change['after']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"db_bytes": size, "config": vars(args), "tasks": tasks, "planner_changes": planner_changes,
+                       "probe_ms": {sql: [before[sql], after[sql]] for sql in probes}}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
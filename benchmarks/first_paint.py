@@ -0,0 +1,122 @@
+"""Benchmark first paint of the learner pages: inlined bootstrap state vs. API calls.
+
+Seeds a database, logs a student's session in, and for each learner page times
+through the Flask test client:
+
+- bootstrap: GET the page, which inlines the state it opens with (routes/pages.py)
+- api:       GET the page with PAGE_BOOTSTRAP off, then the API calls its scripts
+             make before first paint (/api/profile for the header plus the page's data)
+
+First paint adds --rtt-ms per network round trip, since the test client has no
+network: one for the HTML, plus one more when the page must call the API (the
+calls of one page go out in parallel). Script and stylesheet downloads are the
+same either way and left out.
+
+Usage:
+    python benchmarks/first_paint.py --users 1000 --runs 20 --rtt-ms 80
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from seed_db import seed  # noqa: E402
+
+
+def timed(client, requests, headers, runs):
+    """(median ms to fetch every url in `requests`, total bytes)."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = 0
+        for url in requests:
+            response = client.get(url, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url} -> {response.status_code}")
+            size += len(response.get_data())
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark first paint of the learner pages")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--lessons-per-category', type=int, default=50)
+    parser.add_argument('--questions-per-lesson', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--rtt-ms', type=float, default=80.0, help="network round trip added per request wave")
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmp.name, 'first_paint.db')
+    summary = seed(db_path, users=args.users, categories=args.categories,
+                   lessons_per_category=args.lessons_per_category,
+                   questions_per_lesson=args.questions_per_lesson, quiet=True)
+    print(f"[INFO] Seeded {summary['users']} users and {summary['lessons']} lessons")
+
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["HINT_CACHE_PATH"] = ""
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import sqlite3
+    import jwt
+    from app import create_app
+
+    conn = sqlite3.connect(db_path)
+    user_id = conn.execute("SELECT id FROM users WHERE role != 'admin' ORDER BY id LIMIT 1").fetchone()[0]
+    lesson_id, slug = conn.execute("SELECT id, slug FROM lessons ORDER BY id LIMIT 1").fetchone()
+    conn.close()
+
+    flask_app = create_app()
+    client = flask_app.test_client()
+    token = jwt.encode({'user_id': user_id, 'role': 'user',
+                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       flask_app.config["JWT_SECRET_KEY"], algorithm="HS256")
+    auth = {"Authorization": f"Bearer {token}"}
+    client.post('/auth', data={'token': token})
+
+    pages = [
+        ('lesson', f'/lesson?slug={slug}', [f'/api/lessons/slug/{slug}']),
+        ('quiz', f'/quiz?lesson_id={lesson_id}', [f'/api/quiz/{lesson_id}']),
+        ('archive', '/archive', ['/api/categories', '/api/lessons']),
+        ('profile', '/profile', ['/api/profile/badges']),
+    ]
+
+    results = {}
+    print(f"\n{'page':<8} {'path':<10} {'api calls':>9} {'bytes':>9} {'server ms':>10} "
+          f"{'first paint @' + format(args.rtt_ms, 'g') + 'ms RTT':>24}")
+    for name, url, page_calls in pages:
+        results[name] = {}
+        api_calls = ['/api/profile'] + page_calls
+        for path, requests, waves in (('bootstrap', [url], 1), ('api', [url] + api_calls, 2)):
+            # The API path renders the page without its inlined state, as before
+            flask_app.config["PAGE_BOOTSTRAP"] = path == 'bootstrap'
+            ms, size = timed(client, requests, auth, args.runs)
+            calls = len(requests) - 1
+            paint = ms + waves * args.rtt_ms
+            results[name][path] = {"api_calls": calls, "bytes": size, "server_ms": round(ms, 2),
+                                   "first_paint_ms": round(paint, 1)}
+            print(f"{name:<8} {path:<10} {calls:>9} {size:>9} {ms:>10.2f} {paint:>22.1f}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"rtt_ms": args.rtt_ms, "runs": args.runs, "pages": results}, f, indent=2)
+    tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Load test for the core learner flows.
+
+Starts the real Flask app on a local port (Gemini disabled, so AI endpoints use
+their built-in fallbacks) and runs concurrent simulated students through:
+
+    login -> /api/lessons/all-status -> /api/quiz/<id> -> /api/quiz/submit -> /api/leaderboard
+
+Reports throughput and p50/p95/p99 latency per endpoint, and compares the run
+against a stored baseline.
+
+Usage:
+    python benchmarks/seed_db.py --db bench.db --users 10000
+    python benchmarks/load_test.py --db bench.db --students 40 --duration 30 --save-baseline
+    python benchmarks/load_test.py --db bench.db --students 40 --duration 30   # compares
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_db import BENCH_PASSWORD, bench_email, seed  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'results', 'baseline.json')
+ENDPOINTS = ('login', 'all_status', 'quiz', 'submit', 'leaderboard')
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Collects per-endpoint latencies from all student threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        total = 0
+        for name in ENDPOINTS:
+            values = sorted(self.latencies[name])
+            total += len(values)
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def load_answer_key(db_path):
+    conn = sqlite3.connect(db_path)
+    key = {}
+    for question_id, lesson_id, correct in conn.execute(
+        "SELECT id, lesson_id, correct_answer FROM quiz_questions"
+    ):
+        key.setdefault(lesson_id, {})[str(question_id)] = correct
+    student_count = conn.execute(
+        "SELECT COUNT(*) FROM users WHERE email LIKE '%@bench.codedonki'"
+    ).fetchone()[0]
+    conn.close()
+    return key, student_count
+
+
+def start_server(db_path):
+    """Import the app against db_path and serve it from a background thread."""
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["RATE_LIMIT_ENABLED"] = "0"  # every simulated student shares one IP
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret")
+    os.chdir(ROOT)
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_student(base_url, recorder, answer_key, student_count, deadline, pass_rate, rng):
+    import requests
+
+    session = requests.Session()
+
+    def timed(name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, base_url + path, timeout=30, **kwargs)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            resp, ok = None, False
+        recorder.record(name, time.perf_counter() - start, ok)
+        return resp if ok else None
+
+    student = rng.randint(1, student_count)
+    resp = timed('login', 'POST', '/api/login',
+                 json={"email": bench_email(student), "password": BENCH_PASSWORD})
+    if resp is None:
+        return
+    headers = {"Authorization": f"Bearer {resp.json()['token']}"}
+
+    while time.perf_counter() < deadline:
+        resp = timed('all_status', 'GET', '/api/lessons/all-status', headers=headers)
+        if resp is None:
+            continue
+        lessons = [l for l in resp.json() if l['is_unlocked'] and l['id'] in answer_key]
+        if not lessons:
+            continue
+        pending = [l for l in lessons if not l['is_completed']] or lessons
+        lesson_id = rng.choice(pending)['id']
+
+        resp = timed('quiz', 'GET', f'/api/quiz/{lesson_id}', headers=headers)
+        if resp is None:
+            continue
+        key = answer_key[lesson_id]
+        answers = {
+            str(q['id']): key[str(q['id'])] if rng.random() < pass_rate else rng.choice('ABCD')
+            for q in resp.json()
+        }
+        timed('submit', 'POST', '/api/quiz/submit', headers=headers,
+              json={"lesson_id": lesson_id, "answers": answers, "time_taken": rng.randint(10, 200)})
+        timed('leaderboard', 'GET', '/api/leaderboard', headers=headers)
+
+
+def compare(result, baseline, tolerance):
+    """Return a list of regression messages (empty when within tolerance)."""
+    regressions = []
+    base_rps = baseline.get("throughput_rps") or 0
+    if base_rps and result["throughput_rps"] < base_rps * (1 - tolerance):
+        regressions.append(f"throughput {result['throughput_rps']} rps < baseline {base_rps} rps")
+    for name, stats in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base or not base.get("p95_ms"):
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name} p95 {stats['p95_ms']} ms > baseline {base['p95_ms']} ms")
+    return regressions
+
+
+def print_report(result, baseline=None):
+    print(f"\nRequests: {result['requests']} in {result['elapsed_seconds']}s "
+          f"({result['throughput_rps']} req/s)")
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+          + (f" {'base p95':>9}" if baseline else ''))
+    for name, s in result["endpoints"].items():
+        line = (f"{name:<12} {s['requests']:>9} {s['errors']:>7} {s['p50_ms']:>9} "
+                f"{s['p95_ms']:>9} {s['p99_ms']:>9}")
+        if baseline:
+            line += f" {baseline.get('endpoints', {}).get(name, {}).get('p95_ms', '-'):>9}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the CodeDonki learner flows")
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help="(re)seed the database with this many users before running")
+    parser.add_argument('--students', type=int, default=20, help="concurrent simulated students")
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds to run")
+    parser.add_argument('--pass-rate', type=float, default=0.8,
+                        help="probability each answer is correct")
+    parser.add_argument('--random-seed', type=int, default=7)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help="allowed regression vs baseline (0.20 = 20%%)")
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    if args.seed_users or not os.path.exists(db_path):
+        seed(db_path, users=args.seed_users or 10_000)
+    answer_key, student_count = load_answer_key(db_path)
+    if not student_count:
+        print(f"[ERROR] {db_path} has no synthetic students; run benchmarks/seed_db.py first")
+        return 2
+
+    server, base_url = start_server(db_path)
+    recorder = Recorder()
+    print(f"[INFO] {args.students} students for {args.duration}s against {base_url}")
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=run_student, args=(
+            base_url, recorder, answer_key, student_count, deadline, args.pass_rate,
+            random.Random(args.random_seed + i)
+        ))
+        for i in range(args.students)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    result = recorder.summary(elapsed)
+    result["config"] = {"students": args.students, "duration": args.duration,
+                        "pass_rate": args.pass_rate, "student_count": student_count}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"[SUCCESS] Baseline saved to {args.baseline}")
+        return 0
+    if baseline:
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\n[REGRESSION] " + "\n[REGRESSION] ".join(regressions))
+            return 1
+        print(f"\n[SUCCESS] Within {int(args.tolerance * 100)}% of baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
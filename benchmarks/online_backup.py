@@ -0,0 +1,181 @@
+"""Benchmark online backups of a large database while students submit quizzes.
+
+Serves the app on a local port (see load_test.start_server), keeps --students
+threads submitting quizzes, and takes a backup from a separate process, as
+`python backup.py backup` run by cron would. Each strategy is run in turn:
+
+- file copy: shutil.copyfile of the live file (what we did before; not a safe
+             backup, shown for raw throughput)
+- one step:  the backup API in one step, which holds the read lock throughout
+- stepped:   backup.py's defaults, --pages-per-step pages per step with
+             --step-sleep-ms between steps (see backup.py for what happens
+             when writes keep restarting the copy)
+
+For each it reports copy time and throughput, the full backup time (copy,
+integrity check, gzip), the compressed size, and submit latency and errors
+while the backup ran, next to a baseline with no backup. --journal wal converts
+the database to WAL first, where the stepped copy reads one snapshot.
+
+Usage:
+    python benchmarks/seed_db.py --db backup_bench.db --users 50000 --questions-per-lesson 10 \\
+        --attempts-per-user 120
+    python benchmarks/online_backup.py --db backup_bench.db --students 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analytics_isolation import Samples  # noqa: E402
+from load_test import load_answer_key, start_server  # noqa: E402
+from seed_db import BENCH_PASSWORD, bench_email, seed  # noqa: E402
+
+
+def run_student(base_url, samples, answer_key, student_count, recording, stop, rng):
+    import requests
+
+    session = requests.Session()
+    resp = session.post(base_url + '/api/login', timeout=30,
+                        json={"email": bench_email(rng.randint(1, student_count)), "password": BENCH_PASSWORD})
+    headers = {"Authorization": f"Bearer {resp.json()['token']}"}
+    lessons = list(answer_key)
+    while not stop.is_set():
+        lesson_id = rng.choice(lessons)
+        answers = {qid: (correct if rng.random() < 0.5 else rng.choice('ABCD'))
+                   for qid, correct in answer_key[lesson_id].items()}
+        start = time.perf_counter()
+        try:
+            resp = session.post(base_url + '/api/quiz/submit', headers=headers, timeout=60,
+                                json={"lesson_id": lesson_id, "answers": answers, "time_taken": 60})
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        if recording.is_set():
+            samples.record('submit', time.perf_counter() - start, ok)
+
+
+def take_backup(strategy, db_path, directory, args, results):
+    """Child process: one backup with `strategy`; puts its timings on `results`."""
+    sys.path.insert(0, ROOT)
+    import backup
+
+    if strategy == 'file copy':
+        started = time.perf_counter()
+        shutil.copyfile(db_path, os.path.join(directory, 'copy.db'))
+        seconds = time.perf_counter() - started
+        results.put({"copy_seconds": seconds, "total_seconds": seconds, "bytes": os.path.getsize(db_path)})
+        return
+    pages, sleep_ms = (-1, 0) if strategy == 'one step' else (args.pages_per_step, args.step_sleep_ms)
+    started = time.perf_counter()
+    m = backup.backup_database(db_path, directory, keep=1, pages_per_step=pages, step_sleep_ms=sleep_ms,
+                               max_restarts=args.max_restarts, compress_level=args.compress_level,
+                               quick_check=args.quick_check)
+    results.put({"copy_seconds": m['copy_seconds'], "total_seconds": time.perf_counter() - started,
+                 "bytes": m['bytes'], "compressed_bytes": m['compressed_bytes'], "mode": m['mode'],
+                 "restarts": m['restarts'], "check_seconds": m['check_seconds'],
+                 "compress_seconds": m['compress_seconds']})
+
+
+def measure(base_url, args, answer_key, student_count, work):
+    """Submit latency while work() runs. Returns (work's result, submit summary)."""
+    samples, recording, stop = Samples(), threading.Event(), threading.Event()
+    threads = [threading.Thread(target=run_student, args=(base_url, samples, answer_key, student_count,
+                                                          recording, stop, random.Random(i)))
+               for i in range(args.students)]
+    for t in threads:
+        t.start()
+    time.sleep(2)  # every student logged in and submitting
+    recording.set()
+    started = time.perf_counter()
+    result = work()
+    elapsed = time.perf_counter() - started
+    recording.clear()
+    stop.set()
+    for t in threads:
+        t.join()
+    summary = samples.summary(elapsed)['submit']
+    summary['max_ms'] = round(max(samples.values['submit'], default=0) * 1000, 1)
+    return result, summary
+
+
+def in_child(strategy, db_path, directory, args):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    child = ctx.Process(target=take_backup, args=(strategy, db_path, directory, args, results))
+    child.start()
+    result = results.get()
+    child.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backup throughput and its cost to quiz submissions")
+    parser.add_argument('--db', default='backup_bench.db')
+    parser.add_argument('--users', type=int, default=50_000, help="when seeding a missing --db")
+    parser.add_argument('--attempts-per-user', type=int, default=120, help="when seeding a missing --db")
+    parser.add_argument('--journal', choices=('delete', 'wal'), default='delete')
+    parser.add_argument('--students', type=int, default=8)
+    parser.add_argument('--baseline-seconds', type=float, default=10.0)
+    parser.add_argument('--pages-per-step', type=int, default=1024)
+    parser.add_argument('--step-sleep-ms', type=float, default=10.0)
+    parser.add_argument('--max-restarts', type=int, default=20)
+    parser.add_argument('--compress-level', type=int, default=1)
+    parser.add_argument('--quick-check', action='store_true')
+    parser.add_argument('--strategies', default='file copy,one step,stepped')
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    if not os.path.exists(db_path):
+        seed(db_path, users=args.users, questions_per_lesson=10, attempts_per_user=args.attempts_per_user)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {args.journal}")
+    conn.close()
+    size = os.path.getsize(db_path)
+    answer_key, student_count = load_answer_key(db_path)
+    print(f"[INFO] {db_path}: {size / 2**20:.0f} MB, journal_mode={args.journal}, {args.students} students")
+
+    server, base_url = start_server(db_path)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(db_path))
+    results = {}
+    _, results['no backup'] = measure(base_url, args, answer_key, student_count,
+                                      lambda: time.sleep(args.baseline_seconds))
+    for strategy in args.strategies.split(','):
+        print(f"[INFO] {strategy}")
+        backup, submit = measure(base_url, args, answer_key, student_count,
+                                 lambda: in_child(strategy, db_path, tmp, args))
+        backup['copy_mb_per_s'] = round(backup['bytes'] / 2**20 / backup['copy_seconds'], 1)
+        results[strategy] = dict(submit, backup=backup)
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+    server.shutdown()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'strategy':<10} {'copy s':>7} {'MB/s':>6} {'total s':>8} {'gzip MB':>8} {'restarts':>8}  "
+          f"{'submits/s':>9} {'errors':>6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for strategy, r in results.items():
+        b = r.get('backup', {})
+        gz = f"{b['compressed_bytes'] / 2**20:.0f}" if 'compressed_bytes' in b else '-'
+        print(f"{strategy:<10} {b.get('copy_seconds', 0):>7.1f} {b.get('copy_mb_per_s', '-'):>6} "
+              f"{b.get('total_seconds', 0):>8.1f} {gz:>8} {b.get('restarts', '-'):>8}  "
+              f"{r['per_second']:>9} {r['errors']:>6} {r['p50_ms']:>7} {r['p95_ms']:>7} {r['p99_ms']:>7} "
+              f"{r['max_ms']:>7}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"db_bytes": size, "config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
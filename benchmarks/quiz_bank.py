@@ -0,0 +1,144 @@
+"""Benchmark the admin quiz bank listing: full dump vs paginated, sparse pages.
+
+Seeds a synthetic database with a large question bank (50k questions by
+default: 20 categories x 50 lessons x 50 questions), then times the admin
+listings through the Flask test client:
+
+- full:        GET /api/admin/quiz (every question, every column; the old page load)
+- first page:  GET /api/admin/quiz?limit=20&fields=<the card columns> (the new page load)
+- deep page:   the same page 90% of the way through the bank, via its cursor
+- lesson full: GET /api/admin/lessons/<id>/quiz vs. its first page
+
+For each it reports the payload size and the median server+decode time.
+Time to first render adds the transfer time of the payload at --bandwidth-mbps,
+since the test client has no network.
+
+Usage:
+    python benchmarks/quiz_bank.py --questions-per-lesson 50 --runs 5 --bandwidth-mbps 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from seed_db import seed  # noqa: E402
+
+# Same columns as LIST_FIELDS in templates/admin/quiz.html
+CARD_FIELDS = 'lesson_id,lesson_title,question_text,correct_answer,has_explanation'
+PAGE_SIZE = 20
+
+
+def make_client(db_path):
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["HINT_CACHE_PATH"] = ""
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import jwt
+    from app import create_app
+
+    flask_app = create_app()
+    token = jwt.encode({'user_id': 1, 'role': 'admin'}, flask_app.config["JWT_SECRET_KEY"], algorithm="HS256")
+    return flask_app.test_client(), {"Authorization": f"Bearer {token}"}
+
+
+def measure(client, headers, url, runs):
+    """(payload_bytes, median_ms, decoded) for GET url: request plus JSON decode."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        decoded = json.loads(body)
+        times.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} -> {response.status_code}: {body[:200]!r}")
+    return len(body), statistics.median(times), decoded
+
+
+def bank_positions(db_path, fraction):
+    """(cursor for the page `fraction` of the way through the default lesson sort, biggest lesson id)."""
+    import sqlite3
+    from core import encode_cursor
+
+    conn = sqlite3.connect(db_path)
+    total = conn.execute("SELECT COUNT(*) FROM quiz_questions").fetchone()[0]
+    lesson_id, question_id = conn.execute(
+        "SELECT lesson_id, id FROM quiz_questions ORDER BY lesson_id, id LIMIT 1 OFFSET ?",
+        (int(total * fraction),)
+    ).fetchone()
+    biggest_lesson = conn.execute(
+        "SELECT lesson_id FROM quiz_questions GROUP BY lesson_id ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()[0]
+    conn.close()
+    return encode_cursor(['lesson', lesson_id, question_id]), biggest_lesson
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the admin quiz bank listing")
+    parser.add_argument('--db', help="existing seeded database (default: seed a temporary one)")
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--lessons-per-category', type=int, default=50)
+    parser.add_argument('--questions-per-lesson', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--bandwidth-mbps', type=float, default=10.0,
+                        help="link speed used to estimate time to first render")
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    tmp = None
+    db_path = os.path.abspath(args.db) if args.db else None
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, 'quiz_bank.db')
+        summary = seed(db_path, users=10, categories=args.categories,
+                       lessons_per_category=args.lessons_per_category,
+                       questions_per_lesson=args.questions_per_lesson, progress_per_user=0, quiet=True)
+        print(f"[INFO] Seeded {summary['questions']} questions in {summary['seconds']}s")
+
+    client, headers = make_client(db_path)
+    page_args = f"limit={PAGE_SIZE}&fields={CARD_FIELDS}"
+    cursor, lesson_id = bank_positions(db_path, 0.9)
+    scenarios = [
+        ('full', '/api/admin/quiz'),
+        ('first page', f'/api/admin/quiz?{page_args}'),
+        ('deep page (90%)', f'/api/admin/quiz?{page_args}&cursor={cursor}'),
+        ('lesson full', f'/api/admin/lessons/{lesson_id}/quiz'),
+        ('lesson first page', f'/api/admin/lessons/{lesson_id}/quiz?{page_args}'),
+    ]
+
+    bytes_per_ms = args.bandwidth_mbps * 1_000_000 / 8 / 1000
+    results = {}
+    print(f"\n{'scenario':<20} {'questions':>9} {'payload':>11} {'server+decode':>14} "
+          f"{'first render @' + format(args.bandwidth_mbps, 'g') + 'Mbps':>22}")
+    for name, url in scenarios:
+        size, ms, decoded = measure(client, headers, url, args.runs)
+        count = len(decoded) if isinstance(decoded, list) else len(decoded['questions'])
+        render_ms = ms + size / bytes_per_ms
+        results[name] = {"url": url, "questions": count, "bytes": size,
+                         "server_ms": round(ms, 2), "first_render_ms": round(render_ms, 1)}
+        print(f"{name:<20} {count:>9} {size / 1024:>9.1f}KB {ms:>12.1f}ms {render_ms:>20.1f}ms")
+
+    full, first = results['full'], results['first page']
+    print(f"\n[INFO] First page is {full['bytes'] / max(first['bytes'], 1):.0f}x smaller and renders "
+          f"{full['first_render_ms'] / max(first['first_render_ms'], 0.001):.0f}x sooner than the full dump")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"bandwidth_mbps": args.bandwidth_mbps, "runs": args.runs, "scenarios": results}, f, indent=2)
+    if tmp:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
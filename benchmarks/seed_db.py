@@ -0,0 +1,223 @@
+"""Seed a synthetic CodeDonki database for benchmarking.
+
+Builds a fresh SQLite file from database_schema_sqlite.sql and fills it with
+deterministic synthetic data. Every synthetic student shares the password
+BENCH_PASSWORD so the load test can log in as any of them.
+
+With --attempts-per-user each student also gets a history of quiz attempts,
+stored the way submit_quiz stores them and spread over the last
+--attempt-days days (for the backup and retention benchmarks).
+
+Usage:
+    python benchmarks/seed_db.py --db bench.db --users 10000 --categories 20 \
+        --lessons-per-category 50 --questions-per-lesson 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from passlib.hash import pbkdf2_sha256
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from schema_migrations import run_migrations  # noqa: E402
+
+SCHEMA_PATH = os.path.join(ROOT, 'database_schema_sqlite.sql')
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 50_000
+
+
+def bench_email(n):
+    return f"student{n}@bench.codedonki"
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(db_path, users=10_000, categories=20, lessons_per_category=50, questions_per_lesson=5,
+         progress_per_user=3, seed_value=42, quiet=False, attempts_per_user=0, attempt_days=365):
+    """Create db_path from the schema and populate it. Returns a summary dict."""
+    rng = random.Random(seed_value)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    # The schema's PRAGMA auto_vacuum only applies to an empty file, which WAL mode would write first
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    def log(message):
+        if not quiet:
+            print(f"  {message} ({time.perf_counter() - started:.1f}s)")
+
+    # One hash for everyone - hashing a million passwords would dominate seeding time
+    password_hash = pbkdf2_sha256.hash(BENCH_PASSWORD)
+    for batch in _batched(
+        (f"Student {n}", bench_email(n), password_hash, rng.randint(0, 3000))
+        for n in range(1, users + 1)
+    ):
+        conn.executemany(
+            "INSERT INTO users (name, email, hashed_password, xp) VALUES (?, ?, ?, ?)", batch
+        )
+    log(f"{users} users")
+
+    category_ids = []
+    for c in range(1, categories + 1):
+        cur = conn.execute(
+            "INSERT INTO categories (name, description, slug) VALUES (?, ?, ?)",
+            (f"Bench Category {c}", f"Synthetic category {c}", f"bench-category-{c}")
+        )
+        category_ids.append(cur.lastrowid)
+
+    lesson_rows = []
+    for category_id in category_ids:
+        for order in range(1, lessons_per_category + 1):
+            lesson_rows.append((
+                f"Bench Lesson {category_id}-{order}",
+                f"Synthetic lesson {order} of category {category_id}",
+                category_id, 20, 60, order, 70, f"bench-lesson-{category_id}-{order}"
+            ))
+    conn.executemany(
+        """
+        INSERT INTO lessons (title, description, category_id, xp_min, xp_max,
+                             order_in_category, pass_threshold, slug)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, lesson_rows
+    )
+    lessons = conn.execute(
+        "SELECT id, category_id, order_in_category FROM lessons WHERE slug LIKE 'bench-lesson-%'"
+    ).fetchall()
+    log(f"{len(lessons)} lessons")
+
+    for batch in _batched(
+        (lesson_id, f"Question {q} for lesson {lesson_id}?", "Option A", "Option B",
+         "Option C", "Option D", rng.choice('ABCD'), "Synthetic explanation")
+        for lesson_id, _, _ in lessons for q in range(1, questions_per_lesson + 1)
+    ):
+        conn.executemany(
+            """
+            INSERT INTO quiz_questions (lesson_id, question_text, option_a, option_b, option_c,
+                                        option_d, correct_answer, explanation)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch
+        )
+    log(f"{len(lessons) * questions_per_lesson} quiz questions")
+
+    # Each student has completed the first few lessons of one category
+    by_category = {}
+    for lesson_id, category_id, order in lessons:
+        by_category.setdefault(category_id, []).append((order, lesson_id))
+    for ordered in by_category.values():
+        ordered.sort()
+    first_user_id = conn.execute("SELECT MIN(id) FROM users WHERE email LIKE '%@bench.codedonki'").fetchone()[0]
+
+    def progress_rows():
+        for user_id in range(first_user_id, first_user_id + users):
+            ordered = by_category[rng.choice(category_ids)]
+            done = min(progress_per_user, len(ordered))
+            for order, lesson_id in ordered[:done]:
+                yield (user_id, lesson_id, 1, 1, 40, '2025-01-01 12:00:00')
+            if done < len(ordered):
+                yield (user_id, ordered[done][1], 0, 1, 0, None)
+
+    rows = 0
+    for batch in _batched(progress_rows()):
+        conn.executemany(
+            """
+            INSERT INTO lesson_progress (user_id, lesson_id, is_completed, is_unlocked, xp_earned, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, batch
+        )
+        rows += len(batch)
+    log(f"{rows} lesson_progress rows")
+
+    attempts = 0
+    if attempts_per_user:
+        questions = {}
+        for question_id, lesson_id, correct in conn.execute(
+            "SELECT id, lesson_id, correct_answer FROM quiz_questions ORDER BY id"
+        ):
+            questions.setdefault(lesson_id, []).append((question_id, correct))
+        lesson_ids = [lesson_id for lesson_id, _, _ in lessons]
+        now = time.time()
+
+        def attempt_rows():
+            for user_id in range(first_user_id, first_user_id + users):
+                for _ in range(attempts_per_user):
+                    lesson_id = rng.choice(lesson_ids)
+                    asked = questions.get(lesson_id, [])
+                    answers = {str(q): c if rng.random() < 0.7 else rng.choice('ABCD') for q, c in asked}
+                    right = sum(answers[str(q)] == c for q, c in asked)
+                    score = int(right / len(asked) * 100) if asked else 0
+                    at = time.strftime('%Y-%m-%d %H:%M:%S',
+                                       time.gmtime(now - rng.random() * attempt_days * 86400))
+                    yield (user_id, lesson_id, str(asked), str(answers), score, score >= 70,
+                           40 if score >= 70 else 0, at)
+
+        for batch in _batched(attempt_rows()):
+            conn.executemany(
+                """
+                INSERT INTO user_quiz_attempts (user_id, lesson_id, quiz_questions, user_answers, score,
+                                                passed, xp_awarded, attempted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch
+            )
+            attempts += len(batch)
+        log(f"{attempts} quiz attempts")
+
+    conn.commit()
+    run_migrations(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+    summary = {
+        "db": db_path,
+        "users": users,
+        "categories": categories,
+        "lessons": len(lessons),
+        "questions": len(lessons) * questions_per_lesson,
+        "lesson_progress": rows,
+        "quiz_attempts": attempts,
+        "seconds": round(time.perf_counter() - started, 2),
+        "size_mb": round(os.path.getsize(db_path) / (1024 * 1024), 1),
+    }
+    if not quiet:
+        print(f"[SUCCESS] Seeded {db_path}: {summary}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a synthetic CodeDonki database")
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--lessons-per-category', type=int, default=50)
+    parser.add_argument('--questions-per-lesson', type=int, default=5)
+    parser.add_argument('--progress-per-user', type=int, default=3)
+    parser.add_argument('--attempts-per-user', type=int, default=0)
+    parser.add_argument('--attempt-days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    seed(args.db, args.users, args.categories, args.lessons_per_category,
+         args.questions_per_lesson, args.progress_per_user, args.seed,
+         attempts_per_user=args.attempts_per_user, attempt_days=args.attempt_days)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Microbenchmark: per-row cost of building and encoding the large listings.
+
+For each listing the same query runs twice against a seeded database, and the
+time after execute() is split into two phases:
+
+- build:  fetch the rows (SQLite steps the query here) -> list of dicts
+  - jsonify path: sqlite3.Row objects, one dict literal per row (the code before serializers.py)
+  - pydantic_core path: raw tuples zipped with the column names (serializers.row_dicts)
+- encode: list of dicts -> JSON bytes
+  - jsonify path: flask.jsonify(...).get_data()
+  - pydantic_core path: the compiled response-model serializer (serializers.*.dumps)
+
+Reported as microseconds per row (median of --runs), so results from banks of different
+sizes compare directly. Each path first runs once untimed, so the pydantic_core
+serializer (built lazily on first use) and SQLite's page cache are warm for both.
+The closing ratio is the jsonify total divided by the pydantic_core total.
+
+Usage:
+    python benchmarks/serialization.py --users 20000 --questions-per-lesson 50 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from seed_db import seed  # noqa: E402
+
+USERS_SQL = """
+    SELECT u.id, u.name, u.email, u.xp, u.avatar_url, u.created_at,
+           COALESCE(NULLIF(u.role, ''), 'user') as role,
+           COUNT(lp.lesson_id) as completed_lessons,
+           COUNT(ub.badge_id) as badges_earned
+    FROM users u
+    LEFT JOIN lesson_progress lp ON u.id = lp.user_id AND lp.is_completed = 1
+    LEFT JOIN user_badges ub ON u.id = ub.user_id
+    GROUP BY u.id, u.name, u.email, u.xp, u.avatar_url, u.created_at, u.role
+    ORDER BY u.xp DESC
+"""
+QUIZ_SQL = """
+    SELECT id, lesson_id, question_text, option_a, option_b, option_c, option_d, correct_answer, explanation
+    FROM quiz_questions ORDER BY lesson_id, id
+"""
+LESSONS_SQL = """
+    SELECT l.id, l.title, l.description, COALESCE(NULLIF(c.name, ''), 'General') as category, l.category_id,
+           l.xp_min, l.xp_max, l.ar_model_url, l.order_in_category, l.pass_threshold, l.slug
+    FROM lessons l LEFT JOIN categories c ON l.category_id = c.id
+    ORDER BY l.category_id, l.order_in_category
+"""
+
+
+def build_users_rows(rows):
+    return [{
+        "id": row['id'], "name": row['name'], "email": row['email'], "xp": row['xp'],
+        "avatar_url": row['avatar_url'], "created_at": row['created_at'] if row['created_at'] else None,
+        "role": row['role'] or "user", "completed_lessons": row['completed_lessons'],
+        "badges_earned": row['badges_earned'],
+    } for row in rows]
+
+
+def build_quiz_rows(rows):
+    fields = ('id', 'lesson_id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d',
+              'correct_answer', 'explanation')
+    return [{f: row[f] for f in fields} for row in rows]
+
+
+def build_lesson_rows(rows):
+    return [{
+        "id": row['id'], "title": row['title'], "description": row['description'],
+        "category": row['category'], "category_id": row['category_id'], "xp_min": row['xp_min'],
+        "xp_max": row['xp_max'], "ar_model_url": row['ar_model_url'],
+        "order_in_category": row['order_in_category'], "pass_threshold": row['pass_threshold'],
+        "slug": row['slug'],
+    } for row in rows]
+
+
+def time_phases(execute, build, encode, runs):
+    """(rows, median build seconds, median encode seconds, payload bytes), after one untimed run."""
+    encode(build(execute()))
+    builds, encodes = [], []
+    for _ in range(runs):
+        cursor = execute()
+        start = time.perf_counter()
+        items = build(cursor)
+        built = time.perf_counter()
+        body = encode(items)
+        builds.append(built - start)
+        encodes.append(time.perf_counter() - built)
+    return len(items), statistics.median(builds), statistics.median(encodes), len(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-row cost of jsonify vs pydantic_core serialization")
+    parser.add_argument('--db', help="existing seeded database (default: seed a temporary one)")
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--lessons-per-category', type=int, default=50)
+    parser.add_argument('--questions-per-lesson', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    tmp = None
+    db_path = os.path.abspath(args.db) if args.db else None
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, 'serialization.db')
+        summary = seed(db_path, users=args.users, categories=args.categories,
+                       lessons_per_category=args.lessons_per_category,
+                       questions_per_lesson=args.questions_per_lesson, quiet=True)
+        print(f"[INFO] Seeded {summary['users']} users, {summary['lessons']} lessons, "
+              f"{summary['questions']} questions in {summary['seconds']}s")
+
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from flask import jsonify
+    from app import create_app
+    from core import get_db_connection
+    from serializers import ADMIN_USER_LIST, LESSON_LIST, QUIZ_QUESTION_LIST, row_dicts
+
+    listings = [
+        ('admin users', USERS_SQL, build_users_rows, ADMIN_USER_LIST),
+        ('admin quiz bank', QUIZ_SQL, build_quiz_rows, QUIZ_QUESTION_LIST),
+        ('lessons', LESSONS_SQL, build_lesson_rows, LESSON_LIST),
+    ]
+    results = {}
+    conn = get_db_connection()
+    with create_app().app_context():
+        print(f"\n{'listing':<16} {'rows':>7} {'path':<14} {'fetch+build us/row':>19} {'encode us/row':>14} "
+              f"{'total us/row':>13} {'payload':>10}")
+        for name, sql, build_rows, serializer in listings:
+            paths = {
+                'jsonify': (lambda cursor, build_rows=build_rows: build_rows(cursor.fetchall()),
+                            lambda items: jsonify(items).get_data()),
+                'pydantic_core': (row_dicts, serializer.dumps),
+            }
+            results[name] = {}
+            for path, (build, encode) in paths.items():
+                rows, build_s, encode_s, size = time_phases(lambda: conn.execute(sql), build, encode, args.runs)
+                per_row = 1e6 / max(rows, 1)
+                result = {"rows": rows, "build_us_per_row": round(build_s * per_row, 3),
+                          "encode_us_per_row": round(encode_s * per_row, 3),
+                          "total_us_per_row": round((build_s + encode_s) * per_row, 3), "bytes": size}
+                results[name][path] = result
+                print(f"{name:<16} {rows:>7} {path:<14} {result['build_us_per_row']:>19.2f} "
+                      f"{result['encode_us_per_row']:>14.2f} {result['total_us_per_row']:>13.2f} "
+                      f"{size / 1024:>8.0f}KB")
+            before, after = results[name]['jsonify'], results[name]['pydantic_core']
+            print(f"[INFO] {name}: pydantic_core takes {after['total_us_per_row']:.2f} us per row against "
+                  f"jsonify's {before['total_us_per_row']:.2f} "
+                  f"({before['total_us_per_row'] / max(after['total_us_per_row'], 0.001):.1f}x less time per row)")
+    conn.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"runs": args.runs, "listings": results}, f, indent=2)
+    if tmp:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Measure worker cold start: `import app; app.create_app()` in fresh interpreters.
+
+Every gunicorn worker pays this on boot and again after each max_requests
+recycle. Each run is a new Python process (so no module is already imported);
+the script reports the median and max time to a ready Flask app, checks that
+the modules that should load on first use (the Gemini SDK, passlib, asyncio
+and the batch sync thread pool) were not imported, and exits non-zero if the
+median is over --budget-ms or a lazy module was imported at startup.
+
+--importtime adds the slowest imports from `python -X importtime`.
+
+Usage:
+    python benchmarks/startup_time.py --runs 10 --budget-ms 600 --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by create_app(); each is loaded by the first request that needs it
+LAZY_MODULES = ('google.generativeai', 'grpc', 'passlib', 'asyncio', 'concurrent.futures', 'pydantic', 'brotli')
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": len(sys.modules),
+                  "lazy_loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def child_env():
+    env = dict(os.environ)
+    # A configured Gemini key, so the check covers the provider workers actually run with
+    env.update(GEMINI_API_KEY=env.get("GEMINI_API_KEY") or "startup-bench-key",
+               JWT_SECRET_KEY=env.get("JWT_SECRET_KEY") or "startup-bench-secret",
+               HINT_CACHE_PATH="", SHARED_CACHE_PATH="", SQL_PROFILE="0")
+    return env
+
+
+def run_once():
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=child_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """(cumulative_ms, module) of the slowest imports, from python -X importtime."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+                         cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CodeDonki worker startup time")
+    parser.add_argument('--runs', type=int, default=7, help="fresh interpreters to time")
+    parser.add_argument('--budget-ms', type=float, default=600.0,
+                        help="fail if the median startup is slower than this")
+    parser.add_argument('--importtime', action='store_true', help="also list the slowest imports")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+    times = [run['ms'] for run in runs]
+    lazy_loaded = sorted({m for run in runs for m in run['lazy_loaded']})
+    result = {"runs": args.runs, "median_ms": round(statistics.median(times), 1),
+              "max_ms": round(max(times), 1), "min_ms": round(min(times), 1),
+              "modules": runs[-1]['modules'], "lazy_loaded": lazy_loaded,
+              "budget_ms": args.budget_ms}
+
+    print(f"[INFO] create_app() over {args.runs} cold starts: median {result['median_ms']} ms, "
+          f"min {result['min_ms']} ms, max {result['max_ms']} ms, {result['modules']} modules")
+    if args.importtime:
+        print("\nSlowest imports (cumulative ms):")
+        for ms, name in slowest_imports(args.top):
+            print(f"  {ms:8.1f}  {name}")
+        print()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if lazy_loaded:
+        print(f"[REGRESSION] Imported at startup but should load on first use: {', '.join(lazy_loaded)}")
+        failed = True
+    if result['median_ms'] > args.budget_ms:
+        print(f"[REGRESSION] Median startup {result['median_ms']} ms is over the {args.budget_ms:g} ms budget")
+        failed = True
+    if failed:
+        return 1
+    print(f"[SUCCESS] Within the {args.budget_ms:g} ms startup budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Concurrency stress test for the grading write path.
+
+Fires many simultaneous /api/quiz/submit and /api/lessons/complete requests for
+the same few students and then checks the database invariants:
+
+- users.xp equals the XP recorded by every passing attempt plus completions
+  (no lost updates)
+- each response's new_total_xp is unique per student (no read-modify-read races)
+- a lesson completed before the run stays completed after the next-lesson
+  unlock runs against it (no clobbered progress)
+- no duplicate badges, one attempt row per submission
+
+Exits with status 1 if any invariant fails.
+
+Usage:
+    python benchmarks/stress_submit_quiz.py --threads 32 --submissions 50
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STUDENTS = 3
+
+
+def prepare_database(db_path):
+    """Schema + migrations, plus students who already finished lesson 2 of category 1."""
+    from schema_migrations import run_migrations
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    with open(os.path.join(ROOT, 'database_schema_sqlite.sql'), 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+    run_migrations(conn)
+    student_ids = []
+    for n in range(STUDENTS):
+        cur = conn.execute(
+            "INSERT INTO users (name, email, hashed_password) VALUES (?, ?, 'x')",
+            (f"Stress {n}", f"stress{n}@bench.codedonki")
+        )
+        student_ids.append(cur.lastrowid)
+        conn.execute(
+            """
+            INSERT INTO lesson_progress (user_id, lesson_id, is_completed, is_unlocked, xp_earned, completed_at)
+            VALUES (?, 2, 1, 1, 55, '2025-01-01 00:00:00')
+            """, (cur.lastrowid,)
+        )
+    answers = {str(qid): correct for qid, correct in
+               conn.execute("SELECT id, correct_answer FROM quiz_questions WHERE lesson_id = 1")}
+    conn.commit()
+    conn.close()
+    return student_ids, answers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress test concurrent quiz submissions")
+    parser.add_argument('--threads', type=int, default=24)
+    parser.add_argument('--submissions', type=int, default=40, help="submissions per thread")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='codedonki-stress-')
+    db_path = os.path.join(workdir, 'stress.db')
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ.setdefault("JWT_SECRET_KEY", "stress-jwt-secret")
+    student_ids, answers = prepare_database(db_path)
+
+    import jwt
+    from app import create_app
+
+    flask_app = create_app()
+    secret = flask_app.config["JWT_SECRET_KEY"]
+    tokens = {uid: jwt.encode({'user_id': uid, 'role': 'user'}, secret, algorithm="HS256")
+              for uid in student_ids}
+
+    lock = threading.Lock()
+    totals_seen = {uid: [] for uid in student_ids}
+    failures = []
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(index):
+        client = flask_app.test_client()
+        start_gate.wait()
+        for i in range(args.submissions):
+            uid = student_ids[(index + i) % len(student_ids)]
+            headers = {"Authorization": f"Bearer {tokens[uid]}"}
+            if i % 10 == 9:
+                # Interleave lesson completions (each pays XP once per user/lesson)
+                resp = client.post('/api/lessons/complete', headers=headers,
+                                   json={"lesson_id": 3 + (i % 2), "xp": 20})
+                if resp.status_code >= 400:
+                    with lock:
+                        failures.append(f"complete -> {resp.status_code} {resp.get_json()}")
+                elif resp.status_code == 201:
+                    with lock:
+                        totals_seen[uid].append(resp.get_json()["new_xp"])
+                continue
+            resp = client.post('/api/quiz/submit', headers=headers,
+                               json={"lesson_id": 1, "answers": answers, "time_taken": 5})
+            data = resp.get_json()
+            if resp.status_code != 200:
+                with lock:
+                    failures.append(f"submit -> {resp.status_code} {data}")
+            else:
+                with lock:
+                    totals_seen[uid].append(data["new_total_xp"])
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    requests_made = args.threads * args.submissions
+
+    conn = sqlite3.connect(db_path)
+    problems = list(failures[:10])
+    for uid in student_ids:
+        xp = conn.execute("SELECT xp FROM users WHERE id = ?", (uid,)).fetchone()[0]
+        quiz_xp = conn.execute(
+            "SELECT COALESCE(SUM(xp_awarded), 0) FROM user_quiz_attempts WHERE user_id = ? AND passed = 1",
+            (uid,)
+        ).fetchone()[0]
+        completions = conn.execute(
+            "SELECT COUNT(*) FROM completed_lessons WHERE user_id = ?", (uid,)
+        ).fetchone()[0]
+        expected = quiz_xp + 20 * completions
+        if xp != expected:
+            problems.append(f"user {uid}: xp {xp} != recorded awards {expected} (lost update)")
+        seen = totals_seen[uid]
+        if len(seen) != len(set(seen)):
+            problems.append(f"user {uid}: duplicate new_total_xp values returned (racy read)")
+        if seen and max(seen) != xp:
+            problems.append(f"user {uid}: highest returned total {max(seen)} != final xp {xp}")
+        lesson2 = conn.execute(
+            "SELECT is_completed, xp_earned FROM lesson_progress WHERE user_id = ? AND lesson_id = 2",
+            (uid,)
+        ).fetchone()
+        if lesson2 != (1, 55):
+            problems.append(f"user {uid}: lesson 2 progress clobbered -> {lesson2}")
+        dupes = conn.execute(
+            "SELECT COUNT(*) - COUNT(DISTINCT badge_id) FROM user_badges WHERE user_id = ?", (uid,)
+        ).fetchone()[0]
+        if dupes:
+            problems.append(f"user {uid}: {dupes} duplicate badges")
+    attempts = conn.execute("SELECT COUNT(*) FROM user_quiz_attempts").fetchone()[0]
+    expected_attempts = sum(1 for i in range(args.submissions) if i % 10 != 9) * args.threads
+    if attempts != expected_attempts:
+        problems.append(f"{attempts} attempt rows, expected {expected_attempts}")
+    conn.close()
+
+    print(f"{requests_made} requests from {args.threads} threads in {elapsed:.2f}s "
+          f"({requests_made / elapsed:.0f} req/s)")
+    if problems:
+        print("[FAIL] " + "\n[FAIL] ".join(problems))
+        return 1
+    print("[SUCCESS] No lost XP, racy totals, clobbered progress or duplicate badges")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
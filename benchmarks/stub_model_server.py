@@ -0,0 +1,57 @@
+"""Local stand-in for the Gemini REST API, for offline AI benchmarks.
+
+Answers POST /v1beta/models/<model>:generateContent after a fixed delay with a
+canned reply that starts with "Stub", so a benchmark can tell real (stubbed)
+model answers from the endpoints' fallback text. It is a bare ASGI app served
+by uvicorn, so it can hold thousands of concurrent slow requests itself.
+
+Usage:
+    python benchmarks/stub_model_server.py --port 8765 --latency 0.5
+    GEMINI_API_KEY=stub GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+LATENCY_SECONDS = 0.5
+
+
+async def application(scope, receive, send):
+    if scope['type'] != 'http':
+        return
+    while (await receive()).get('more_body'):
+        pass
+    path = scope['path']
+    if scope['method'] == 'POST' and path.endswith(':generateContent'):
+        await asyncio.sleep(LATENCY_SECONDS)
+        model = path.rsplit('/', 1)[-1].split(':', 1)[0]
+        status, payload = 200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": f"Stub reply from {model}"}]},
+                            "finishReason": 1, "index": 0}],
+        }
+    else:
+        status, payload = 404, {"error": {"code": 404, "message": f"No stub for {path}"}}
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def main(argv=None):
+    global LATENCY_SECONDS
+    parser = argparse.ArgumentParser(description="Serve a stub Gemini generateContent API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=LATENCY_SECONDS, help="seconds per reply")
+    args = parser.parse_args(argv)
+    LATENCY_SECONDS = args.latency
+
+    import uvicorn
+    uvicorn.run(application, host='127.0.0.1', port=args.port, log_level='warning',
+                backlog=4096, limit_concurrency=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Response compression: gzip, or brotli when the optional `brotli` package is installed.
+
+An after_request hook compresses a response when the client accepts it, the
+body is at least `min_bytes`, and its mimetype is on the allowlist (JSON, HTML,
+CSS, JS, text, SVG). Streams (Server-Sent Events), partial and conditional
+responses, HEAD requests and bodies that are already encoded go out untouched.
+File responses (uploaded lesson pages, /static) are read and compressed like
+any other body; their ETag is weakened, so If-None-Match still gives a 304.
+
+Compressed bodies are kept in a byte-bounded LRU keyed by the response's
+strong ETag when it has one (files), otherwise by a digest of the body. A body
+served again, from shared_cache or the same file, reuses its compressed
+variant instead of being compressed again.
+"""
+import gzip
+import hashlib
+import threading
+
+from cachetools import LRUCache
+from flask import request
+
+from metrics import metrics
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'image/svg+xml', 'application/xml', 'text/xml',
+))
+_UNAVAILABLE = object()
+_brotli = None
+
+
+def brotli_module():
+    """The brotli module, or None when it is not installed (imported on first use)."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = _UNAVAILABLE
+    return None if _brotli is _UNAVAILABLE else _brotli
+
+
+class Compressor:
+    """Content negotiation, compression and the compressed-variant cache."""
+
+    def __init__(self, enabled=True, min_bytes=1024, max_bytes=8 * 1024 * 1024, gzip_level=6,
+                 brotli_quality=5, cache_bytes=32 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self.configure(enabled, min_bytes, max_bytes, gzip_level, brotli_quality, cache_bytes)
+
+    def configure(self, enabled=True, min_bytes=1024, max_bytes=8 * 1024 * 1024, gzip_level=6,
+                  brotli_quality=5, cache_bytes=32 * 1024 * 1024):
+        with self._lock:
+            self.enabled = enabled
+            self.min_bytes = min_bytes
+            self.max_bytes = max_bytes
+            self.gzip_level = gzip_level
+            self.brotli_quality = brotli_quality
+            self.cache_bytes = cache_bytes
+            # (key, encoding) -> compressed body, bounded by total compressed size
+            self._cache = LRUCache(maxsize=max(cache_bytes, 1), getsizeof=len)
+            self.counts = {"compressed": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def choose_encoding(self, accept_encodings):
+        """'br', 'gzip' or None for the request's Accept-Encoding."""
+        br = accept_encodings.quality('br') if brotli_module() else 0
+        gz = accept_encodings.quality('gzip')
+        if br and br >= gz:
+            return 'br'
+        return 'gzip' if gz else None
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli_module().compress(body, quality=self.brotli_quality)
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compressed(self, body, encoding, key=None):
+        """Compressed body, from the cache when this body (or `key`) was compressed before."""
+        cache_key = (key or hashlib.sha1(body).digest(), encoding)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+        if cached is None:
+            cached = self.compress(body, encoding)
+            if len(cached) <= self.cache_bytes:
+                with self._lock:
+                    self._cache[cache_key] = cached
+        else:
+            with self._lock:
+                self.counts["cache_hits"] += 1
+        with self._lock:
+            self.counts["compressed"] += 1
+            self.counts["bytes_in"] += len(body)
+            self.counts["bytes_out"] += len(cached)
+        return cached
+
+    def process(self, response):
+        """after_request hook: compress `response` in place when worthwhile."""
+        if not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        if response.status_code == 304:
+            # Caches must keep the variants apart, as on the 200 this revalidates
+            response.vary.add('Accept-Encoding')
+            return response
+        if (request.method == 'HEAD' or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        if response.direct_passthrough:
+            # send_file(): a file we can read, unless its size is unknown or too large
+            length = response.content_length
+            if length is None or length > self.max_bytes:
+                return response
+        elif response.is_streamed:
+            return response
+        else:
+            length = response.calculate_content_length()
+        if length is not None and length < self.min_bytes:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        etag, weak = response.get_etag()
+        response.direct_passthrough = False
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+        data = self.compressed(body, encoding, key=etag if etag and not weak else None)
+        if len(data) >= len(body):
+            return response
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        metrics.increment('compressed_responses_total', encoding)
+        return response
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            entries, cached_bytes = len(self._cache), self._cache.currsize
+        saved = counts["bytes_in"] - counts["bytes_out"]
+        return dict(counts, enabled=self.enabled, brotli=brotli_module() is not None,
+                    min_bytes=self.min_bytes, bytes_saved=saved,
+                    ratio=round(counts["bytes_out"] / counts["bytes_in"], 4) if counts["bytes_in"] else None,
+                    cache_entries=entries, cache_bytes=cached_bytes, cache_max_bytes=self.cache_bytes)
+
+
+compressor = Compressor()
+
+
+def init_app(app):
+    """Register the compression hook."""
+    app.after_request(compressor.process)
@@ -0,0 +1,234 @@
+"""Shared helpers for the route blueprints: database connections, JWT auth decorators
+and lesson progress bookkeeping.
+"""
+import base64
+import json
+import os
+import re
+import sqlite3
+import jwt
+import functools
+
+from flask import request, jsonify, session, current_app
+from dotenv import load_dotenv
+
+from db_router import open_connection, router as db_router
+from events import bus as event_bus
+from metrics import InstrumentedConnection
+from query_profiler import ProfilingConnection, profiler
+from schema_migrations import run_migrations
+from shared_cache import cache as shared_cache
+
+# Load environment variables (before the route modules read their settings)
+load_dotenv()
+
+# Simple helpers to simulate login for server-side pages
+def set_user_session_from_token(token):
+    try:
+        identity = jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
+        session['user'] = {
+            'user_id': identity.get('user_id'),
+            'role': identity.get('role')
+        }
+        return True
+    except Exception:
+        return False
+
+
+# --- Database Helper Function ---
+def get_db_connection():
+    """Establishes a connection to the SQLite database: read-write, read-only or the
+    analytics snapshot, as the current route asks (see db_router.db_route)."""
+    try:
+        db_path = os.getenv("DATABASE_PATH", "codedonki.db")
+        factory = ProfilingConnection if profiler.enabled else InstrumentedConnection
+        conn = open_connection(db_path, db_router.target(), factory)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        # Enable foreign keys in SQLite
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return None
+
+
+# --- NEW: Slug Helper Function ---
+def create_slug(title):
+    """Generates a URL-friendly slug from a title."""
+    slug = title.lower()
+    slug = re.sub(r'[^a-z0-9\s-]', '', slug)  # Remove special chars
+    slug = re.sub(r'[\s_]+', '-', slug)      # Replace spaces with hyphens
+    slug = slug.strip('-')
+    return slug
+
+
+# --- Pagination Helpers ---
+def get_page_args(default_per_page=20, max_per_page=100):
+    """(page, per_page) from ?page=&per_page=, clamped to sane bounds."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', default_per_page, type=int), 1), max_per_page)
+    return page, per_page
+
+
+def encode_cursor(values):
+    """Opaque keyset-pagination cursor for a list of JSON values (the last row's sort key)."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Values from encode_cursor(). Raises ValueError for a cursor it did not make."""
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    if not isinstance(values, list):
+        raise ValueError("cursor must encode a list")
+    return values
+
+
+# --- Startup Test Function ---
+def test_db_connection():
+    """Tests the database connection on startup."""
+    conn = get_db_connection()
+    if conn:
+        print("[SUCCESS] Database connection successful!")
+        conn.close()
+
+
+def setup_database():
+    """Setup database tables and sample data."""
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Cannot setup database - connection failed")
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        # If core tables already exist, assume DB is initialized and skip seeding
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('users','categories','lessons') LIMIT 1")
+        if cursor.fetchone():
+            cursor.close()
+            print("[INFO] Database already initialized; skipping setup script.")
+            # Existing databases still receive any pending schema migrations
+            run_migrations(conn)
+            conn.close()
+            return True
+        
+        # Disable foreign keys temporarily for initial setup
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        
+        # Read and execute the SQLite database schema
+        with open('database_schema_sqlite.sql', 'r', encoding='utf-8') as file:
+            sql_script = file.read()
+        
+        # Execute the entire script
+        cursor.executescript(sql_script)
+        
+        # Re-enable foreign keys
+        cursor.execute("PRAGMA foreign_keys = ON")
+        
+        conn.commit()
+        cursor.close()
+        run_migrations(conn)
+        conn.close()
+        
+        print("[SUCCESS] Database setup completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"[ERROR] Database setup failed: {e}")
+        if conn:
+            conn.rollback()
+            conn.close()
+        return False
+
+
+# --- Auth Decorator Functions ---
+def get_jwt_identity():
+    """Helper to get identity from JWT in the 'Authorization' header."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None, "Missing Authorization header"
+    parts = auth_header.split()
+    if parts[0].lower() != 'bearer' or len(parts) != 2:
+        return None, "Invalid Authorization header format"
+    token = parts[1]
+    try:
+        identity = jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
+        return identity, None
+    except jwt.ExpiredSignatureError:
+        return None, "Token has expired"
+    except jwt.InvalidTokenError:
+        return None, "Invalid token"
+
+
+def admin_required(f):
+    """Decorator to protect routes that require 'admin' role."""
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        identity, error = get_jwt_identity()
+        if not identity: return jsonify({"error": error}), 401
+        if identity.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def login_required(f):
+    """Decorator to protect routes that require any logged-in user."""
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        identity, error = get_jwt_identity()
+        if not identity: return jsonify({"error": error}), 401
+        request.current_user = identity 
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# --- NEW: Gamification & AI Routes (Phase 7) ---
+
+def record_lesson_completion(cursor, user_id, lesson_id, xp_to_award):
+    """Marks a lesson complete and awards XP inside the caller's transaction.
+    Returns the user's new XP total, or None if the lesson was already completed.
+    """
+    # 1. Add to completed_lessons; RETURNING is empty if it was already completed
+    cursor.execute(
+        """
+        INSERT INTO completed_lessons (user_id, lesson_id) VALUES (?, ?)
+        ON CONFLICT(user_id, lesson_id) DO NOTHING
+        RETURNING id
+        """,
+        (user_id, lesson_id)
+    )
+    if not cursor.fetchall():
+        return None
+    
+    # 2. Update user's XP and read the new total in the same statement
+    cursor.execute(
+        "UPDATE users SET xp = xp + ? WHERE id = ? RETURNING xp",
+        (xp_to_award, user_id)
+    )
+    return cursor.fetchone()['xp']
+
+
+def publish_progress(cursor, user_id, xp_delta, new_xp, new_badges=()):
+    """Pushes an XP change (with rank) and new badges to live clients, and drops the user's
+    cached profile, progress and badges, and the cached leaderboard if the change reached the top 50.
+    Call after commit."""
+    shared_cache.invalidate(f'user:{user_id}')
+    if xp_delta:
+        # Fewer than 50 users above the new XP means the user is on the leaderboard
+        cursor.execute("SELECT 1 FROM users WHERE xp > ? LIMIT 1 OFFSET 49", (new_xp,))
+        if cursor.fetchone() is None:
+            shared_cache.invalidate('leaderboard')
+    if not event_bus.has_subscribers():
+        return
+    if xp_delta:
+        cursor.execute("SELECT COUNT(*) + 1 FROM users WHERE xp > ?", (new_xp,))
+        rank = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) + 1 FROM users WHERE xp > ? AND id != ?", (new_xp - xp_delta, user_id))
+        previous_rank = cursor.fetchone()[0]
+        event_bus.publish('xp', {"xp": new_xp, "delta": xp_delta, "rank": rank,
+                                 "previous_rank": previous_rank}, user_id=user_id)
+        # Leaderboard pages only show the top 50, so changes below that are not broadcast
+        if rank <= 50:
+            event_bus.publish('leaderboard', {"rank": rank, "xp": new_xp})
+    if new_badges:
+        event_bus.publish('badges', {"badges": list(new_badges)}, user_id=user_id)
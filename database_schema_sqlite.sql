@@ -1,6 +1,10 @@
 -- Database Schema for CodeDonki Learning Platform
 -- SQLite Version
 
+-- Free pages can be returned with PRAGMA incremental_vacuum (see maintenance.py).
+-- Only takes effect before the first table is created.
+PRAGMA auto_vacuum = INCREMENTAL;
+
 -- ============================================
 -- Users Table
 -- ============================================
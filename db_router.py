@@ -0,0 +1,309 @@
+"""Connection routing: the read-write primary, read-only connections, and the analytics snapshot.
+
+Routes declare what they need with @db_route(target); core.get_db_connection()
+then opens the matching connection for every query the view (and the helpers
+it calls) runs:
+
+- PRIMARY (the default): codedonki.db, read-write.
+- READ_ONLY: the same file opened with mode=ro and PRAGMA query_only, for GET
+  routes that never write. A stray write fails instead of taking the write lock.
+- SNAPSHOT: a copy of codedonki.db made with the sqlite3 backup API, for the
+  admin dashboards, user list and activity feeds. Their aggregates scan whole
+  tables; on the snapshot those scans hold no lock a quiz submission waits on.
+
+The snapshot is refreshed when a read finds it older than `snapshot_max_age`:
+that read is served from the current copy while a background thread takes a
+new one (one at a time per process). A read that finds no snapshot, an expired
+one, or one more than MAX_STALE_FACTOR max ages old (its refreshes keep
+failing) goes to the primary read-only instead, so no request waits for a copy.
+expire() marks the snapshot stale for every worker (it touches a marker file
+next to it; a copy taken before the marker's mtime is stale), so admin writes
+that the next page load must show go through.
+
+The copy goes `pages_per_step` pages at a time with a short sleep between steps,
+like backup.py. On a rollback-journal primary the read lock is held for one step
+only, so a quiz submission waits milliseconds rather than for the whole copy; a
+write between steps restarts the copy, and after `max_restarts` restarts the rest
+is copied in one read transaction, which makes writes wait for that one copy but
+always finishes. On a WAL primary the copy runs in one read transaction and
+writers go on into the WAL. The copy is written to a temporary file and moved
+over the snapshot with os.replace(), so readers of the old snapshot are never
+blocked by a refresh.
+
+Responses of routed views say where their data came from (X-Data-Source:
+primary or snapshot) and how old it is (X-Data-Age, in seconds).
+"""
+import functools
+import glob
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_app_context
+
+from metrics import metrics
+
+PRIMARY = 'primary'
+READ_ONLY = 'readonly'
+SNAPSHOT = 'snapshot'
+# A snapshot older than this many snapshot_max_age is not served (refreshes keep failing)
+MAX_STALE_FACTOR = 10
+# How long a copy step waits before retrying a locked primary
+BUSY_RETRY_SECONDS = 0.005
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path():
+    return os.getenv("DATABASE_PATH", "codedonki.db")
+
+
+class ConnectionRouter:
+    """Routing settings and the analytics snapshot of the primary database."""
+
+    def __init__(self, readonly=True, snapshot=True, snapshot_path=None, snapshot_max_age=60,
+                 pages_per_step=1024, step_sleep_ms=5, max_restarts=10):
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.configure(readonly, snapshot, snapshot_path, snapshot_max_age, pages_per_step, step_sleep_ms,
+                       max_restarts)
+
+    def configure(self, readonly=True, snapshot=True, snapshot_path=None, snapshot_max_age=60,
+                  pages_per_step=1024, step_sleep_ms=5, max_restarts=10):
+        with self._lock:
+            self.readonly = readonly
+            self.snapshot = snapshot
+            self.snapshot_path = snapshot_path
+            self.snapshot_max_age = snapshot_max_age
+            self.pages_per_step = pages_per_step
+            self.step_sleep_ms = step_sleep_ms
+            self.max_restarts = max_restarts
+            self.counts = {"readonly": 0, "snapshot": 0, "fallbacks": 0, "refreshes": 0, "refresh_errors": 0}
+            self.last_refresh = None
+
+    def target(self):
+        """Where the current route's connections go (PRIMARY outside a routed view)."""
+        target = g.get('db_target', PRIMARY) if has_app_context() else PRIMARY
+        if target == READ_ONLY and not self.readonly:
+            return PRIMARY
+        if target == SNAPSHOT and not self.snapshot:
+            return READ_ONLY if self.readonly else PRIMARY
+        return target
+
+    # --- Snapshot ---
+    def path_for(self, db_path):
+        return self.snapshot_path or f"{os.path.splitext(db_path)[0]}-snapshot.db"
+
+    def _expired_path(self, db_path):
+        return f"{self.path_for(db_path)}.expired"
+
+    def snapshot_age(self, db_path):
+        """Seconds since the snapshot was taken, or None if there is none (or it was expired)."""
+        try:
+            taken_at = os.path.getmtime(self.path_for(db_path))
+        except OSError:
+            return None
+        try:
+            expired_at = os.path.getmtime(self._expired_path(db_path))
+        except OSError:
+            expired_at = 0
+        return max(time.time() - taken_at, 0.0) if taken_at > expired_at else None
+
+    def refresh(self, db_path=None):
+        """Copy the primary into the snapshot with the backup API. Returns the seconds taken."""
+        with self._refreshing:
+            return self._copy(db_path or database_path())
+
+    def _copy(self, db_path):
+        path = self.path_for(db_path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"  # workers may refresh at the same time
+        _remove_orphaned_copies(path)
+        started = time.time()
+        source = sqlite3.connect(f"{_file_uri(db_path)}?mode=ro", uri=True, isolation_level=None, timeout=30)
+        target = sqlite3.connect(tmp_path)
+        restarts = 0
+        last = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last
+            # A step that copied pages without getting closer to the end: another connection
+            # wrote to a rollback-journal primary, and SQLite started over (status 0 is SQLITE_OK)
+            if status == 0 and last is not None and remaining >= last:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise _TooManyRestarts()
+            last = remaining
+            if self.step_sleep_ms:
+                time.sleep(self.step_sleep_ms / 1000)
+
+        try:
+            try:
+                # The copy is disposable: no on-disk journal, no fsync
+                target.execute("PRAGMA journal_mode = MEMORY")
+                target.execute("PRAGMA synchronous = OFF")
+                if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal':
+                    # One read transaction: a consistent copy that never restarts
+                    _in_read_transaction(source, lambda: source.backup(
+                        target, pages=self.pages_per_step, progress=progress, sleep=BUSY_RETRY_SECONDS))
+                    mode = 'wal-snapshot'
+                else:
+                    try:
+                        source.backup(target, pages=self.pages_per_step, progress=progress,
+                                      sleep=BUSY_RETRY_SECONDS)
+                        mode = 'stepped'
+                    except _TooManyRestarts:
+                        # Writes keep coming: copy the rest in one go, so the refresh always finishes
+                        _in_read_transaction(source, lambda: source.backup(target, pages=-1))
+                        mode = 'stepped-then-locked'
+            finally:
+                target.close()
+                source.close()
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        os.utime(tmp_path, (started, started))
+        os.replace(tmp_path, path)
+        seconds = time.time() - started
+        with self._lock:
+            self.counts["refreshes"] += 1
+            self.last_refresh = {"at": started, "seconds": round(seconds, 4), "mode": mode,
+                                 "restarts": restarts, "bytes": os.path.getsize(path)}
+        metrics.increment('db_snapshot_refreshes_total')
+        return seconds
+
+    def _refresh_in_background(self, db_path):
+        if not self._refreshing.acquire(blocking=False):
+            return  # already being refreshed
+
+        def run():
+            try:
+                self._copy(db_path)
+            except Exception as e:
+                self._refresh_failed(e)
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name='db-snapshot-refresh', daemon=True).start()
+
+    def _refresh_failed(self, error):
+        print(f"❌ Analytics snapshot refresh failed: {error}")
+        with self._lock:
+            self.counts["refresh_errors"] += 1
+
+    def expire(self, db_path=None):
+        """Make every worker take a new snapshot, reading the primary until it has one."""
+        marker = self._expired_path(db_path or database_path())
+        try:
+            with open(marker, 'a'):
+                pass
+            os.utime(marker, None)
+        except OSError:
+            pass
+
+    def snapshot_source(self, db_path):
+        """(path, age in seconds) of a snapshot to read, or None to read the primary instead."""
+        age = self.snapshot_age(db_path)
+        if age is None or age > self.snapshot_max_age:
+            self._refresh_in_background(db_path)
+        if age is None or age > self.snapshot_max_age * MAX_STALE_FACTOR:
+            return None
+        return self.path_for(db_path), age
+
+    def record(self, target, fallback=False):
+        with self._lock:
+            self.counts[target] += 1
+            if fallback:
+                self.counts["fallbacks"] += 1
+
+    def stats(self):
+        db_path = database_path()
+        with self._lock:
+            counts = dict(self.counts)
+            last_refresh = dict(self.last_refresh) if self.last_refresh else None
+        age = self.snapshot_age(db_path) if self.snapshot else None
+        return dict(counts, readonly_enabled=self.readonly, snapshot_enabled=self.snapshot,
+                    snapshot_path=self.path_for(db_path), snapshot_max_age=self.snapshot_max_age,
+                    snapshot_age=round(age, 1) if age is not None else None, last_refresh=last_refresh)
+
+
+def _file_uri(path):
+    return pathlib.Path(path).resolve().as_uri()
+
+
+def _in_read_transaction(conn, func):
+    conn.execute("BEGIN")
+    try:
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        return func()
+    finally:
+        conn.execute("COMMIT")
+
+
+def _remove_orphaned_copies(path):
+    """Delete the temporary copies of workers that died while refreshing the snapshot."""
+    for tmp_path in glob.glob(f"{glob.escape(path)}.*.tmp"):
+        try:
+            os.kill(int(tmp_path.rsplit('.', 2)[-2]), 0)
+        except ValueError:
+            continue
+        except ProcessLookupError:
+            _remove(tmp_path)
+        except OSError:
+            pass    # alive, but another user's
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def open_connection(db_path, target, factory):
+    """sqlite3 connection for `target` (see core.get_db_connection), recording its source and age on g."""
+    source, age = PRIMARY, 0.0
+    if target == SNAPSHOT:
+        snapshot = router.snapshot_source(db_path)
+        if snapshot:
+            db_path, age = snapshot
+            source = SNAPSHOT
+        router.record(SNAPSHOT, fallback=snapshot is None)
+    elif target == READ_ONLY:
+        router.record(READ_ONLY)
+    if target == PRIMARY:
+        conn = sqlite3.connect(db_path, factory=factory)
+    else:
+        conn = sqlite3.connect(f"{_file_uri(db_path)}?mode=ro", uri=True, factory=factory)
+        conn.execute("PRAGMA query_only = ON")
+    if has_app_context():
+        # The oldest data a response is built from is what it reports
+        g.db_source = SNAPSHOT if SNAPSHOT in (source, g.get('db_source')) else source
+        g.db_age = max(age, g.get('db_age', 0.0))
+    return conn
+
+
+def db_route(target):
+    """Send the view's get_db_connection() calls to `target` (READ_ONLY or SNAPSHOT) and
+    report the data's source and age in X-Data-Source / X-Data-Age."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            previous = g.get('db_target', PRIMARY)
+            g.db_target = target
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            finally:
+                g.db_target = previous
+            if 'db_source' in g:
+                response.headers['X-Data-Source'] = g.db_source
+                response.headers['X-Data-Age'] = str(int(g.db_age))
+            return response
+        return wrapper
+    return decorator
+
+
+router = ConnectionRouter()
@@ -0,0 +1,284 @@
+"""Pub/sub bus behind the Server-Sent Events stream.
+
+Grading routes publish XP, rank and badge changes here after they commit, and
+each open /api/events/stream connection holds one Subscriber. Every subscriber
+has a bounded queue: when a slow client falls behind, its oldest events are
+dropped (and counted) instead of letting the queue grow without limit. Events
+are either addressed to one user or broadcast to everyone.
+
+With a path (SHARED_CACHE_PATH) every event is also appended to a SQLite table
+that all gunicorn workers open. A relay thread in each worker that holds open
+streams polls the table and hands other workers' events to its subscribers, so
+a stream sees every event whichever worker handled the write. Without a path
+the bus is process-local, which is what the single-process dev server needs.
+
+A stream served by the WSGI route holds a worker thread for as long as it is
+open, so at most max_thread_streams of them are allowed per process; the ASGI
+stream (asgi.py) holds no thread and only counts against max_connections.
+"""
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+# Shared events older than this are pruned; a relay that falls further behind skips them
+RETENTION_SECONDS = 60
+# Shared events are pruned every this many publishes
+PRUNE_EVERY = 100
+# A worker's listener count is refreshed this often; older counts are taken as a dead worker's
+LISTENER_REFRESH_SECONDS = 30
+
+
+class Subscriber:
+    """One SSE connection's queue of pending events."""
+
+    def __init__(self, user_id, queue_size, holds_thread=False):
+        self.user_id = user_id
+        self.holds_thread = holds_thread
+        self.dropped = 0
+        self._queue = deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        # Optional callable run after each put; the ASGI stream uses it to wake its event loop
+        self.on_put = None
+
+    def put(self, event):
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+                metrics.increment('sse_events_dropped_total', event['event'])
+            self._queue.append(event)
+            self._cond.notify()
+        if self.on_put is not None:
+            self.on_put()
+
+    def get(self, timeout):
+        """Wait up to timeout seconds and return every queued event (possibly none)."""
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+
+class EventBus:
+    """Thread-safe fan-out of events to connected subscribers, across workers when a path is set."""
+
+    def __init__(self, queue_size=100, max_connections=200, max_thread_streams=4, path=None, poll_seconds=0.25):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = threading.local()
+        self._ids = itertools.count(1)
+        self._relay = None
+        self._relay_pid = None
+        self.published = 0
+        self.relayed = 0
+        self.configure(queue_size, max_connections, max_thread_streams, path, poll_seconds)
+
+    def configure(self, queue_size, max_connections, max_thread_streams=4, path=None, poll_seconds=0.25):
+        with self._lock:
+            self.queue_size = queue_size
+            self.max_connections = max_connections
+            self.max_thread_streams = max_thread_streams
+            self.path = path
+            self.poll_seconds = poll_seconds
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    published_at REAL NOT NULL,
+                    pid INTEGER NOT NULL,
+                    user_id INTEGER,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS event_listeners (
+                    pid INTEGER PRIMARY KEY,
+                    connections INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._thread, 'conn', None)
+        # A connection must not cross a fork: reopen in each worker process
+        if conn is None or getattr(self._thread, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._thread.conn = conn
+            self._thread.pid = os.getpid()
+        return conn
+
+    def subscribe(self, user_id, holds_thread=False):
+        """Register a connection. Returns None when max_connections is reached, or for a
+        connection that holds a worker thread (holds_thread), when max_thread_streams is."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_connections or (
+                    holds_thread and sum(s.holds_thread for s in self._subscribers) >= self.max_thread_streams):
+                metrics.increment('sse_rejected_total')
+                return None
+            subscriber = Subscriber(user_id, self.queue_size, holds_thread)
+            self._subscribers.add(subscriber)
+            connections = len(self._subscribers)
+            metrics.set_gauge('sse_connections', connections)
+            if self.path:
+                self._start_relay()
+                self._wakeup.notify_all()
+        if self.path:
+            self._record_listeners(connections)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            connections = len(self._subscribers)
+            metrics.set_gauge('sse_connections', connections)
+        if self.path:
+            self._record_listeners(connections)
+
+    def _record_listeners(self, connections):
+        """Publish this worker's open stream count for has_subscribers() in the other workers."""
+        try:
+            conn = self._connect()
+            if connections:
+                conn.execute(
+                    """
+                    INSERT INTO event_listeners (pid, connections, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(pid) DO UPDATE SET connections = excluded.connections,
+                        updated_at = excluded.updated_at
+                    """, (os.getpid(), connections, time.time())
+                )
+            else:
+                conn.execute("DELETE FROM event_listeners WHERE pid = ?", (os.getpid(),))
+        except sqlite3.Error as e:
+            print(f"❌ WARNING: Event listener update failed: {e}")
+
+    def has_subscribers(self, user_id=None):
+        """True if anyone (or, with user_id, that user) is listening. With a path, any open
+        stream in any worker counts, whoever it belongs to."""
+        with self._lock:
+            if user_id is None and self._subscribers:
+                return True
+            if any(s.user_id == user_id for s in self._subscribers):
+                return True
+        if not self.path:
+            return False
+        try:
+            row = self._connect().execute(
+                "SELECT 1 FROM event_listeners WHERE connections > 0 AND updated_at > ? LIMIT 1",
+                (time.time() - 2 * LISTENER_REFRESH_SECONDS,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"❌ WARNING: Event listener read failed: {e}")
+            return True
+        return row is not None
+
+    def publish(self, event_type, data, user_id=None):
+        """Queue an event for one user's connections, or for everyone when user_id is None.
+        Returns how many of this worker's connections it was queued for."""
+        event_id = None
+        if self.path:
+            try:
+                conn = self._connect()
+                now = time.time()
+                event_id = conn.execute(
+                    "INSERT INTO events (published_at, pid, user_id, event, data) VALUES (?, ?, ?, ?, ?)",
+                    (now, os.getpid(), user_id, event_type, json.dumps(data))
+                ).lastrowid
+                if event_id % PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM events WHERE published_at < ?", (now - RETENTION_SECONDS,))
+            except sqlite3.Error as e:
+                print(f"❌ WARNING: Shared event publish failed for {event_type}: {e}")
+        with self._lock:
+            # Shared events keep their row id so every worker sends the same SSE id
+            event = {"id": event_id or next(self._ids), "event": event_type, "data": data}
+            self.published += 1
+        metrics.increment('sse_events_published_total', event_type)
+        return self._deliver(event, user_id)
+
+    def _deliver(self, event, user_id):
+        with self._lock:
+            targets = [s for s in self._subscribers if user_id is None or s.user_id == user_id]
+        for subscriber in targets:
+            subscriber.put(event)
+        return len(targets)
+
+    def _start_relay(self):
+        # Caller holds self._lock; a relay thread does not survive a fork, so start one per process
+        if self._relay is not None and self._relay.is_alive() and self._relay_pid == os.getpid():
+            return
+        self._relay = threading.Thread(target=self._run_relay, name='sse-relay', daemon=True)
+        self._relay_pid = os.getpid()
+        self._relay.start()
+
+    def _run_relay(self):
+        """Hand events published by other workers to this worker's subscribers."""
+        last_id = None
+        refreshed = time.monotonic()
+        while True:
+            with self._lock:
+                while not self._subscribers:
+                    last_id = None      # nobody listening: skip whatever is published meanwhile
+                    self._wakeup.wait()
+                connections = len(self._subscribers)
+            try:
+                conn = self._connect()
+                if last_id is None:
+                    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT id, pid, user_id, event, data FROM events WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+                if rows:
+                    last_id = rows[-1][0]
+            except sqlite3.Error as e:
+                print(f"❌ WARNING: Shared event relay failed: {e}")
+                rows = []
+            for event_id, pid, user_id, event_type, data in rows:
+                if pid == os.getpid():
+                    continue    # publish() already delivered this worker's own events
+                self._deliver({"id": event_id, "event": event_type, "data": json.loads(data)}, user_id)
+                with self._lock:
+                    self.relayed += 1
+            if time.monotonic() - refreshed > LISTENER_REFRESH_SECONDS:
+                self._record_listeners(connections)
+                refreshed = time.monotonic()
+            time.sleep(self.poll_seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": 'sqlite' if self.path else 'memory',
+                "connections": len(self._subscribers),
+                "thread_streams": sum(s.holds_thread for s in self._subscribers),
+                "max_connections": self.max_connections,
+                "max_thread_streams": self.max_thread_streams,
+                "queue_size": self.queue_size,
+                "published": self.published,
+                "relayed": self.relayed,
+                "dropped": sum(s.dropped for s in self._subscribers),
+            }
+
+
+def format_sse(event):
+    """Serialize an event in the text/event-stream wire format."""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+bus = EventBus()
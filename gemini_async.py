@@ -0,0 +1,57 @@
+"""Async Gemini client used by llm.GeminiProvider in the ASGI serving mode (asgi.py).
+
+Calls the Gemini REST API (models/<model>:generateContent) over one shared
+aiohttp session, so hundreds of hint requests can wait on the model from a
+single event loop without holding a thread each. Concurrency caps, timeouts
+and metrics are applied by the provider layer in llm.py.
+"""
+import aiohttp
+
+DEFAULT_ENDPOINT = 'https://generativelanguage.googleapis.com'
+
+
+class AsyncGeminiClient:
+    """Minimal async generateContent client with connection reuse."""
+
+    def __init__(self, api_key=None, endpoint=None, max_connections=256, timeout=30.0):
+        self.api_key = api_key
+        self.endpoint = (endpoint or DEFAULT_ENDPOINT).rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # Created on first use so it binds to the server's running event loop
+        self._session = None
+
+    def _ensure_session(self):
+        # aiohttp rather than httpx: httpcore's pool bookkeeping grows with the number of
+        # open connections and became the bottleneck at a few hundred concurrent calls
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def generate(self, model, contents):
+        """Send `contents` (a list of prompt strings) to `model` and return the reply text."""
+        self._ensure_session()
+        async with self._session.post(
+            f"{self.endpoint}/v1beta/models/{model}:generateContent",
+            params={"key": self.api_key},
+            json={"contents": [{"role": "user", "parts": [{"text": text} for text in contents]}]},
+        ) as resp:
+            resp.raise_for_status()
+            return extract_response_text(await resp.json())
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def extract_response_text(payload):
+    """Text of the first candidate in a REST generateContent response, or None."""
+    for candidate in payload.get('candidates') or []:
+        parts = (candidate.get('content') or {}).get('parts') or []
+        text = ''.join(part.get('text', '') for part in parts)
+        if text:
+            return text
+    return None
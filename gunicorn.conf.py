@@ -0,0 +1,37 @@
+"""gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:application`.
+
+Every setting can be overridden from the environment (see env.template).
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+# Threads per worker: AI requests wait on Gemini and SSE streams hold a thread each
+worker_class = 'gthread'
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Live event streams may take at most half of them (see events.py)
+os.environ.setdefault("SSE_MAX_WSGI_STREAMS", str(max(threads // 2, 1)))
+# Longer than LLM_TIMEOUT_SECONDS so a slow model call is not killed mid-request
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+# Each worker builds its own app (SQLite connections, thread pools); nothing is shared across the fork
+preload_app = False
+chdir = ROOT
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+# Workers must share caches, idempotency keys, live events and rate limits; these defaults apply to every worker
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(ROOT, "cache", "shared_cache.db"))
+os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+
+
+def on_starting(server):
+    """Apply the schema and migrations once, in a child process, before workers fork."""
+    subprocess.run([sys.executable, os.path.join(ROOT, 'wsgi.py')], cwd=ROOT, check=True)
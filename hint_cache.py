@@ -0,0 +1,203 @@
+"""Cache of AI hints keyed on what the student's code *means*, not its exact text.
+
+Students send near-identical wrong code to /api/hint: print(Hi), print('Hi' ),
+print ("hi"). fingerprint() tokenizes the code and drops whitespace and
+comments, abstracts string and number literals (so quoting style and values do
+not matter) and renames the student's own identifiers to placeholders, keeping
+keywords and builtins such as print and input. The topic and challenge are part
+of the key as well.
+
+The student's name is stored as a placeholder, so a hint written for one
+student can be served to another. Entries expire after a TTL and the least
+recently used entries are evicted beyond max_entries. The cache is saved to
+disk (periodically and at exit) and reloaded at startup. With a shared cache
+(shared_cache.py) hints are also written there, so a hint one worker process
+paid for is served by all of them. Hits and misses are recorded in metrics
+under the "hint" cache region. max_entries=0 turns the cache off.
+"""
+import atexit
+import builtins
+import hashlib
+import io
+import json
+import keyword
+import os
+import re
+import threading
+import time
+import tokenize
+
+from cachetools import TLRUCache
+
+from metrics import metrics
+
+NAME_PLACEHOLDER = '{student}'
+_KEPT_NAMES = set(keyword.kwlist) | set(dir(builtins))
+_SKIPPED = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+def normalize_code(code):
+    """Token sequence of `code` with layout, literals and user identifiers abstracted."""
+    tokens = []
+    names = {}
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in _SKIPPED:
+                continue
+            if tok.type == tokenize.STRING:
+                tokens.append('STR')
+            elif tok.type == tokenize.NUMBER:
+                tokens.append('NUM')
+            elif tok.type == tokenize.NAME and tok.string not in _KEPT_NAMES:
+                tokens.append(names.setdefault(tok.string, f'v{len(names)}'))
+            elif tok.type == tokenize.NEWLINE:
+                tokens.append('NL')
+            elif tok.type in (tokenize.INDENT, tokenize.DEDENT):
+                tokens.append(tokenize.tok_name[tok.type])
+            else:
+                tokens.append(tok.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Unterminated strings/brackets: keep what was tokenized and mark the break, so
+        # print("Hi and print('Hello both end up as the same broken-string shape
+        tokens.append('ERR')
+    if tokens and tokens[-1] == 'NL':
+        tokens.pop()
+    return tokens
+
+
+def fingerprint(code, topic, challenge):
+    shape = ' '.join(normalize_code(code or ''))
+    return hashlib.sha1(f"{topic}|{challenge}|{shape}".encode('utf-8')).hexdigest()
+
+
+class _CountingTLRUCache(TLRUCache):
+    """TLRUCache that counts the live entries it evicts to make room."""
+    evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+def _name_pattern(student_name):
+    """The student's name as a whole word: "Al" must not turn "Also" or "total" into placeholders.
+    Lookarounds rather than \\b, so names that start or end with punctuation still match."""
+    if not student_name or len(student_name) < 2:
+        return None
+    return re.compile(rf"(?<!\w){re.escape(student_name)}(?!\w)")
+
+
+class HintCache:
+    """Thread-safe LRU+TTL map of code fingerprint -> hint template, persisted as JSON."""
+
+    def __init__(self, max_entries=5000, ttl_seconds=7 * 24 * 3600, path=None, save_every=50):
+        self._lock = threading.Lock()
+        self.configure(max_entries, ttl_seconds, path, save_every)
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries, ttl_seconds, path=None, save_every=50, shared=None):
+        with self._lock:
+            self.shared = shared
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self.path = path
+            self.save_every = save_every
+            self._unsaved = 0
+            # Values are (template, expires_at); TLRUCache drops them once expires_at passes
+            self._entries = _CountingTLRUCache(maxsize=max(max_entries, 1), ttu=lambda _key, value, _now: value[1],
+                                      timer=time.time)
+
+    def get(self, code, topic, challenge, student_name):
+        """Cached /api/hint payload for this code shape, or None."""
+        if not self.max_entries:
+            return None
+        key = fingerprint(code, topic, challenge)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.shared is not None:
+            template = self.shared.peek('hint', key)
+            if template is not None:
+                entry = (template, time.time() + self.ttl_seconds)
+                with self._lock:
+                    self._entries[key] = entry
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.record_cache('hint', entry is not None)
+        if entry is None:
+            return None
+        return {"hint": entry[0].replace(NAME_PLACEHOLDER, student_name or 'Student')}
+
+    def put(self, code, topic, challenge, student_name, hint_text):
+        if not self.max_entries:
+            return
+        key = fingerprint(code, topic, challenge)
+        pattern = _name_pattern(student_name)
+        template = pattern.sub(NAME_PLACEHOLDER, hint_text) if pattern else hint_text
+        with self._lock:
+            self._entries[key] = (template, time.time() + self.ttl_seconds)
+            self._unsaved += 1
+            due = self.path and self._unsaved >= self.save_every
+        if self.shared is not None:
+            self.shared.set('hint', key, template, self.ttl_seconds)
+        if due:
+            self.save()
+
+    def load(self):
+        """Warm-start from self.path. Returns the number of live entries loaded."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ WARNING: Could not load hint cache from {self.path}: {e}")
+            return 0
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, template, expires_at in saved.get('entries', []):
+                if expires_at > now:
+                    self._entries[key] = (template, expires_at)
+                    loaded += 1
+        return loaded
+
+    def save(self):
+        """Atomically write the live entries to self.path."""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [[key, template, expires_at] for key, (template, expires_at) in self._entries.items()]
+            self._unsaved = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # workers may save at the same time
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"❌ WARNING: Could not save hint cache to {self.path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "ttl_seconds": self.ttl_seconds, "hits": self.hits, "misses": self.misses,
+                    "evictions": self._entries.evictions,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                    "path": self.path}
+
+
+cache = HintCache()
+atexit.register(cache.save)
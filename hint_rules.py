@@ -0,0 +1,243 @@
+"""Local mistake classifier in front of the AI hint model.
+
+Most wrong answers in the lesson games are the same handful of beginner
+mistakes. diagnose() parses the student's code with ast (and tokenize for the
+failing line) and recognises them directly:
+
+- missing or unclosed quotes, curly "smart" quotes
+- missing, unclosed or extra parentheses, Print/Input in the wrong case
+- missing colons and bad indentation in for/if blocks
+- = where == was meant (and the reverse), numbers in quotes, input() that is
+  never stored, range missing from a for loop
+
+A recognised mistake gets a targeted hint immediately; anything else returns
+None and /api/hint escalates to the cache and then the model. Answers are
+counted per rule (hint_rule_answers_total) and escalations per topic
+(hint_rule_escalations_total); stats() gives the deflection rate.
+
+    python hint_rules.py    # check that the game pages only send supported topics
+"""
+import ast
+import builtins
+import collections
+import glob
+import io
+import os
+import re
+import sys
+import threading
+import tokenize
+
+from metrics import metrics
+
+# The topic names the game pages send with /api/hint (python hint_rules.py checks them)
+SUPPORTED_TOPICS = ('print', 'variables', 'input', 'loops', 'if_statements')
+BLOCK_KEYWORDS = ('if', 'elif', 'else', 'for', 'while')
+
+Diagnosis = collections.namedtuple('Diagnosis', 'rule hint')
+
+
+def _line(code, lineno):
+    lines = code.splitlines()
+    return lines[lineno - 1] if lineno and 0 < lineno <= len(lines) else ''
+
+
+def _line_tokens(line):
+    """Token types on one source line, tolerating the error that made ast.parse fail."""
+    types = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(line).readline):
+            types.append(tok.type)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return types
+
+
+def _is_number_text(value):
+    try:
+        float(value.strip())
+        return True
+    except ValueError:
+        return False
+
+
+def diagnose_syntax_error(code, error, topic, name):
+    """Diagnosis for code that does not parse, from the SyntaxError and the failing line."""
+    msg = error.msg or ''
+    line = _line(code, error.lineno).strip()
+    keyword = line.split(' ', 1)[0].split(':', 1)[0]
+
+    if isinstance(error, IndentationError):
+        if msg.startswith('expected an indented block'):
+            return Diagnosis('missing_indent', f"{name}, the line after a colon : needs to be indented. "
+                                               "Add 4 spaces at the start of it!")
+        if msg.startswith('unexpected indent'):
+            return Diagnosis('unexpected_indent', f"{name}, this line starts with spaces it doesn't need. "
+                                                  "Only lines inside a for or if block are indented.")
+        return Diagnosis('inconsistent_indent', f"{name}, your indented lines don't line up. Use the same "
+                                                "number of spaces (4) for every line in the block.")
+    if msg.startswith('invalid character') and any(q in line for q in '“”‘’'):
+        return Diagnosis('smart_quotes', f"{name}, those are curly quotes. Type plain quotes \" or ' "
+                                         "straight from your keyboard instead.")
+    if msg.startswith(('unterminated string', 'unterminated triple-quoted string', 'EOL while scanning')):
+        return Diagnosis('unclosed_quote', f"Almost, {name}! Your text starts with a quote but never ends. "
+                                           "Close it with the same quote mark.")
+    if msg.startswith('Missing parentheses in call to'):
+        return Diagnosis('missing_parens', f"{name}, print needs parentheses: put what you want to show "
+                                           "inside print( ).")
+    if msg.endswith('was never closed'):
+        return Diagnosis('unclosed_paren', f"{name}, you opened a parenthesis ( but didn't close it. "
+                                           "Add a ) at the end!")
+    if msg.startswith('unmatched'):
+        return Diagnosis('extra_paren', f"{name}, there's an extra closing ) on that line. Count your "
+                                        "brackets so each ( has one ).")
+    if "Maybe you meant '=='" in msg:
+        if keyword in ('if', 'elif', 'while'):
+            return Diagnosis('assign_in_condition', f"{name}, to compare two values use == (two equals). "
+                                                    "A single = stores a value.")
+        return Diagnosis('reversed_assignment', f"{name}, the variable name goes on the left of =, "
+                                                "and the value on the right.")
+    if msg == "expected ':'":
+        return Diagnosis('missing_colon', f"{name}, your {keyword if keyword in BLOCK_KEYWORDS else 'block'} "
+                                          "line needs a colon : at the end.")
+    if msg.startswith('invalid syntax. Perhaps you forgot a comma'):
+        if tokenize.STRING not in _line_tokens(line):
+            return Diagnosis('missing_quotes', f"{name}, text needs to be inside quotes, like \"Hello World\", "
+                                               "so Python knows it's not code.")
+        return Diagnosis('missing_join', f"{name}, to put text and a variable together, add a + "
+                                         "between them.")
+    if keyword == 'for' and ' range ' in f" {line} ":
+        return Diagnosis('range_without_parens', f"{name}, range needs parentheses around the number, "
+                                                 "like range( ).")
+    return None
+
+
+def diagnose_tree(tree, topic, challenge, name):
+    """Diagnosis for code that parses but contains a known mistake for this topic."""
+    assigned = {node.id for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            func = node.func.id
+            if func not in assigned and not hasattr(builtins, func) and func.lower() in ('print', 'input', 'range'):
+                return Diagnosis('wrong_case', f"{name}, Python is case-sensitive: write {func.lower()} "
+                                               "in lowercase.")
+            if func == 'print':
+                for arg in node.args:
+                    # Later challenges may print a variable from an earlier step, so a bare name
+                    # only counts as missing quotes on the print topic
+                    if isinstance(arg, ast.Name) and arg.id not in assigned:
+                        if assigned:
+                            return Diagnosis('undefined_name', f"{name}, Python doesn't know '{arg.id}' yet. "
+                                                               "Check it's spelled exactly like your variable.")
+                        if topic == 'print':
+                            return Diagnosis('missing_quotes', f"{name}, put your text inside quotes, like "
+                                                               "\"Hi!\", so Python knows it's not a variable.")
+                    if (topic == 'print' and challenge == 2 and isinstance(arg, ast.Constant)
+                            and isinstance(arg.value, str) and _is_number_text(arg.value)):
+                        return Diagnosis('quoted_number', f"{name}, numbers don't need quotes. "
+                                                          "Try it without them!")
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            call = node.value
+            if isinstance(call.func, ast.Name) and call.func.id == 'input' and topic == 'input':
+                return Diagnosis('input_not_stored', f"{name}, save the answer in a variable: put a name "
+                                                     "and = before input( ).")
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Compare) and topic == 'variables':
+            if any(isinstance(op, ast.Eq) for op in node.value.ops):
+                return Diagnosis('compare_instead_of_assign', f"{name}, == compares values. To store a value "
+                                                              "in a variable use a single =.")
+        if isinstance(node, ast.Assign) and topic == 'variables':
+            value = node.value
+            if challenge == 2 and isinstance(value, ast.Name) and value.id not in assigned:
+                return Diagnosis('missing_quotes', f"{name}, text needs quotes: put quotes around "
+                                                   "the value after =.")
+            if (challenge == 1 and isinstance(value, ast.Constant) and isinstance(value.value, str)
+                    and _is_number_text(value.value)):
+                return Diagnosis('quoted_number', f"{name}, numbers are stored without quotes. "
+                                                  "Remove them!")
+        if isinstance(node, ast.For) and isinstance(node.iter, ast.Constant) and isinstance(node.iter.value, int):
+            return Diagnosis('range_missing', f"{name}, to repeat a number of times, loop over range( ) "
+                                              "with your number inside.")
+    return None
+
+
+class MistakeClassifier:
+    """diagnose() plus answered/escalated counts for the deflection rate."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.answered = collections.Counter()
+        self.escalated = collections.Counter()
+
+    def configure(self, enabled=True):
+        self.enabled = enabled
+
+    def diagnose(self, code, topic, challenge, student_name):
+        """Diagnosis for a recognised mistake, or None to escalate to the model."""
+        if not self.enabled:
+            return None
+        diagnosis = None
+        if topic in SUPPORTED_TOPICS:
+            name = student_name or 'Student'
+            if not code:
+                diagnosis = Diagnosis('empty', f"Hey {name}! Type your code in the editor first, "
+                                               "then I can help you with it.")
+            else:
+                try:
+                    tree = ast.parse(code)
+                except SyntaxError as e:
+                    diagnosis = diagnose_syntax_error(code, e, topic, name)
+                except (ValueError, RecursionError, MemoryError):
+                    diagnosis = None  # null bytes, or nesting too deep for the parser
+                else:
+                    diagnosis = diagnose_tree(tree, topic, challenge, name)
+        with self._lock:
+            if diagnosis:
+                self.answered[diagnosis.rule] += 1
+            else:
+                self.escalated[topic] += 1
+        if diagnosis:
+            metrics.increment('hint_rule_answers_total', diagnosis.rule)
+        else:
+            metrics.increment('hint_rule_escalations_total', str(topic))
+        return diagnosis
+
+    def stats(self):
+        with self._lock:
+            answered = sum(self.answered.values())
+            total = answered + sum(self.escalated.values())
+            return {"enabled": self.enabled, "answered": answered, "escalated": total - answered,
+                    "deflection_rate": round(answered / total, 4) if total else 0.0,
+                    "by_rule": dict(self.answered), "escalated_by_topic": dict(self.escalated)}
+
+
+classifier = MistakeClassifier()
+
+
+def game_topics(root=None):
+    """{page: set of topics} sent with /api/hint by the game pages in `root` (the repository)."""
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    topics = {}
+    for path in sorted(glob.glob(os.path.join(root, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            found = set(re.findall(r"\btopic:\s*['\"](\w+)['\"]", f.read()))
+        if found:
+            topics[os.path.basename(path)] = found
+    return topics
+
+
+def main():
+    unsupported = 0
+    for page, topics in game_topics().items():
+        for topic in sorted(topics):
+            ok = topic in SUPPORTED_TOPICS
+            unsupported += not ok
+            print(f"{'[INFO]' if ok else '❌'} {page}: topic '{topic}'"
+                  f"{'' if ok else ' is not in SUPPORTED_TOPICS, so its hints always go to the model'}")
+    return 1 if unsupported else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""Idempotency-Key support for endpoints that must not run twice.
+
+A client sends the same Idempotency-Key header on every retry of one logical
+request. The first request runs normally and its response is stored. Retries
+replay that stored response without touching the database, and a retry that
+arrives while the first attempt is still running waits for its result. Stored
+results expire after a TTL, and the store is bounded (oldest entries evicted).
+
+With a path (SHARED_CACHE_PATH) the records live in a SQLite table that every
+gunicorn worker opens, and a key is claimed by inserting its row: the UNIQUE
+scope lets exactly one worker run the request, wherever the retry lands.
+Without a path the store is process-local, which is what the single-process
+dev server needs.
+"""
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, make_response, request
+
+from metrics import metrics
+
+_PENDING = object()
+# A claim whose worker died is given up after this long; longer than gunicorn's request timeout
+PENDING_TTL_SECONDS = 120
+# How often a retry re-reads a claim held by another worker
+POLL_SECONDS = 0.05
+# Expired and excess shared records are pruned every this many stored responses
+PRUNE_EVERY = 100
+
+
+class IdempotencyStore:
+    """Bounded, expiring map of idempotency scope -> stored response, shared through SQLite when a path is set."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, path=None):
+        self._entries = OrderedDict()   # scope -> (fingerprint, expires_at, stored or _PENDING)
+        self._cond = threading.Condition()
+        self._thread = threading.local()
+        self._finished = 0
+        self.configure(max_entries, ttl_seconds, path)
+
+    def configure(self, max_entries, ttl_seconds, path=None):
+        with self._cond:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self.path = path
+            self._entries.clear()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # status is NULL while the first request is still running
+            self._connect().execute(
+                """
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    scope TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    status INTEGER,
+                    mimetype TEXT,
+                    body BLOB
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._thread, 'conn', None)
+        # A connection must not cross a fork: reopen in each worker process
+        if conn is None or getattr(self._thread, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._thread.conn = conn
+            self._thread.pid = os.getpid()
+        return conn
+
+    def _purge(self, now):
+        while self._entries:
+            scope, (_, expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def begin(self, scope, fingerprint, wait_seconds=10.0):
+        """Claim a scope. Returns ('new', None), ('replay', stored), ('mismatch', None) or ('busy', None)."""
+        if self.path:
+            return self._begin_shared(scope, fingerprint, wait_seconds)
+        deadline = time.monotonic() + wait_seconds
+        with self._cond:
+            while True:
+                now = time.time()
+                self._purge(now)
+                entry = self._entries.get(scope)
+                if entry is None:
+                    self._entries[scope] = (fingerprint, now + self.ttl_seconds, _PENDING)
+                    return 'new', None
+                stored_fingerprint, _, stored = entry
+                if stored_fingerprint != fingerprint:
+                    return 'mismatch', None
+                if stored is not _PENDING:
+                    return 'replay', stored
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return 'busy', None
+                self._cond.wait(remaining)
+
+    def _begin_shared(self, scope, fingerprint, wait_seconds):
+        deadline = time.monotonic() + wait_seconds
+        try:
+            conn = self._connect()
+            while True:
+                now = time.time()
+                conn.execute("DELETE FROM idempotency_keys WHERE scope = ? AND expires_at <= ?", (scope, now))
+                claimed = conn.execute(
+                    """
+                    INSERT INTO idempotency_keys (scope, fingerprint, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(scope) DO NOTHING
+                    """, (scope, fingerprint, now + PENDING_TTL_SECONDS)
+                ).rowcount
+                if claimed:
+                    return 'new', None
+                row = conn.execute(
+                    "SELECT fingerprint, status, body, mimetype FROM idempotency_keys WHERE scope = ?", (scope,)
+                ).fetchone()
+                if row is None:
+                    continue    # released or expired since the insert; claim it again
+                stored_fingerprint, status, body, mimetype = row
+                if stored_fingerprint != fingerprint:
+                    return 'mismatch', None
+                if status is not None:
+                    return 'replay', (bytes(body), status, mimetype)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return 'busy', None
+                # finish()/release() in this process wake the wait early; other workers are polled
+                with self._cond:
+                    self._cond.wait(min(POLL_SECONDS, remaining))
+        except sqlite3.Error as e:
+            # Run the request unprotected rather than fail it; the database still rejects exact duplicates
+            print(f"❌ WARNING: Idempotency store read failed for {scope}: {e}")
+            return 'new', None
+
+    def finish(self, scope, fingerprint, stored):
+        if self.path:
+            body, status, mimetype = stored
+            try:
+                conn = self._connect()
+                conn.execute(
+                    """
+                    UPDATE idempotency_keys SET expires_at = ?, status = ?, mimetype = ?, body = ?
+                    WHERE scope = ? AND fingerprint = ?
+                    """, (time.time() + self.ttl_seconds, status, mimetype, body, scope, fingerprint)
+                )
+                with self._cond:
+                    self._finished += 1
+                    prune = self._finished % PRUNE_EVERY == 0
+                    self._cond.notify_all()
+                if prune:
+                    self._prune(conn)
+            except sqlite3.Error as e:
+                print(f"❌ WARNING: Idempotency store write failed for {scope}: {e}")
+            return
+        with self._cond:
+            self._entries[scope] = (fingerprint, time.time() + self.ttl_seconds, stored)
+            self._entries.move_to_end(scope)
+            self._purge(time.time())
+            self._cond.notify_all()
+
+    def _prune(self, conn):
+        """Drop expired shared records and the oldest stored ones beyond max_entries."""
+        conn.execute(
+            """
+            DELETE FROM idempotency_keys WHERE expires_at <= ? OR scope IN (
+                SELECT scope FROM idempotency_keys WHERE status IS NOT NULL
+                ORDER BY expires_at DESC LIMIT -1 OFFSET ?)
+            """, (time.time(), self.max_entries)
+        )
+
+    def release(self, scope):
+        """Forget a pending scope (the request failed) so a retry can run it again."""
+        if self.path:
+            try:
+                self._connect().execute("DELETE FROM idempotency_keys WHERE scope = ? AND status IS NULL", (scope,))
+            except sqlite3.Error as e:
+                print(f"❌ WARNING: Idempotency store release failed for {scope}: {e}")
+            with self._cond:
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._entries.pop(scope, None)
+            self._cond.notify_all()
+
+    def stats(self):
+        config = {"backend": 'sqlite' if self.path else 'memory',
+                  "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+        if self.path:
+            entries, pending = self._connect().execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(status) FROM idempotency_keys WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+            return dict(config, entries=entries, pending=pending)
+        with self._cond:
+            pending = sum(1 for _, _, stored in self._entries.values() if stored is _PENDING)
+            return dict(config, entries=len(self._entries), pending=pending)
+
+
+store = IdempotencyStore()
+
+
+def idempotent(f):
+    """Replay the stored response for repeated Idempotency-Key headers.
+
+    Must be applied below @login_required so request.current_user is set; keys
+    are scoped per user and endpoint. Requests without the header run as usual.
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": "Idempotency-Key is too long"}), 400
+
+        user = getattr(request, 'current_user', None) or {}
+        scope = f"{request.endpoint}:{user.get('user_id')}:{key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        state, stored = store.begin(scope, fingerprint)
+        if state == 'replay':
+            metrics.increment('idempotent_replays_total', request.endpoint)
+            body, status, mimetype = stored
+            response = make_response(body, status)
+            response.mimetype = mimetype
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if state == 'mismatch':
+            metrics.increment('idempotent_conflicts_total', request.endpoint)
+            return jsonify({"error": "Idempotency-Key was already used with a different request body"}), 409
+        if state == 'busy':
+            metrics.increment('idempotent_conflicts_total', request.endpoint)
+            return jsonify({"error": "A request with this Idempotency-Key is still being processed"}), 409
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            store.release(scope)
+            raise
+        if response.status_code >= 500:
+            # Server errors are not final; let the client's retry run the request again
+            store.release(scope)
+        else:
+            store.finish(scope, fingerprint,
+                         (response.get_data(), response.status_code, response.mimetype))
+        return response
+    return decorated_function
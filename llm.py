@@ -0,0 +1,321 @@
+"""LLM provider layer behind the AI endpoints (/api/hint, /api/dialogue, /api/ai-suggestion).
+
+The endpoints plan a call (endpoint name, default model, prompt contents) and
+hand it to the active provider, chosen with LLM_PROVIDER:
+
+- gemini  Google Gemini (default). google.generativeai is imported on first
+          use; async calls go through gemini_async over one shared session.
+- stub    Deterministic local replies after LLM_STUB_LATENCY_MS, no network.
+          Makes the AI endpoints load-testable offline.
+- record  Calls Gemini and appends every reply to the LLM_CASSETTE file.
+- replay  Answers only from LLM_CASSETTE; unknown prompts fail (the endpoint
+          then returns its fallback text) and count as replay misses.
+
+Every provider applies per-endpoint model overrides (LLM_MODEL_HINT,
+LLM_MODEL_DIALOGUE, LLM_MODEL_AI_SUGGESTION), a call timeout and a cap on
+concurrent calls (LLM_MAX_CONCURRENCY threads in WSGI mode,
+ASGI_AI_MAX_CONCURRENCY tasks in the ASGI mode), and records latency per
+endpoint in metrics.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from metrics import metrics
+
+DEFAULT_CASSETTE = os.path.join('logs', 'llm_cassette.jsonl')
+
+
+class LLMError(Exception):
+    """The provider could not produce a reply (busy, replay miss, upstream failure)."""
+
+
+def extract_text(resp):
+    """Text of a google.generativeai generate_content response, or None if it has none."""
+    text = getattr(resp, 'text', None)
+    if not text:
+        try:
+            candidates = getattr(resp, 'candidates', [])
+            if candidates:
+                parts = candidates[0].content.parts
+                if parts:
+                    text = getattr(parts[0], 'text', None)
+        except Exception:
+            text = None
+    return text
+
+
+def prompt_key(endpoint, contents):
+    """Stable cassette key for one call. The model is left out so replays survive model swaps."""
+    return hashlib.sha256(json.dumps([endpoint, list(contents)]).encode('utf-8')).hexdigest()
+
+
+class LLMProvider:
+    """Base provider: model overrides, concurrency cap and metrics around _generate/_agenerate."""
+
+    name = 'base'
+
+    def __init__(self, max_concurrency=32, async_max_concurrency=256, timeout=30.0, queue_timeout=10.0):
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_concurrency = max_concurrency
+        self.async_max_concurrency = async_max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = None  # created inside the running event loop
+
+    @property
+    def available(self):
+        """False when the AI endpoints should skip the call and use their fallback text."""
+        return True
+
+    @staticmethod
+    def model_for(endpoint, default):
+        return os.getenv(f"LLM_MODEL_{endpoint.upper()}") or default
+
+    def generate(self, endpoint, model, contents):
+        """Reply text for `contents` (a list of prompt strings). Raises LLMError or upstream errors."""
+        model = self.model_for(endpoint, model)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            metrics.increment('llm_queue_timeouts_total', endpoint)
+            raise LLMError(f"no {self.name} slot free after {self.queue_timeout}s")
+        start = time.perf_counter()
+        ok = False
+        try:
+            text = self._generate(endpoint, model, contents)
+            ok = True
+            return text
+        finally:
+            self._slots.release()
+            metrics.observe_gemini(endpoint, time.perf_counter() - start, ok)
+
+    async def agenerate(self, endpoint, model, contents):
+        """Async generate() for the ASGI mode; waits for a slot without blocking the loop."""
+        import asyncio  # only the ASGI server needs it; keeps WSGI worker startup fast
+        model = self.model_for(endpoint, model)
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.async_max_concurrency)
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.increment('llm_queue_timeouts_total', endpoint)
+            raise LLMError(f"no {self.name} slot free after {self.queue_timeout}s")
+        start = time.perf_counter()
+        ok = False
+        try:
+            text = await asyncio.wait_for(self._agenerate(endpoint, model, contents), self.timeout)
+            ok = True
+            return text
+        finally:
+            self._async_slots.release()
+            metrics.observe_gemini(endpoint, time.perf_counter() - start, ok)
+
+    def _generate(self, endpoint, model, contents):
+        raise NotImplementedError
+
+    async def _agenerate(self, endpoint, model, contents):
+        import asyncio
+        return await asyncio.to_thread(self._generate, endpoint, model, contents)
+
+    async def aclose(self):
+        pass
+
+    def stats(self):
+        return {"provider": self.name, "max_concurrency": self.max_concurrency,
+                "async_max_concurrency": self.async_max_concurrency, "timeout_seconds": self.timeout}
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google.generativeai (sync) and gemini_async (async)."""
+
+    name = 'gemini'
+
+    def __init__(self, api_key=None, endpoint=None, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+        self._async_client = None
+
+    @property
+    def available(self):
+        return bool(self.api_key)
+
+    def _model(self, name):
+        """GenerativeModel per model name, created once and reused across requests."""
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                try:
+                    if self.endpoint:
+                        # e.g. a local stub model server for load tests (see benchmarks/ai_serving.py)
+                        genai.configure(api_key=self.api_key, transport='rest',
+                                        client_options={"api_endpoint": self.endpoint})
+                    else:
+                        genai.configure(api_key=self.api_key)
+                except Exception as e:
+                    print(f"❌ WARNING: Could not configure Gemini AI. API key missing or invalid. {e}")
+                self._genai = genai
+            if name not in self._models:
+                self._models[name] = self._genai.GenerativeModel(name)
+            return self._models[name]
+
+    def _generate(self, endpoint, model, contents):
+        resp = self._model(model).generate_content(contents, request_options={"timeout": self.timeout})
+        return extract_text(resp)
+
+    async def _agenerate(self, endpoint, model, contents):
+        if self._async_client is None:
+            from gemini_async import AsyncGeminiClient
+            self._async_client = AsyncGeminiClient(self.api_key, self.endpoint,
+                                                   max_connections=self.async_max_concurrency,
+                                                   timeout=self.timeout)
+        return await self._async_client.generate(model, contents)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
+
+class StubProvider(LLMProvider):
+    """Deterministic offline replies: the same prompt always gets the same text."""
+
+    name = 'stub'
+
+    def __init__(self, latency_seconds=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_seconds = latency_seconds
+
+    @staticmethod
+    def reply(endpoint, model, contents):
+        return f"Stub reply from {model} ({prompt_key(endpoint, contents)[:8]})"
+
+    def _generate(self, endpoint, model, contents):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.reply(endpoint, model, contents)
+
+    async def _agenerate(self, endpoint, model, contents):
+        if self.latency_seconds:
+            import asyncio
+            await asyncio.sleep(self.latency_seconds)
+        return self.reply(endpoint, model, contents)
+
+
+class Cassette:
+    """JSON-lines file of recorded calls: one {key, endpoint, model, contents, text} per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._replies = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._replies[entry['key']] = entry['text']
+
+    def __len__(self):
+        return len(self._replies)
+
+    def get(self, endpoint, contents):
+        return self._replies.get(prompt_key(endpoint, contents))
+
+    def add(self, endpoint, model, contents, text):
+        key = prompt_key(endpoint, contents)
+        with self._lock:
+            if key in self._replies:
+                return
+            self._replies[key] = text
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"key": key, "endpoint": endpoint, "model": model,
+                                    "contents": list(contents), "text": text}) + '\n')
+
+
+class RecordingProvider(LLMProvider):
+    """Passes calls to another provider and records each reply in a cassette."""
+
+    name = 'record'
+
+    def __init__(self, inner, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.inner = inner
+        self.cassette = cassette
+
+    @property
+    def available(self):
+        return self.inner.available
+
+    def _generate(self, endpoint, model, contents):
+        text = self.inner._generate(endpoint, model, contents)
+        if text:
+            self.cassette.add(endpoint, model, contents, text)
+        return text
+
+    async def _agenerate(self, endpoint, model, contents):
+        text = await self.inner._agenerate(endpoint, model, contents)
+        if text:
+            self.cassette.add(endpoint, model, contents, text)
+        return text
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self):
+        return dict(super().stats(), cassette=self.cassette.path, recorded=len(self.cassette))
+
+
+class ReplayProvider(LLMProvider):
+    """Answers only from a cassette; prompts that were never recorded raise LLMError."""
+
+    name = 'replay'
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def _generate(self, endpoint, model, contents):
+        text = self.cassette.get(endpoint, contents)
+        if text is None:
+            metrics.increment('llm_replay_misses_total', endpoint)
+            raise LLMError(f"no recorded {endpoint} reply for this prompt")
+        return text
+
+    async def _agenerate(self, endpoint, model, contents):
+        return self._generate(endpoint, model, contents)
+
+    def stats(self):
+        return dict(super().stats(), cassette=self.cassette.path, recorded=len(self.cassette))
+
+
+def provider_from_env():
+    """Build the provider selected by LLM_PROVIDER and the related settings."""
+    kind = (os.getenv("LLM_PROVIDER") or 'gemini').lower()
+    limits = {
+        "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        "async_max_concurrency": int(os.getenv("ASGI_AI_MAX_CONCURRENCY", "256")),
+        "timeout": float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+        "queue_timeout": float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+    }
+    cassette_path = os.getenv("LLM_CASSETTE") or DEFAULT_CASSETTE
+
+    def gemini():
+        return GeminiProvider(api_key=os.getenv("GEMINI_API_KEY"),
+                              endpoint=os.getenv("GEMINI_API_ENDPOINT"), **limits)
+
+    if kind == 'stub':
+        return StubProvider(latency_seconds=float(os.getenv("LLM_STUB_LATENCY_MS", "0")) / 1000, **limits)
+    if kind == 'record':
+        return RecordingProvider(gemini(), Cassette(cassette_path), **limits)
+    if kind == 'replay':
+        return ReplayProvider(Cassette(cassette_path), **limits)
+    if kind != 'gemini':
+        print(f"❌ WARNING: Unknown LLM_PROVIDER '{kind}', using gemini")
+    return gemini()
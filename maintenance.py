@@ -0,0 +1,515 @@
+"""Scheduled database maintenance: planner statistics, free pages, integrity and WAL checkpoints.
+
+Nothing else collects query planner statistics for codedonki.db or gives back
+the pages that deleted users, progress resets, lessons and archived quiz
+attempts leave free. run_maintenance() runs these tasks in order, each under
+its own time budget:
+
+- analyze:            ANALYZE with PRAGMA analysis_limit, so it reads a bounded
+                      sample of every index. (PRAGMA optimize on SQLite < 3.46
+                      only looks at tables the same connection has queried,
+                      which a fresh maintenance connection has not.)
+- incremental_vacuum: PRAGMA incremental_vacuum, `vacuum_step_pages` at a time
+                      with a pause between steps. It needs auto_vacuum =
+                      INCREMENTAL: new databases are created that way (see
+                      database_schema_sqlite.sql); an existing one is converted
+                      by one VACUUM, which holds the write lock while it runs,
+                      only when convert_auto_vacuum is passed (maintenance.py
+                      run --convert-auto-vacuum, or the admin endpoint). The
+                      schedule never retries a conversion that ran over budget.
+- integrity_check:    PRAGMA quick_check, or integrity_check with integrity='full'.
+- wal_checkpoint:     PRAGMA wal_checkpoint(TRUNCATE) for every database in WAL
+                      mode: codedonki.db, the shared cache and the rate limit
+                      buckets.
+
+A task that runs past its budget is interrupted (a progress handler aborts the
+statement, which rolls back) and reported as over_budget. Each run is recorded
+in maintenance_runs (migrations/0006_maintenance_runs.sql) with per-task
+durations and details, and the EXPLAIN QUERY PLAN of the probe queries the
+migrations declare wherever the run changed it.
+
+In the app, MaintenanceScheduler checks every minute whether the clock is
+inside the maintenance window (UTC) and this worker has served fewer than
+max_requests_per_minute requests over the last check; the first worker to
+claim the window's row in maintenance_runs runs it, once per window.
+
+    python maintenance.py run [--tasks analyze,wal_checkpoint] [--budget-seconds 30] [--convert-auto-vacuum]
+    python maintenance.py list
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from metrics import metrics
+from retention import vacuum
+from schema_migrations import declared_probes, probe_plans, run_migrations
+
+load_dotenv()
+
+TASKS = ('analyze', 'incremental_vacuum', 'integrity_check', 'wal_checkpoint')
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+PROGRESS_STEPS = 1000  # VM instructions between budget checks
+# VACUUM can only be interrupted while it rebuilds the database into a temporary file, not while
+# it copies the result back (0.8s of 2.9s for a 350 MB database), so the rebuild gets this share
+VACUUM_REBUILD_SHARE = 0.25
+
+
+def database_path():
+    return os.getenv("DATABASE_PATH", "codedonki.db")
+
+
+def wal_databases():
+    """The other SQLite files the app writes in WAL mode: the shared cache and the rate limit buckets."""
+    paths = [os.getenv("SHARED_CACHE_PATH")]
+    if os.getenv("RATE_LIMIT_BACKEND", "memory") == 'sqlite':
+        paths.append(os.getenv("RATE_LIMIT_DB", os.path.join("cache", "rate_limits.db")))
+    return [p for p in paths if p]
+
+
+def _file_bytes(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+class _Budget:
+    """Interrupts the connection's statements once `seconds` have passed."""
+
+    def __init__(self, conn, seconds):
+        self.conn = conn
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds
+
+    def remaining(self):
+        return self.deadline - time.perf_counter()
+
+    def __enter__(self):
+        self.conn.set_progress_handler(lambda: 1 if time.perf_counter() > self.deadline else 0, PROGRESS_STEPS)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_progress_handler(None, 0)
+        return False
+
+
+def _interrupted(error):
+    return isinstance(error, sqlite3.OperationalError) and 'interrupted' in str(error)
+
+
+def _stat1(conn):
+    """{'table.index': stat} from sqlite_stat1 (empty before the first ANALYZE)."""
+    try:
+        return {f"{tbl}.{idx}": stat for tbl, idx, stat in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1")}
+    except sqlite3.OperationalError:
+        return {}
+
+
+def _conversion_ran_over_budget(conn):
+    """True if an earlier run's VACUUM to auto_vacuum=INCREMENTAL was interrupted by its budget."""
+    row = conn.execute(
+        """
+        SELECT 1 FROM maintenance_runs, json_each(maintenance_runs.tasks) AS task
+        WHERE json_extract(task.value, '$.task') = 'incremental_vacuum'
+          AND json_extract(task.value, '$.detail.conversion') = 'over_budget'
+        LIMIT 1
+        """
+    ).fetchone()
+    return row is not None
+
+
+# --- Tasks: each returns (status, detail) ---
+def _analyze(conn, budget, options):
+    before = _stat1(conn)
+    conn.execute(f"PRAGMA analysis_limit = {int(options['analysis_limit'])}")
+    with budget:
+        conn.execute("ANALYZE")
+    after = _stat1(conn)
+    changed = sorted(key for key, stat in after.items() if before.get(key) != stat)
+    return 'ok', {"analysis_limit": options['analysis_limit'], "first_analyze": not before,
+                  "indexes": len(after), "stats_changed": changed}
+
+
+def _incremental_vacuum(conn, budget, options, db_path):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    mode = AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 'none')
+    detail = {"auto_vacuum": mode, "free_pages_before": free_pages, "bytes_before": _file_bytes(db_path)}
+    if not free_pages:
+        return 'skipped', dict(detail, reason="no free pages")
+    if mode == 'full':
+        return 'skipped', dict(detail, reason="auto_vacuum=FULL frees pages on every commit")
+    if mode == 'none':
+        if not options['convert_auto_vacuum']:
+            return 'skipped', dict(detail, reason="auto_vacuum is NONE; incremental_vacuum has no effect "
+                                                  "(python maintenance.py run --convert-auto-vacuum converts it)")
+        if options['triggered_by'] == 'schedule' and _conversion_ran_over_budget(conn):
+            # Every night would hold the write lock for another VACUUM that cannot finish
+            return 'skipped', dict(detail, reason="an earlier VACUUM to incremental ran over budget; "
+                                                  "convert it with python maintenance.py run --convert-auto-vacuum")
+        # auto_vacuum only changes on an existing database when VACUUM rebuilds it
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        budget.deadline -= budget.remaining() * (1 - VACUUM_REBUILD_SHARE)
+        try:
+            with budget:
+                vacuum(conn, db_path)
+        except sqlite3.OperationalError as e:
+            if not _interrupted(e):
+                raise
+            return 'over_budget', dict(detail, conversion='over_budget', budget_seconds=round(budget.seconds, 3),
+                                       reason="VACUUM to incremental interrupted and rolled back")
+        detail["converted"] = True
+    else:
+        steps = 0
+        with budget:
+            while free_pages and budget.remaining() > 0:
+                try:
+                    # execute() would step the pragma once and free a single page
+                    conn.executescript(f"PRAGMA incremental_vacuum({int(options['vacuum_step_pages'])})")
+                except sqlite3.OperationalError as e:
+                    if not _interrupted(e):
+                        raise
+                    break  # this step rolled back; the earlier ones are committed
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                steps += 1
+                if free_pages and options['vacuum_pause_ms']:
+                    time.sleep(options['vacuum_pause_ms'] / 1000)
+        detail["steps"] = steps
+    detail.update(free_pages_after=conn.execute("PRAGMA freelist_count").fetchone()[0],
+                  page_size=page_size, bytes_after=_file_bytes(db_path))
+    return ('ok' if not detail["free_pages_after"] else 'over_budget'), detail
+
+
+def _integrity_check(conn, budget, options):
+    pragma = 'integrity_check' if options['integrity'] == 'full' else 'quick_check'
+    with budget:
+        rows = conn.execute(f"PRAGMA {pragma}(20)").fetchall()
+    result = '; '.join(row[0] for row in rows)
+    if result != 'ok':
+        print(f"❌ Database {pragma} failed: {result}")
+    return ('ok' if result == 'ok' else 'failed'), {"check": pragma, "result": result}
+
+
+def _wal_checkpoint(conn, budget, options, db_path):
+    databases = []
+    for path in [db_path] + list(options['wal_paths']):
+        if not os.path.exists(path):
+            continue
+        # TRUNCATE holds the write lock while it waits for readers; wait briefly, then settle for what was copied
+        target = conn if path == db_path else sqlite3.connect(path, isolation_level=None)
+        try:
+            target.execute(f"PRAGMA busy_timeout = {int(min(max(budget.remaining(), 0), 1) * 1000)}")
+            if target.execute("PRAGMA journal_mode").fetchone()[0].lower() != 'wal':
+                continue
+            wal_bytes = _file_bytes(path) - os.path.getsize(path)
+            busy, frames, copied = target.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            while busy and budget.remaining() > 0:
+                # Busy at once while another connection's autocheckpoint holds the checkpoint lock
+                time.sleep(0.05)
+                busy, frames, copied = target.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            databases.append({"path": path, "wal_bytes_before": wal_bytes, "busy": bool(busy), "frames": frames,
+                              "checkpointed": copied, "wal_bytes_after": _file_bytes(path) - os.path.getsize(path)})
+        finally:
+            if target is conn:
+                conn.execute("PRAGMA busy_timeout = 30000")
+            else:
+                target.close()
+    if not databases:
+        return 'skipped', {"reason": "no database in WAL mode"}
+    return 'ok', {"databases": databases}
+
+
+# --- Runs ---
+def run_maintenance(db_path=None, tasks=TASKS, budget_seconds=30, analysis_limit=1000, vacuum_step_pages=256,
+                    vacuum_pause_ms=20, convert_auto_vacuum=False, integrity='quick', wal_paths=None,
+                    triggered_by='cli', window_key=None, deadline=None, log=print):
+    """Run the maintenance `tasks` and record the run. Returns the run dict, or None if another
+    process already claimed `window_key`. `deadline` (time.time()) stops tasks from starting after it."""
+    db_path = db_path or database_path()
+    options = {"analysis_limit": analysis_limit, "vacuum_step_pages": vacuum_step_pages,
+               "vacuum_pause_ms": vacuum_pause_ms, "convert_auto_vacuum": convert_auto_vacuum,
+               "integrity": integrity, "wal_paths": wal_databases() if wal_paths is None else wal_paths,
+               "triggered_by": triggered_by}
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        # maintenance_runs comes with migration 0006, which the app may not have applied yet
+        run_migrations(conn)
+        claim = conn.execute("INSERT OR IGNORE INTO maintenance_runs (window_key, triggered_by, status) "
+                             "VALUES (?, ?, 'running')", (window_key, triggered_by))
+        if not claim.rowcount:
+            return None
+        run_id = claim.lastrowid
+        started = time.perf_counter()
+        probes = declared_probes()
+        plans_before = probe_plans(conn, probes)
+
+        results = []
+        for task in tasks:
+            task_started = time.perf_counter()
+            seconds = budget_seconds if deadline is None else min(budget_seconds, deadline - time.time())
+            if seconds <= 0:
+                results.append({"task": task, "status": 'skipped', "seconds": 0.0,
+                                "detail": {"reason": "maintenance window closed"}})
+                continue
+            budget = _Budget(conn, seconds)
+            try:
+                if task == 'analyze':
+                    status, detail = _analyze(conn, budget, options)
+                elif task == 'incremental_vacuum':
+                    status, detail = _incremental_vacuum(conn, budget, options, db_path)
+                elif task == 'integrity_check':
+                    status, detail = _integrity_check(conn, budget, options)
+                else:
+                    status, detail = _wal_checkpoint(conn, budget, options, db_path)
+            except sqlite3.Error as e:
+                if _interrupted(e):
+                    status, detail = 'over_budget', {"budget_seconds": round(seconds, 3),
+                                                     "reason": "interrupted and rolled back"}
+                else:
+                    status, detail = 'error', {"error": str(e)}
+            elapsed = time.perf_counter() - task_started
+            results.append({"task": task, "status": status, "seconds": round(elapsed, 3), "detail": detail})
+            metrics.increment('db_maintenance_tasks_total', f"{task}:{status}")
+            log(f"[INFO] Maintenance {task}: {status} in {elapsed:.2f}s")
+
+        plans_after = probe_plans(conn, probes)
+        planner_changes = {sql: {"before": plans_before[sql], "after": plans_after[sql]}
+                           for sql in probes if plans_before[sql] != plans_after[sql]}
+        statuses = {r["status"] for r in results}
+        status = next((s for s in ('error', 'failed', 'over_budget') if s in statuses), 'ok')
+        duration_ms = (time.perf_counter() - started) * 1000
+        conn.execute(
+            """
+            UPDATE maintenance_runs
+            SET status = ?, finished_at = CURRENT_TIMESTAMP, duration_ms = ?, tasks = ?, planner_changes = ?
+            WHERE id = ?
+            """, (status, duration_ms, json.dumps(results), json.dumps(planner_changes), run_id)
+        )
+        metrics.increment('db_maintenance_runs_total', status)
+        metrics.set_gauge('db_maintenance_last_run_seconds', round(duration_ms / 1000, 3))
+        return {"id": run_id, "window_key": window_key, "triggered_by": triggered_by, "status": status,
+                "duration_ms": round(duration_ms, 2), "tasks": results, "planner_changes": planner_changes}
+    finally:
+        conn.close()
+
+
+def recent_runs(conn, limit=20):
+    """The latest maintenance runs, newest first."""
+    rows = conn.execute(
+        """
+        SELECT id, window_key, triggered_by, status, started_at, finished_at, duration_ms, tasks, planner_changes
+        FROM maintenance_runs ORDER BY id DESC LIMIT ?
+        """, (limit,)
+    ).fetchall()
+    return [{
+        "id": r[0],
+        "window_key": r[1],
+        "triggered_by": r[2],
+        "status": r[3],
+        "started_at": r[4],
+        "finished_at": r[5],
+        "duration_ms": round(r[6], 2) if r[6] is not None else None,
+        "tasks": json.loads(r[7]) if r[7] else [],
+        "planner_changes": json.loads(r[8]) if r[8] else {},
+    } for r in rows]
+
+
+# --- Scheduler ---
+def parse_window(window):
+    """'03:00-05:00' -> ((3, 0), (5, 0)). The window may wrap past midnight."""
+    start, end = (tuple(int(part) for part in bound.strip().split(':')) for bound in window.split('-'))
+    return start, end
+
+
+class MaintenanceScheduler:
+    """Runs run_maintenance() once per daily window (UTC) when this worker is quiet."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.configure(enabled=False)
+
+    def configure(self, enabled=True, window='03:00-05:00', max_requests_per_minute=30, check_seconds=60,
+                  tasks=TASKS, **run_options):
+        """run_options are passed to run_maintenance() (budget_seconds, analysis_limit, ...)."""
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance tasks: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self.enabled = enabled
+            self.window = window
+            self.window_bounds = parse_window(window)
+            self.max_requests_per_minute = max_requests_per_minute
+            self.check_seconds = check_seconds
+            self.tasks = tuple(tasks)
+            self.run_options = run_options
+            self.counts = {"runs": 0, "deferred": 0, "claimed_elsewhere": 0, "errors": 0}
+            self.last_run = None
+            self.requests_per_minute = None
+            self._last_sample = None
+            self._claimed_window = None
+        if enabled:
+            self._start()
+
+    def current_window(self, now=None):
+        """(window_key, end as a timestamp) if `now` is inside the window, else None."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        (start_h, start_m), (end_h, end_m) = self.window_bounds
+        start = now.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+        end = now.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+        if end <= start:  # wraps past midnight
+            if now < end:
+                start -= datetime.timedelta(days=1)
+            else:
+                end += datetime.timedelta(days=1)
+        if not start <= now < end:
+            return None
+        return start.strftime('%Y-%m-%d %H:%M'), end.timestamp()
+
+    def _sample_traffic(self):
+        """Requests per minute this worker served since the previous check (None on the first)."""
+        now, total = time.monotonic(), metrics.requests_total()
+        previous, self._last_sample = self._last_sample, (now, total)
+        if previous is None or now <= previous[0]:
+            return None
+        self.requests_per_minute = round((total - previous[1]) * 60 / (now - previous[0]), 1)
+        return self.requests_per_minute
+
+    def _start(self):
+        # Workers fork after import; each process needs its own thread
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._loop, name='db-maintenance', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._wake.wait(self.check_seconds):
+            if self.enabled:
+                self.check()
+
+    def check(self):
+        """Run the window's maintenance if it is due and this worker is quiet. Returns the run or None."""
+        rate = self._sample_traffic()
+        window = self.current_window()
+        if window is None or window[0] == self._claimed_window:
+            return None
+        if rate is None or rate > self.max_requests_per_minute:
+            with self._lock:
+                self.counts["deferred"] += 1
+            return None
+        window_key, end = window
+        return self._run(triggered_by='schedule', window_key=window_key, deadline=end)
+
+    def run_now(self, tasks=None, convert_auto_vacuum=None):
+        """Start a run in the background (admin endpoint). False if one is already running here.
+        convert_auto_vacuum, when given, overrides the configured setting for this run."""
+        tasks = tuple(tasks or self.tasks)
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance tasks: {', '.join(sorted(unknown))}")
+        if self._running.locked():
+            return False
+        overrides = {} if convert_auto_vacuum is None else {"convert_auto_vacuum": bool(convert_auto_vacuum)}
+        threading.Thread(target=self._run, kwargs={"triggered_by": 'admin', "tasks": tasks, "overrides": overrides},
+                         name='db-maintenance-run', daemon=True).start()
+        return True
+
+    def _run(self, triggered_by, window_key=None, deadline=None, tasks=None, overrides=None):
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            run = run_maintenance(tasks=tasks or self.tasks, triggered_by=triggered_by, window_key=window_key,
+                                  deadline=deadline, **dict(self.run_options, **(overrides or {})))
+        except Exception as e:
+            print(f"❌ Database maintenance failed: {e}")
+            with self._lock:
+                self.counts["errors"] += 1
+            return None
+        finally:
+            self._running.release()
+        with self._lock:
+            if window_key:
+                # Run here or claimed by another worker, either way this window is done
+                self._claimed_window = window_key
+            if run is None:
+                self.counts["claimed_elsewhere"] += 1
+            else:
+                self.counts["runs"] += 1
+                self.last_run = {"id": run["id"], "status": run["status"], "duration_ms": run["duration_ms"],
+                                 "at": time.time()}
+        return run
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, enabled=self.enabled, window=self.window, tasks=list(self.tasks),
+                        max_requests_per_minute=self.max_requests_per_minute,
+                        requests_per_minute=self.requests_per_minute, running=self._running.locked(),
+                        budget_seconds=self.run_options.get('budget_seconds'),
+                        last_run=dict(self.last_run) if self.last_run else None)
+
+
+scheduler = MaintenanceScheduler()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database maintenance: ANALYZE, incremental vacuum, "
+                                                 "integrity check, WAL checkpoints")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="run the maintenance tasks now")
+    run.add_argument('--db', default=database_path())
+    run.add_argument('--tasks', default=os.getenv("MAINTENANCE_TASKS", ','.join(TASKS)))
+    run.add_argument('--budget-seconds', type=float,
+                     default=float(os.getenv("MAINTENANCE_TASK_BUDGET_SECONDS", "30")))
+    run.add_argument('--analysis-limit', type=int, default=int(os.getenv("MAINTENANCE_ANALYSIS_LIMIT", "1000")))
+    run.add_argument('--integrity', choices=('quick', 'full'), default=os.getenv("MAINTENANCE_INTEGRITY", "quick"))
+    run.add_argument('--convert-auto-vacuum', action='store_true',
+                     help="VACUUM a database with auto_vacuum=NONE into INCREMENTAL (holds the write lock)")
+    listing = sub.add_parser('list', help="show recent runs")
+    listing.add_argument('--db', default=database_path())
+    listing.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        conn = sqlite3.connect(args.db)
+        try:
+            runs = recent_runs(conn, args.limit)
+        except sqlite3.OperationalError:
+            runs = []
+        finally:
+            conn.close()
+        for r in runs:
+            tasks = ', '.join(f"{t['task']} {t['status']} {t['seconds']}s" for t in r['tasks'])
+            print(f"#{r['id']} {r['started_at']} {r['triggered_by']} {r['status']} {r['duration_ms']} ms: {tasks}; "
+                  f"{len(r['planner_changes'])} plan changes")
+        return 0
+
+    tasks = [t.strip() for t in args.tasks.split(',') if t.strip()]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown tasks: {', '.join(sorted(unknown))}")
+    try:
+        r = run_maintenance(args.db, tasks=tasks, budget_seconds=args.budget_seconds,
+                            analysis_limit=args.analysis_limit, convert_auto_vacuum=args.convert_auto_vacuum,
+                            integrity=args.integrity)
+    except sqlite3.Error as e:
+        print(f"❌ Maintenance failed: {e}")
+        return 1
+    for t in r['tasks']:
+        print(f"  {t['task']:<18} {t['status']:<11} {t['seconds']:>8.2f}s  {json.dumps(t['detail'])}")
+    for sql, change in r['planner_changes'].items():
+        print(f"  plan changed: {sql}\n    before: {change['before']}\n    after:  {change['after']}")
+    print(f"[{'SUCCESS' if r['status'] == 'ok' else 'INFO'}] Maintenance run #{r['id']}: {r['status']} in "
+          f"{r['duration_ms'] / 1000:.2f}s, {len(r['planner_changes'])} plan changes")
+    return 0 if r['status'] == 'ok' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
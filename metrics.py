@@ -0,0 +1,315 @@
+"""In-process request, SQL and AI metrics for CodeDonki.
+
+Everything is kept in memory per process and exposed two ways:
+Prometheus text format (GET /metrics) and JSON (GET /api/admin/metrics).
+"""
+import sqlite3
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+# Latency buckets in seconds (Prometheus-style upper bounds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets for "SQL statements per request"
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Approximate quantile using the upper bound of the matching bucket."""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= target:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            "count": self.total,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.total, 6) if self.total else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Thread-safe registry for all CodeDonki metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request_latency = {}   # (method, route) -> Histogram
+            self.request_status = {}    # (method, route, status) -> count
+            self.sql_queries = {}       # (method, route) -> Histogram of statements per request
+            self.sql_time = {}          # (method, route) -> Histogram of SQL seconds per request
+            self.sql_total = 0
+            self.sql_seconds_total = 0.0
+            self.gemini_latency = {}    # endpoint -> Histogram
+            self.gemini_calls = {}      # (endpoint, outcome) -> count
+            self.cache_events = {}      # region -> {"hit": n, "miss": n}
+            self.counters = {}          # (name, label) -> count, for feature-specific counters
+            self.gauges = {}            # name -> current value, e.g. open SSE connections
+
+    # --- Recording ---
+    def observe_request(self, method, route, status, seconds, sql_count, sql_seconds):
+        key = (method, route)
+        with self._lock:
+            self.request_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            status_key = (method, route, status)
+            self.request_status[status_key] = self.request_status.get(status_key, 0) + 1
+            self.sql_queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(sql_count)
+            self.sql_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(sql_seconds)
+
+    def observe_sql(self, seconds):
+        with self._lock:
+            self.sql_total += 1
+            self.sql_seconds_total += seconds
+
+    def observe_gemini(self, endpoint, seconds, ok=True):
+        outcome = 'ok' if ok else 'error'
+        with self._lock:
+            self.gemini_latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            key = (endpoint, outcome)
+            self.gemini_calls[key] = self.gemini_calls.get(key, 0) + 1
+
+    def record_cache(self, region, hit):
+        with self._lock:
+            events = self.cache_events.setdefault(region, {"hit": 0, "miss": 0})
+            events["hit" if hit else "miss"] += 1
+
+    def increment(self, name, label='', amount=1):
+        """Bump a free-form counter, e.g. increment('throttled_requests', 'hint')."""
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def requests_total(self):
+        """Requests this process has served since the last reset."""
+        with self._lock:
+            return sum(self.request_status.values())
+
+    # --- Export ---
+    def snapshot(self):
+        """JSON-friendly view used by the admin metrics panel."""
+        with self._lock:
+            routes = []
+            for (method, route), hist in sorted(self.request_latency.items()):
+                statuses = {
+                    str(status): count
+                    for (m, r, status), count in self.request_status.items()
+                    if m == method and r == route
+                }
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "latency_seconds": hist.to_dict(),
+                    "status_codes": statuses,
+                    "sql_queries_per_request": self.sql_queries[(method, route)].to_dict(),
+                    "sql_seconds_per_request": self.sql_time[(method, route)].to_dict(),
+                })
+            gemini = []
+            for endpoint, hist in sorted(self.gemini_latency.items()):
+                gemini.append({
+                    "endpoint": endpoint,
+                    "latency_seconds": hist.to_dict(),
+                    "ok": self.gemini_calls.get((endpoint, 'ok'), 0),
+                    "errors": self.gemini_calls.get((endpoint, 'error'), 0),
+                })
+            caches = []
+            for region, events in sorted(self.cache_events.items()):
+                lookups = events["hit"] + events["miss"]
+                caches.append({
+                    "region": region,
+                    "hits": events["hit"],
+                    "misses": events["miss"],
+                    "hit_rate": round(events["hit"] / lookups, 4) if lookups else 0.0,
+                })
+            counters = [
+                {"name": name, "label": label, "value": value}
+                for (name, label), value in sorted(self.counters.items())
+            ]
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "sql": {"statements": self.sql_total, "seconds": round(self.sql_seconds_total, 6)},
+                "routes": routes,
+                "gemini": gemini,
+                "caches": caches,
+                "counters": counters,
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _render_histograms(lines, 'codedonki_request_latency_seconds',
+                               'Request latency by route', self.request_latency,
+                               ('method', 'route'))
+            lines.append('# HELP codedonki_requests_total Responses by route and status code')
+            lines.append('# TYPE codedonki_requests_total counter')
+            for (method, route, status), count in sorted(self.request_status.items()):
+                lines.append(f'codedonki_requests_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+            _render_histograms(lines, 'codedonki_request_sql_queries',
+                               'SQL statements executed per request', self.sql_queries,
+                               ('method', 'route'))
+            _render_histograms(lines, 'codedonki_request_sql_seconds',
+                               'Total SQL time per request', self.sql_time,
+                               ('method', 'route'))
+            lines.append('# HELP codedonki_sql_statements_total SQL statements executed')
+            lines.append('# TYPE codedonki_sql_statements_total counter')
+            lines.append(f'codedonki_sql_statements_total {self.sql_total}')
+            lines.append('# HELP codedonki_sql_seconds_total Time spent executing SQL')
+            lines.append('# TYPE codedonki_sql_seconds_total counter')
+            lines.append(f'codedonki_sql_seconds_total {self.sql_seconds_total:.6f}')
+            _render_histograms(lines, 'codedonki_gemini_latency_seconds',
+                               'Gemini call latency by endpoint',
+                               {(k,): v for k, v in self.gemini_latency.items()}, ('endpoint',))
+            lines.append('# HELP codedonki_gemini_calls_total Gemini calls by outcome')
+            lines.append('# TYPE codedonki_gemini_calls_total counter')
+            for (endpoint, outcome), count in sorted(self.gemini_calls.items()):
+                lines.append(f'codedonki_gemini_calls_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+            lines.append('# HELP codedonki_cache_requests_total Cache lookups by region and result')
+            lines.append('# TYPE codedonki_cache_requests_total counter')
+            for region, events in sorted(self.cache_events.items()):
+                for result in ('hit', 'miss'):
+                    lines.append(f'codedonki_cache_requests_total{{region="{region}",result="{result}"}} '
+                                 f'{events[result]}')
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f'# TYPE codedonki_{name} counter')
+                for (n, label), value in sorted(self.counters.items()):
+                    if n != name:
+                        continue
+                    if label:
+                        lines.append(f'codedonki_{name}{{label="{_escape(label)}"}} {value}')
+                    else:
+                        lines.append(f'codedonki_{name} {value}')
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE codedonki_{name} gauge')
+                lines.append(f'codedonki_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _render_histograms(lines, name, help_text, histograms, label_names):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for key, hist in sorted(histograms.items()):
+        labels = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(label_names, key))
+        for bound, count in zip(hist.buckets, hist.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.total}')
+        lines.append(f'{name}_sum{{{labels}}} {hist.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {hist.total}')
+
+
+metrics = Metrics()
+
+
+# --- Instrumented SQLite connection ---
+def _record_statement(seconds):
+    metrics.observe_sql(seconds)
+    if has_request_context():
+        g.sql_count = g.get('sql_count', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every statement and charges it to the current request."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_statement(time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* build their cursor internally, so route them through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# --- Flask wiring ---
+def init_app(app):
+    """Register the before/after request hooks that feed the registry."""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.get('request_started')
+        if started is not None:
+            metrics.observe_request(
+                request.method, request_route(), response.status_code,
+                time.perf_counter() - started, g.get('sql_count', 0), g.get('sql_seconds', 0.0)
+            )
+        return response
+
+
+def request_route():
+    """Route template for the current request, e.g. '/api/quiz/<int:lesson_id>'."""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
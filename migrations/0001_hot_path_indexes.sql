@@ -0,0 +1,25 @@
+-- Covering / composite indexes for the hottest predicates.
+-- Lines starting with "-- probe:" are EXPLAIN QUERY PLAN'd before and after the migration.
+
+-- probe: SELECT name, xp, avatar_url FROM users ORDER BY xp DESC LIMIT 50
+-- probe: SELECT id FROM lessons WHERE category_id = 1 AND order_in_category = 2 LIMIT 1
+-- probe: SELECT COALESCE(MAX(order_in_category), 0) + 1 FROM lessons WHERE category_id = 1
+-- probe: SELECT lesson_id, score, passed, attempted_at FROM user_quiz_attempts WHERE user_id = 1 ORDER BY attempted_at DESC LIMIT 20
+-- probe: SELECT badge_id, earned_at FROM user_badges WHERE user_id = 1 ORDER BY earned_at DESC
+-- probe: SELECT user_id, lesson_id, completed_at FROM lesson_progress WHERE is_completed = 1 ORDER BY completed_at DESC LIMIT 5
+
+-- Leaderboard: ORDER BY xp DESC LIMIT 50, answered entirely from the index
+CREATE INDEX IF NOT EXISTS idx_users_xp_leaderboard ON users(xp DESC, name, avatar_url);
+
+-- Next-lesson unlock in submit_quiz and get_next_level (supersedes idx_lessons_category)
+CREATE INDEX IF NOT EXISTS idx_lessons_category_order ON lessons(category_id, order_in_category);
+DROP INDEX IF EXISTS idx_lessons_category;
+
+-- Per-user activity feeds ordered by time (supersede the single-column user_id indexes)
+CREATE INDEX IF NOT EXISTS idx_user_quiz_attempts_user_time ON user_quiz_attempts(user_id, attempted_at);
+DROP INDEX IF EXISTS idx_user_quiz_attempts_user;
+CREATE INDEX IF NOT EXISTS idx_user_badges_user_time ON user_badges(user_id, earned_at);
+DROP INDEX IF EXISTS idx_user_badges_user;
+
+-- Dashboard "recent completions" and completion counts
+CREATE INDEX IF NOT EXISTS idx_lesson_progress_completed ON lesson_progress(is_completed, completed_at);
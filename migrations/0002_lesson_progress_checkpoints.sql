@@ -0,0 +1,3 @@
+-- Game checkpoints reported through the batch sync API (POST /api/sync, op "progress").
+ALTER TABLE lesson_progress ADD COLUMN last_challenge INTEGER DEFAULT 0;
+ALTER TABLE lesson_progress ADD COLUMN updated_at TIMESTAMP;
@@ -0,0 +1,68 @@
+-- Full-text search (GET /api/search, GET /api/admin/quiz/search; see search.py).
+-- External-content FTS5 indexes: the text stays in the source tables and the
+-- triggers below keep each index in step with every insert, update and delete.
+-- prefix='2 3' makes the search-as-you-type prefix queries ("loo*") cheap.
+CREATE VIRTUAL TABLE IF NOT EXISTS lessons_fts USING fts5(
+    title, description,
+    content='lessons', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS categories_fts USING fts5(
+    name, description,
+    content='categories', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS quiz_questions_fts USING fts5(
+    question_text, option_a, option_b, option_c, option_d, explanation,
+    content='quiz_questions', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS lessons_fts_insert AFTER INSERT ON lessons BEGIN
+    INSERT INTO lessons_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS lessons_fts_delete AFTER DELETE ON lessons BEGIN
+    INSERT INTO lessons_fts (lessons_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS lessons_fts_update AFTER UPDATE OF title, description ON lessons BEGIN
+    INSERT INTO lessons_fts (lessons_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO lessons_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS categories_fts_insert AFTER INSERT ON categories BEGIN
+    INSERT INTO categories_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS categories_fts_delete AFTER DELETE ON categories BEGIN
+    INSERT INTO categories_fts (categories_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS categories_fts_update AFTER UPDATE OF name, description ON categories BEGIN
+    INSERT INTO categories_fts (categories_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+    INSERT INTO categories_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS quiz_questions_fts_insert AFTER INSERT ON quiz_questions BEGIN
+    INSERT INTO quiz_questions_fts (rowid, question_text, option_a, option_b, option_c, option_d, explanation)
+    VALUES (new.id, new.question_text, new.option_a, new.option_b, new.option_c, new.option_d, new.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS quiz_questions_fts_delete AFTER DELETE ON quiz_questions BEGIN
+    INSERT INTO quiz_questions_fts (quiz_questions_fts, rowid, question_text, option_a, option_b, option_c, option_d, explanation)
+    VALUES ('delete', old.id, old.question_text, old.option_a, old.option_b, old.option_c, old.option_d, old.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS quiz_questions_fts_update
+AFTER UPDATE OF question_text, option_a, option_b, option_c, option_d, explanation ON quiz_questions BEGIN
+    INSERT INTO quiz_questions_fts (quiz_questions_fts, rowid, question_text, option_a, option_b, option_c, option_d, explanation)
+    VALUES ('delete', old.id, old.question_text, old.option_a, old.option_b, old.option_c, old.option_d, old.explanation);
+    INSERT INTO quiz_questions_fts (rowid, question_text, option_a, option_b, option_c, option_d, explanation)
+    VALUES (new.id, new.question_text, new.option_a, new.option_b, new.option_c, new.option_d, new.explanation);
+END;
+
+-- Index the rows that already exist
+INSERT INTO lessons_fts (lessons_fts) VALUES ('rebuild');
+INSERT INTO categories_fts (categories_fts) VALUES ('rebuild');
+INSERT INTO quiz_questions_fts (quiz_questions_fts) VALUES ('rebuild');
@@ -0,0 +1,9 @@
+-- Keyset pagination for the admin quiz bank (GET /api/admin/quiz?limit=&sort=).
+-- Each page is "WHERE (sort key) > (last row's key) ORDER BY sort key LIMIT n"; with an index
+-- on the sort key that is a range scan, with no sort of the whole bank per page.
+
+-- probe: SELECT q.id, q.question_text FROM quiz_questions q WHERE (q.question_text, q.id) > ('Question 5', 10) ORDER BY q.question_text, q.id LIMIT 51
+-- probe: SELECT q.id, q.question_text FROM quiz_questions q WHERE (q.lesson_id, q.id) > (10, 500) ORDER BY q.lesson_id, q.id LIMIT 51
+
+-- sort=question_text (the rowid id is the implicit tie-breaker at the end of the index)
+CREATE INDEX IF NOT EXISTS idx_quiz_questions_text ON quiz_questions(question_text);
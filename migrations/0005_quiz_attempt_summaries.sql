@@ -0,0 +1,17 @@
+-- Per-user, per-lesson rollups of the quiz attempts that retention.py has moved out of
+-- user_quiz_attempts into the archive database. The live rows plus these give the whole
+-- history: attempts = COUNT(live) + attempts, best score = MAX(live scores, best_score).
+
+CREATE TABLE IF NOT EXISTS quiz_attempt_summaries (
+    user_id INTEGER NOT NULL,
+    lesson_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    passed_attempts INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER NOT NULL,
+    xp_awarded INTEGER NOT NULL DEFAULT 0,
+    first_attempt_at TIMESTAMP,
+    last_attempt_at TIMESTAMP,
+    PRIMARY KEY (user_id, lesson_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE CASCADE
+) WITHOUT ROWID;
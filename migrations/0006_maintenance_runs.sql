@@ -0,0 +1,20 @@
+-- One row per database maintenance run (maintenance.py): what each task did and how long it
+-- took, and the probe queries whose EXPLAIN QUERY PLAN changed over the run. Scheduled runs
+-- carry the window they belong to; the UNIQUE window_key is how one worker claims a window.
+--
+-- Probe whose plan depends on planner statistics: without sqlite_stat1 the admin activity feed's
+-- lesson completions walk idx_lesson_progress_completed over every completion; with it they
+-- search idx_lesson_progress_user.
+-- probe: SELECT l.title, lp.completed_at, lp.xp_earned FROM lesson_progress lp JOIN lessons l ON l.id = lp.lesson_id WHERE lp.user_id = 1 AND lp.is_completed = 1 AND lp.completed_at IS NOT NULL ORDER BY lp.completed_at DESC LIMIT 20
+
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    window_key TEXT UNIQUE,
+    triggered_by TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_ms REAL,
+    tasks TEXT,
+    planner_changes TEXT
+);
@@ -50,4 +50,15 @@ async function apiFetch(endpoint, options = {}) {
     console.error('API Fetch Error:', error);
     throw error;
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Initial API state the server rendered into the page (see routes/pages.py).
+ * Returns the body of the matching API call, or undefined if the page must fetch it.
+ * @param {string} key 'profile', 'lesson', 'quiz', 'categories', 'lessons' or 'badges'
+ * @returns {*} The parsed API response
+ */
+function bootstrapData(key) {
+  const state = window.CODEDONKI_BOOTSTRAP;
+  return state ? state[key] : undefined;
+}
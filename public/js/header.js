@@ -75,16 +75,20 @@ document.addEventListener('DOMContentLoaded', function() {
             const token = localStorage.getItem('token');
             if (!token) return;
             
-            const response = await fetch('/api/profile', {
-                headers: { 
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                }
-            });
-            
-            if (!response.ok) return;
-            
-            const profile = await response.json();
+            // Rendered into the page by the server when it knows the user
+            let profile = window.CODEDONKI_BOOTSTRAP && window.CODEDONKI_BOOTSTRAP.profile;
+            if (!profile) {
+                const response = await fetch('/api/profile', {
+                    headers: { 
+                        'Authorization': `Bearer ${token}`,
+                        'Content-Type': 'application/json'
+                    }
+                });
+                
+                if (!response.ok) return;
+                
+                profile = await response.json();
+            }
             
             // Update desktop profile elements
             updateProfileElements(profile, 'desktop');
@@ -139,8 +143,48 @@ document.addEventListener('DOMContentLoaded', function() {
     
     if (userLoggedIn) {
         loadUserProfile();
+        connectLiveEvents();
+    }
+    
+    // Live XP, rank and badge updates pushed by the server (Server-Sent Events).
+    // Each event is re-dispatched on window as 'codedonki:<type>' so pages can react.
+    function connectLiveEvents() {
+        const token = localStorage.getItem('token');
+        if (!token || !window.EventSource) return;
+        
+        const source = new EventSource(`/api/events/stream?token=${encodeURIComponent(token)}`);
+        ['xp', 'badges', 'leaderboard'].forEach(type => {
+            source.addEventListener(type, (e) => {
+                window.dispatchEvent(new CustomEvent(`codedonki:${type}`, { detail: JSON.parse(e.data) }));
+            });
+        });
+        source.addEventListener('open', () => {
+            window.dispatchEvent(new CustomEvent('codedonki:live', { detail: { connected: true } }));
+        });
+        source.addEventListener('error', () => {
+            // The browser reconnects on its own; CLOSED means the server refused (auth/capacity)
+            if (source.readyState === EventSource.CLOSED) {
+                window.dispatchEvent(new CustomEvent('codedonki:live', { detail: { connected: false } }));
+            }
+        });
+        window.addEventListener('beforeunload', () => source.close());
+        window.CodeDonkiEvents = source;
     }
     
+    window.addEventListener('codedonki:badges', (e) => {
+        if (!window.showAlert) return;
+        e.detail.badges.forEach(badge => {
+            window.showAlert(`New badge earned: ${badge.name}!`, { type: 'success', duration: 6000 });
+        });
+    });
+    
+    window.addEventListener('codedonki:xp', (e) => {
+        const { rank, previous_rank } = e.detail;
+        if (window.showAlert && rank < previous_rank) {
+            window.showAlert(`You moved up to #${rank} on the leaderboard!`, { type: 'success' });
+        }
+    });
+    
     // Add smooth scroll behavior for anchor links
     const anchorLinks = document.querySelectorAll('a[href^="#"]');
     anchorLinks.forEach(link => {
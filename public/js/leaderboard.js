@@ -2,6 +2,7 @@ class AdvancedLeaderboard {
   constructor() {
     this.leaderboardData = [];
     this.updateInterval = null;
+    this.reloadTimer = null;
     this.isLive = true;
     this.lastUpdateTime = null;
     
@@ -212,14 +213,46 @@ class AdvancedLeaderboard {
   }
 
   startLiveUpdates() {
-    // Update every 30 seconds
+    // Reload only when the server pushes a top-50 XP change (see header.js);
+    // bursts of changes are coalesced into one reload
+    window.addEventListener('codedonki:leaderboard', () => {
+      clearTimeout(this.reloadTimer);
+      this.reloadTimer = setTimeout(() => {
+        this.loadLeaderboard();
+        this.updateLiveBadge();
+      }, 1000);
+    });
+    
+    // Fall back to polling every 30 seconds when the live stream is unavailable
+    const source = window.CodeDonkiEvents;
+    if (!source || source.readyState === EventSource.CLOSED) {
+      this.startPolling();
+    }
+    window.addEventListener('codedonki:live', (e) => {
+      if (e.detail.connected) {
+        this.stopPolling();
+      } else {
+        this.startPolling();
+      }
+    });
+    
+    // Initial live badge update
+    this.updateLiveBadge();
+  }
+
+  startPolling() {
+    if (this.updateInterval) return;
     this.updateInterval = setInterval(() => {
       this.loadLeaderboard();
       this.updateLiveBadge();
     }, 30000);
-    
-    // Initial live badge update
-    this.updateLiveBadge();
+  }
+
+  stopPolling() {
+    if (this.updateInterval) {
+      clearInterval(this.updateInterval);
+      this.updateInterval = null;
+    }
   }
 
   updateLiveBadge() {
@@ -258,9 +291,8 @@ class AdvancedLeaderboard {
 
 
   destroy() {
-    if (this.updateInterval) {
-      clearInterval(this.updateInterval);
-    }
+    this.stopPolling();
+    clearTimeout(this.reloadTimer);
   }
 }
 
@@ -17,35 +17,38 @@ document.addEventListener('DOMContentLoaded', () => {
           throw new Error('No lesson ID or slug provided.');
         }
         
-        // 2. Fetch lesson data from our API
-        let response;
-        if (lessonId) {
-          // Use ID-based endpoint
-          response = await apiFetch(`/api/lessons/${lessonId}`);
-          currentLessonId = lessonId;
-        } else {
-          // Use slug-based endpoint
-          response = await apiFetch(`/api/lessons/slug/${lessonSlug}`);
-          currentLessonId = null; // We'll get the ID from the response
+        // 2. Lesson data rendered into the page, or fetched from our API
+        let lesson = bootstrapData('lesson');
+        if (!lesson) {
+          let response;
+          if (lessonId) {
+            // Use ID-based endpoint
+            response = await apiFetch(`/api/lessons/${lessonId}`);
+          } else {
+            // Use slug-based endpoint
+            response = await apiFetch(`/api/lessons/slug/${lessonSlug}`);
+          }
+          
+          if (!response.ok) {
+            throw new Error('Could not load lesson data.');
+          }
+          
+          lesson = await response.json();
         }
         
-        if (!response.ok) {
-          throw new Error('Could not load lesson data.');
-        }
-        
-        const lesson = await response.json();
-        
-        // Set currentLessonId from the response if we used slug
-        if (!currentLessonId) {
-          currentLessonId = lesson.id;
-        }
+        currentLessonId = lesson.id;
         
         // Set the lesson title
         lessonTitle.textContent = lesson.title;
         
         // 3. Set the iframe source to the uploaded lesson file
-        // lesson.ar_model_url will be "/uploads/for-loop-lesson.html"
-        lessonIframe.src = lesson.ar_model_url; 
+        // lesson.ar_model_url will be "/uploads/for-loop-lesson.html"; the game reads
+        // lesson_id to send its checkpoints and completion through /api/sync
+        if (lesson.ar_model_url) {
+          const gameUrl = new URL(lesson.ar_model_url, window.location.href);
+          gameUrl.searchParams.set('lesson_id', lesson.id);
+          lessonIframe.src = gameUrl.href;
+        }
         
         // Set the quiz link URL
         quizLink.href = `/quiz?lesson_id=${lesson.id}&title=${encodeURIComponent(lesson.title)}&slug=${lesson.slug}`;
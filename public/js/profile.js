@@ -23,13 +23,15 @@ document.addEventListener('DOMContentLoaded', () => {
    */
   async function loadProfile() {
     try {
-      const response = await apiFetch('/api/profile');
-      if (!response.ok) {
-        throw new Error('Failed to load profile. Please log in again.');
+      let profile = bootstrapData('profile');
+      if (!profile) {
+        const response = await apiFetch('/api/profile');
+        if (!response.ok) {
+          throw new Error('Failed to load profile. Please log in again.');
+        }
+        profile = await response.json();
       }
       
-      const profile = await response.json();
-      
       // Populate the form fields
       nameInput.value = profile.name || '';
       emailInput.value = profile.email || '';
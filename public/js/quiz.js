@@ -34,15 +34,18 @@ document.addEventListener('DOMContentLoaded', () => {
     // 2. Load quiz questions
     (async function loadQuiz() {
       try {
-        // Fetch quiz questions
-        const response = await apiFetch(`/api/quiz/${lessonId}`);
-        
-        if (!response.ok) {
-          throw new Error('Failed to load quiz questions');
+        // Quiz questions rendered into the page, or fetched from the API
+        quizQuestions = bootstrapData('quiz');
+        if (!quizQuestions) {
+          const response = await apiFetch(`/api/quiz/${lessonId}`);
+          
+          if (!response.ok) {
+            throw new Error('Failed to load quiz questions');
+          }
+          
+          quizQuestions = await response.json();
         }
         
-        quizQuestions = await response.json();
-        
         if (quizQuestions.length === 0) {
           throw new Error('No quiz questions available for this lesson');
         }
@@ -177,14 +180,30 @@ document.addEventListener('DOMContentLoaded', () => {
         stopQuizTimer();
         const timeElapsed = getTimeElapsed();
         
-        const response = await apiFetch('/api/quiz/submit', {
-          method: 'POST',
-          body: JSON.stringify({
-            lesson_id: parseInt(lessonId),
-            answers: userAnswers,
-            time_taken: timeElapsed
-          })
+        // One key per submission: retries after a dropped connection replay the
+        // stored result instead of grading (and awarding XP) a second time
+        const idempotencyKey = (window.crypto && crypto.randomUUID)
+          ? crypto.randomUUID()
+          : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        const submitBody = JSON.stringify({
+          lesson_id: parseInt(lessonId),
+          answers: userAnswers,
+          time_taken: timeElapsed
         });
+        let response;
+        for (let attempt = 1; ; attempt++) {
+          try {
+            response = await apiFetch('/api/quiz/submit', {
+              method: 'POST',
+              headers: { 'Idempotency-Key': idempotencyKey },
+              body: submitBody
+            });
+            break;
+          } catch (networkError) {
+            if (attempt >= 3) throw networkError;
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+          }
+        }
         
         const result = await response.json();
         
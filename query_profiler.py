@@ -0,0 +1,214 @@
+"""Opt-in SQL profiler for CodeDonki.
+
+Enable with SQL_PROFILE=1. Every statement run through get_db_connection() is
+normalized (literals replaced by ?) and aggregated per endpoint with its call
+count, timing and rows returned. Statements slower than
+SQL_PROFILE_THRESHOLD_MS get their EXPLAIN QUERY PLAN captured and are written
+to a rotating slow-query log.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context
+
+from metrics import InstrumentedConnection, InstrumentedCursor, request_route
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+# Only these statements can be EXPLAINed
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and replace literal values so equivalent statements group together."""
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _PLACEHOLDER_LIST.sub('(?+)', text)
+    return text
+
+
+class QueryProfiler:
+    """Aggregates statement timings per endpoint and logs slow statements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.threshold_ms = 50.0
+        self.report_path = None
+        self.slow_log = logging.getLogger('codedonki.slow_sql')
+        self.slow_log.propagate = False
+        self.reset()
+
+    def configure(self, enabled, threshold_ms=50.0, log_path='logs/slow_queries.log',
+                  report_path=None, max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.report_path = report_path
+        if not enabled:
+            return
+        if log_path and not self.slow_log.handlers:
+            os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.slow_log.addHandler(handler)
+            self.slow_log.setLevel(logging.INFO)
+        if report_path:
+            atexit.register(self.write_report, report_path)
+        print(f"[INFO] SQL profiling enabled (slow threshold {threshold_ms} ms)")
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}   # (endpoint, normalized_sql) -> stats dict
+            self.plans = {}   # normalized_sql -> EXPLAIN QUERY PLAN rows
+
+    def record(self, cursor, sql, parameters, seconds):
+        """Record one executed statement and return its stats key."""
+        endpoint = request_route() if has_request_context() else '<no request>'
+        normalized = normalize_sql(sql)
+        elapsed_ms = seconds * 1000
+        key = (endpoint, normalized)
+        with self._lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                           "rows": 0, "slow_calls": 0}
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            if cursor.rowcount > 0:
+                entry["rows"] += cursor.rowcount
+        if elapsed_ms >= self.threshold_ms:
+            self._record_slow(cursor, sql, parameters, normalized, endpoint, elapsed_ms, key)
+        return key
+
+    def add_rows(self, key, count):
+        with self._lock:
+            entry = self.stats.get(key)
+            if entry is not None:
+                entry["rows"] += count
+
+    def _record_slow(self, cursor, sql, parameters, normalized, endpoint, elapsed_ms, key):
+        plan = self.plans.get(normalized)
+        if plan is None and sql.lstrip().upper().startswith(_EXPLAINABLE):
+            plan = self.explain(cursor.connection, sql, parameters)
+            with self._lock:
+                self.plans[normalized] = plan
+        with self._lock:
+            self.stats[key]["slow_calls"] += 1
+        self.slow_log.info(json.dumps({
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "endpoint": endpoint,
+            "ms": round(elapsed_ms, 3),
+            "sql": normalized,
+            "plan": plan,
+        }))
+
+    @staticmethod
+    def explain(conn, sql, parameters=()):
+        """Return EXPLAIN QUERY PLAN detail lines, bypassing the profiling cursor."""
+        try:
+            plan_cursor = sqlite3.Cursor(conn)
+            plan_cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            return [row[3] for row in plan_cursor.fetchall()]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+
+    def report(self):
+        """Per-endpoint summary, slowest total time first."""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, normalized), entry in self.stats.items():
+                endpoints.setdefault(endpoint, []).append({
+                    "sql": normalized,
+                    "calls": entry["calls"],
+                    "total_ms": round(entry["total_ms"], 3),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "rows": entry["rows"],
+                    "slow_calls": entry["slow_calls"],
+                    "plan": self.plans.get(normalized),
+                })
+        summary = []
+        for endpoint, statements in endpoints.items():
+            statements.sort(key=lambda s: s["total_ms"], reverse=True)
+            summary.append({
+                "endpoint": endpoint,
+                "statements": len(statements),
+                "calls": sum(s["calls"] for s in statements),
+                "total_ms": round(sum(s["total_ms"] for s in statements), 3),
+                "queries": statements,
+            })
+        summary.sort(key=lambda e: e["total_ms"], reverse=True)
+        return {"enabled": self.enabled, "threshold_ms": self.threshold_ms, "endpoints": summary}
+
+    def write_report(self, path=None):
+        path = path or self.report_path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+profiler = QueryProfiler()
+
+
+class ProfilingCursor(InstrumentedCursor):
+    """Instrumented cursor that also feeds the profiler, including rows fetched."""
+
+    _profile_key = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._profile_key = profiler.record(self, sql, parameters, time.perf_counter() - start)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._profile_key = profiler.record(self, sql, (), time.perf_counter() - start)
+        return result
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self._profile_key:
+            profiler.add_rows(self._profile_key, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._profile_key:
+            profiler.add_rows(self._profile_key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self._profile_key:
+            profiler.add_rows(self._profile_key, len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        if self._profile_key:
+            profiler.add_rows(self._profile_key, 1)
+        return row
+
+
+class ProfilingConnection(InstrumentedConnection):
+    """Connection whose cursors are profiled; used by get_db_connection when SQL_PROFILE=1."""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
@@ -0,0 +1,237 @@
+"""Token-bucket rate limiting for the AI and auth endpoints.
+
+/api/hint and /api/dialogue fire on every mistake and need no login, and
+/api/login, /api/signup and /api/forgot-password spend ~100 ms of pbkdf2 per
+call, so one runaway tab or script can tie up the workers and the Gemini quota.
+
+Each named limit ("20/minute") is a token bucket per client and endpoint: the
+client is the logged-in user (JWT or session) when there is one, otherwise the
+IP address. Behind a reverse proxy the IP is the proxy's unless the app trusts
+its X-Forwarded-For (PROXY_FIX_HOPS, see app.py). The auth routes are called
+before there is a login, and a whole classroom may share one school IP, so
+their anonymous buckets are per IP and submitted email, with a looser
+"<name>_ip" limit per IP on top. A limit named "<name>_global" is also checked,
+as one bucket shared by everybody. A request that finds its bucket empty gets 429 with a Retry-After
+header and is counted in throttled_requests_total.
+
+Buckets live in process memory by default. With backend "sqlite" they are kept
+in a small SQLite file instead, so every worker process on the box shares them.
+"""
+import collections
+import functools
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app, jsonify, request, session
+
+from metrics import metrics
+
+Limit = collections.namedtuple('Limit', 'rate burst')  # tokens per second, bucket size
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(text):
+    """Limit from "N/period" (e.g. "20/minute"); None for "", "0" or "off"."""
+    text = (text or '').strip().lower()
+    if text in ('', '0', 'off', 'none'):
+        return None
+    count, _, period = text.partition('/')
+    seconds = PERIODS.get(period.strip().rstrip('s') or 'second')
+    if seconds is None:
+        raise ValueError(f"Unknown rate limit period in '{text}'")
+    count = float(count)
+    return Limit(count / seconds, max(count, 1.0))
+
+
+def refill(tokens, updated, limit, now):
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+
+class MemoryBuckets:
+    """Buckets in this process only; idle buckets are dropped beyond max_buckets."""
+
+    name = 'memory'
+
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()   # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, cost=1.0):
+        """Take `cost` tokens. Returns 0.0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens = refill(tokens, updated, limit, now)
+            allowed = tokens >= cost
+            self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    """Buckets in a SQLite file shared by all worker processes on the box."""
+
+    name = 'sqlite'
+
+    def __init__(self, path, idle_seconds=3600, purge_every=1000):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, limit, cost=1.0):
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = refill(*row, limit, now) if row else limit.burst
+            allowed = tokens >= cost
+            conn.execute(
+                """
+                INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated
+                """, (key, tokens - cost if allowed else tokens, now)
+            )
+            self._calls += 1
+            if self._calls % self.purge_every == 0:
+                conn.execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """Named limits over one bucket backend."""
+
+    def __init__(self):
+        self.enabled = True
+        self.limits = {}
+        self.backend = MemoryBuckets()
+        self.throttled = collections.Counter()
+
+    def configure(self, limits, backend='memory', db_path=None, enabled=True):
+        """limits: {name: "N/period"}. backend: 'memory', or 'sqlite' with db_path."""
+        self.enabled = enabled
+        self.limits = {name: limit for name, limit in
+                       ((name, parse_limit(text)) for name, text in limits.items()) if limit}
+        self.backend = SQLiteBuckets(db_path) if backend == 'sqlite' else MemoryBuckets()
+
+    def check(self, name, endpoint, client, ip=None):
+        """Seconds the client must wait before calling `endpoint` again, or 0.0 if allowed.
+        With `ip`, the "<name>_ip" limit is checked for that address too."""
+        if not self.enabled:
+            return 0.0
+        buckets = [(name, f"{name}:{endpoint}:{client}")]
+        if ip:
+            buckets.append((f"{name}_ip", f"{name}_ip:{endpoint}:{ip}"))
+        buckets.append((f"{name}_global", f"{name}_global"))
+        for limit_name, key in buckets:
+            limit = self.limits.get(limit_name)
+            if limit is None:
+                continue
+            try:
+                wait = self.backend.take(key, limit)
+            except sqlite3.Error as e:
+                # Fail open: a locked or broken bucket store must not take the endpoint down
+                print(f"❌ WARNING: Rate limit check failed for {key}: {e}")
+                return 0.0
+            if wait:
+                self.throttled[limit_name] += 1
+                metrics.increment('throttled_requests_total', limit_name)
+                return wait
+        return 0.0
+
+    def stats(self):
+        return {"enabled": self.enabled, "backend": self.backend.name, "buckets": len(self.backend),
+                "limits": {name: {"per_second": round(limit.rate, 4), "burst": limit.burst}
+                           for name, limit in self.limits.items()},
+                "throttled": dict(self.throttled)}
+
+
+limiter = RateLimiter()
+
+
+def retry_after_header(wait):
+    return str(max(1, math.ceil(wait)))
+
+
+def request_client():
+    """'user:<id>' for a logged-in caller (JWT or session), otherwise 'ip:<address>'."""
+    parts = (request.headers.get('Authorization') or '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        try:
+            identity = jwt.decode(parts[1], current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
+            return f"user:{identity.get('user_id')}"
+        except jwt.InvalidTokenError:
+            pass
+    user = session.get('user')
+    if user and user.get('user_id'):
+        return f"user:{user['user_id']}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limited(name, account_field=None):
+    """Apply the named limit (and "<name>_global", if configured) to a route. With account_field,
+    an anonymous caller's bucket is keyed on that JSON field (e.g. the email) as well as the IP,
+    and "<name>_ip" limits the IP across accounts."""
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            client, ip = request_client(), None
+            if account_field and client.startswith('ip:'):
+                data = request.get_json(silent=True)
+                account = data.get(account_field) if isinstance(data, dict) else None
+                ip = client
+                client = f"{client}:{str(account or '').strip().lower()}"
+            wait = limiter.check(name, request.endpoint, client, ip)
+            if wait:
+                response = jsonify({"error": "Too many requests, please slow down",
+                                    "retry_after": math.ceil(wait)})
+                response.status_code = 429
+                response.headers['Retry-After'] = retry_after_header(wait)
+                return response
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,261 @@
+"""Retention for user_quiz_attempts: roll old attempts up into summaries and archive them.
+
+Every quiz submission stores an attempt row with the repr of its questions and
+answers, and nothing removed them. apply_retention() moves the attempts older
+than `days` days out of codedonki.db, `batch_size` rows of the table at a time:
+
+1. the raw rows are copied to the archive database (<database>-archive.db,
+   or QUIZ_ATTEMPT_ARCHIVE_PATH), into the same user_quiz_attempts table
+   plus an archived_at column, and that is committed;
+2. in one write transaction on codedonki.db, the rows that are now in the
+   archive get their per-user, per-lesson rollup (attempts, passes, best
+   score, XP, first and last attempt) added to quiz_attempt_summaries
+   (migrations/0005_quiz_attempt_summaries.sql) and are deleted.
+
+A transaction across ATTACHed databases is not atomic when codedonki.db is in
+WAL mode, so the two databases are never committed together. A crash between
+the steps leaves the rows in both; the archive copy is INSERT OR IGNORE, so the
+next run copies them again harmlessly and finishes the move. Only rows found in
+the archive are deleted, and the rollup commits with the delete, so an attempt
+is never lost or summarized twice. Each batch is followed by a pause of
+`pause_ms` so quiz submissions get the write lock in between. Batches walk the
+table in rowid order, which reads it once over the whole run.
+
+Deleted rows leave free pages inside the file. With vacuum=True the run ends
+with a VACUUM and reports the bytes it returned to the file system. VACUUM
+rewrites the whole database and holds the write lock until it is done, so run
+it in a quiet window.
+
+    python retention.py [--days 180] [--dry-run] [--vacuum]
+"""
+import argparse
+import datetime
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from schema_migrations import run_migrations
+
+load_dotenv()
+
+ATTEMPT_COLUMNS = "id, user_id, lesson_id, quiz_questions, user_answers, score, passed, xp_awarded, attempted_at"
+
+
+def database_path():
+    return os.getenv("DATABASE_PATH", "codedonki.db")
+
+
+def archive_path(db_path=None):
+    db_path = db_path or database_path()
+    return os.getenv("QUIZ_ATTEMPT_ARCHIVE_PATH") or f"{os.path.splitext(db_path)[0]}-archive.db"
+
+
+def _file_bytes(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def _connect(db_path, archive):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive,))
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive.user_quiz_attempts (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            quiz_questions TEXT,
+            user_answers TEXT,
+            score INTEGER NOT NULL,
+            passed BOOLEAN DEFAULT 0,
+            xp_awarded INTEGER DEFAULT 0,
+            attempted_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS archive.idx_archived_attempts_user ON user_quiz_attempts(user_id, attempted_at)"
+    )
+    return conn
+
+
+def cutoff_for(days):
+    """attempted_at values before this are older than `days` days (CURRENT_TIMESTAMP format, UTC)."""
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _move_batch(conn, last_id, upper_id, cutoff):
+    """Archive, then summarize and delete, the old attempts with last_id < id <= upper_id. Returns rows moved."""
+    where = "id > ? AND id <= ? AND attempted_at < ?"
+    params = (last_id, upper_id, cutoff)
+    # Autocommit: the archive has its rows before codedonki.db lets go of them
+    conn.execute(
+        f"""
+        INSERT OR IGNORE INTO archive.user_quiz_attempts ({ATTEMPT_COLUMNS})
+        SELECT {ATTEMPT_COLUMNS} FROM main.user_quiz_attempts WHERE {where}
+        """, params
+    )
+    archived = f"{where} AND id IN (SELECT id FROM archive.user_quiz_attempts WHERE id > ? AND id <= ?)"
+    params += (last_id, upper_id)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            f"""
+            INSERT INTO main.quiz_attempt_summaries (user_id, lesson_id, attempts, passed_attempts, best_score,
+                                                     xp_awarded, first_attempt_at, last_attempt_at)
+            SELECT user_id, lesson_id, COUNT(*), SUM(passed), MAX(score), SUM(xp_awarded),
+                   MIN(attempted_at), MAX(attempted_at)
+            FROM main.user_quiz_attempts WHERE {archived}
+            GROUP BY user_id, lesson_id
+            ON CONFLICT(user_id, lesson_id) DO UPDATE SET
+                attempts = attempts + excluded.attempts,
+                passed_attempts = passed_attempts + excluded.passed_attempts,
+                best_score = MAX(best_score, excluded.best_score),
+                xp_awarded = xp_awarded + excluded.xp_awarded,
+                first_attempt_at = MIN(first_attempt_at, excluded.first_attempt_at),
+                last_attempt_at = MAX(last_attempt_at, excluded.last_attempt_at)
+            """, params
+        )
+        moved = conn.execute(f"DELETE FROM main.user_quiz_attempts WHERE {archived}", params).rowcount
+        conn.execute("COMMIT")
+        return moved
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def vacuum(conn, db_path):
+    """VACUUM the database. Returns (free bytes inside the file before, bytes returned to the file system)."""
+    wal = conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+    if wal:
+        # Fold the WAL written so far (the archive batches) into the file, so it isn't counted as reclaimed
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    before = _file_bytes(db_path)
+    conn.execute("VACUUM")
+    if wal:
+        # The rewritten pages sit in the WAL until a checkpoint copies them back
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return free, before - _file_bytes(db_path)
+
+
+def apply_retention(db_path=None, days=180, archive=None, batch_size=2000, pause_ms=50, dry_run=False,
+                    run_vacuum=False, log=print):
+    """Move quiz attempts older than `days` days to the archive. Returns a report dict."""
+    db_path = db_path or database_path()
+    archive = archive or archive_path(db_path)
+    cutoff = cutoff_for(days)
+    report = {"database": db_path, "archive": archive, "days": days, "cutoff": cutoff, "dry_run": dry_run,
+              "bytes_before": _file_bytes(db_path)}
+    started = time.perf_counter()
+
+    if dry_run:
+        conn = sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        rows, text_bytes = conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(quiz_questions) + LENGTH(user_answers)), 0)
+            FROM user_quiz_attempts WHERE attempted_at < ?
+            """, (cutoff,)
+        ).fetchone()
+        conn.close()
+        return dict(report, rows=rows, text_bytes=text_bytes, seconds=round(time.perf_counter() - started, 3))
+
+    # quiz_attempt_summaries comes with migration 0005, which the app may not have applied yet
+    conn = sqlite3.connect(db_path, timeout=30)
+    run_migrations(conn)
+    conn.close()
+    conn = _connect(db_path, archive)
+    try:
+        moved = batches = 0
+        last_id = 0
+        while True:
+            upper_id = conn.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM main.user_quiz_attempts WHERE id > ? ORDER BY id LIMIT ?)",
+                (last_id, batch_size)
+            ).fetchone()[0]
+            if upper_id is None:
+                break
+            count = _move_batch(conn, last_id, upper_id, cutoff)
+            moved += count
+            batches += 1
+            last_id = upper_id
+            if count and batches % 100 == 0:
+                log(f"[INFO] {moved} attempts archived ({time.perf_counter() - started:.1f}s)")
+            if count and pause_ms:
+                time.sleep(pause_ms / 1000)
+        report.update(rows=moved, batches=batches, seconds=round(time.perf_counter() - started, 3),
+                      summaries=conn.execute("SELECT COUNT(*) FROM quiz_attempt_summaries").fetchone()[0])
+        if run_vacuum:
+            vacuum_started = time.perf_counter()
+            free, reclaimed = vacuum(conn, db_path)
+            report.update(free_bytes=free, reclaimed_bytes=reclaimed,
+                          vacuum_seconds=round(time.perf_counter() - vacuum_started, 3))
+        else:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            report["free_bytes"] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    finally:
+        conn.close()
+    return dict(report, bytes_after=_file_bytes(db_path), archive_bytes=_file_bytes(archive))
+
+
+def forget_user(user_id, db_path=None):
+    """Delete a user's archived attempts (for account deletion and progress resets). Returns rows deleted."""
+    archive = archive_path(db_path)
+    if not os.path.exists(archive):
+        return 0
+    try:
+        conn = sqlite3.connect(archive, timeout=30)
+        try:
+            deleted = conn.execute("DELETE FROM user_quiz_attempts WHERE user_id = ?", (user_id,)).rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"❌ WARNING: Could not delete archived quiz attempts of user {user_id}: {e}")
+        return 0
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and summarize old quiz attempts")
+    parser.add_argument('--db', default=database_path())
+    parser.add_argument('--archive', help="archive database (default: QUIZ_ATTEMPT_ARCHIVE_PATH or <db>-archive.db)")
+    parser.add_argument('--days', type=int, default=int(os.getenv("QUIZ_ATTEMPT_RETENTION_DAYS", "180")))
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv("RETENTION_BATCH_SIZE", "2000")))
+    parser.add_argument('--pause-ms', type=float, default=float(os.getenv("RETENTION_PAUSE_MS", "50")))
+    parser.add_argument('--dry-run', action='store_true', help="only count what would be archived")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM afterwards (blocks writes while it runs)")
+    args = parser.parse_args(argv)
+
+    try:
+        r = apply_retention(args.db, days=args.days, archive=args.archive, batch_size=args.batch_size,
+                            pause_ms=args.pause_ms, dry_run=args.dry_run, run_vacuum=args.vacuum)
+    except sqlite3.Error as e:
+        print(f"❌ Retention failed: {e}")
+        return 1
+    if args.dry_run:
+        print(f"[INFO] {r['rows']} attempts before {r['cutoff']} would be archived "
+              f"({_mb(r['text_bytes'])} of question/answer text)")
+        return 0
+    print(f"[SUCCESS] Archived {r['rows']} attempts before {r['cutoff']} to {r['archive']} in {r['batches']} "
+          f"batches, {r['seconds']}s; {r['summaries']} summary rows")
+    if 'reclaimed_bytes' in r:
+        print(f"[SUCCESS] VACUUM in {r['vacuum_seconds']}s reclaimed {_mb(r['reclaimed_bytes'])}; "
+              f"{r['database']} went from {_mb(r['bytes_before'])} to {_mb(r['bytes_after'])}")
+    else:
+        print(f"[INFO] {_mb(r['free_bytes'])} of free pages in {r['database']}; run with --vacuum to reclaim them")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
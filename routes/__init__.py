@@ -0,0 +1,9 @@
+"""Route blueprints. app.create_app() registers them in this order."""
+from routes import admin, ai, auth, lessons, media, pages, progress, quiz, search
+
+BLUEPRINTS = (auth.bp, lessons.bp, progress.bp, quiz.bp, search.bp, media.bp, ai.bp, admin.bp, pages.bp)
+
+
+def register_blueprints(app):
+    for bp in BLUEPRINTS:
+        app.register_blueprint(bp)
@@ -0,0 +1,1316 @@
+"""Admin routes: lesson, category, badge and user management, dashboard statistics and
+operations (metrics, SQL profile, migrations, database maintenance).
+"""
+import os
+import sqlite3
+import time
+
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.utils import secure_filename
+
+from compression import compressor
+from db_router import READ_ONLY, SNAPSHOT, db_route, router as db_router
+from events import bus as event_bus
+from hint_cache import cache as hint_cache
+from hint_rules import classifier as hint_classifier
+from idempotency import store as idempotency_store
+from maintenance import TASKS as MAINTENANCE_TASKS, recent_runs, scheduler as maintenance
+from metrics import metrics
+from query_profiler import profiler
+from rate_limit import limiter
+from retention import forget_user as forget_archived_attempts
+from schema_migrations import migration_status
+from shared_cache import cache as shared_cache
+from core import admin_required, create_slug, get_db_connection, publish_progress, setup_database
+from serializers import ADMIN_USER_LIST, row_dicts
+from routes.ai import llm
+
+bp = Blueprint('admin', __name__)
+
+# --- Admin-Only Routes ---
+@bp.route('/api/admin/lessons', methods=['POST'])
+@admin_required
+def create_lesson():
+    data = request.get_json() if request.is_json else request.form.to_dict()
+    
+    title = data.get('title')
+    description = data.get('description')
+    category_id = data.get('category_id')
+    xp_min = data.get('xp_min', 50)
+    xp_max = data.get('xp_max', 100)
+    order_in_category = data.get('order_in_category', 1)
+    pass_threshold = data.get('pass_threshold', 70)
+    ar_code = data.get('ar_code')
+    
+    if not title or not category_id:
+        return jsonify({"error": "Missing title or category"}), 400
+    
+    # Handle AR model/code upload
+    model_url = None
+    if ar_code:
+        # Save AR code as HTML file
+        filename = f"lesson_{int(time.time())}.html"
+        save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        with open(save_path, 'w', encoding='utf-8') as f:
+            f.write(ar_code)
+        model_url = f"/uploads/{filename}"
+    elif 'ar_model' in request.files and request.files['ar_model'].filename:
+        file = request.files['ar_model']
+        filename = secure_filename(file.filename)
+        save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        file.save(save_path)
+        model_url = f"/uploads/{filename}"
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        # Generate slug from title
+        lesson_slug = create_slug(title)
+        
+        cursor.execute(
+            """
+            INSERT INTO lessons (title, description, category_id, xp_min, xp_max, 
+                               order_in_category, pass_threshold, ar_model_url, slug)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (title, description, category_id, xp_min, xp_max, order_in_category, pass_threshold, model_url, lesson_slug)
+        )
+        lesson_id = cursor.lastrowid
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Lesson created successfully", "lesson_id": lesson_id}), 201
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/lessons/<int:lesson_id>', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def get_lesson_details(lesson_id):
+    """Get detailed information about a specific lesson."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.*, c.name as category_name
+            FROM lessons l
+            LEFT JOIN categories c ON l.category_id = c.id
+            WHERE l.id = ?
+            """, (lesson_id,)
+        )
+        lesson = cursor.fetchone()
+        
+        if not lesson:
+            return jsonify({"error": "Lesson not found"}), 404
+        
+        # Handle the case where created_at and updated_at might not exist
+        lesson_dict = {
+            'id': lesson[0],
+            'title': lesson[1],
+            'description': lesson[2],
+            'category_id': lesson[3],
+            'category': lesson[11] if len(lesson) > 11 else None,  # category_name from JOIN
+            'ar_model_url': lesson[4],
+            'xp_min': lesson[6],  # Fixed index - xp_min is at index 6
+            'xp_max': lesson[7],  # Fixed index - xp_max is at index 7
+            'order_in_category': lesson[8],  # Fixed index - order_in_category is at index 8
+            'pass_threshold': lesson[9],  # Fixed index - pass_threshold is at index 9
+            'is_locked_by_default': lesson[10]  # Fixed index - is_locked_by_default is at index 10
+        }
+        
+        # Add created_at and updated_at if they exist (these columns don't exist in current schema)
+        # if len(lesson) > 12:
+        #     lesson_dict['created_at'] = lesson[12].isoformat() if lesson[12] else None
+        # if len(lesson) > 13:
+        #     lesson_dict['updated_at'] = lesson[13].isoformat() if lesson[13] else None
+        
+        return jsonify(lesson_dict), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/lessons/<int:lesson_id>', methods=['PUT'])
+@admin_required
+def update_lesson(lesson_id):
+    """Update an existing lesson."""
+    data = request.get_json()
+    
+    title = data.get('title')
+    description = data.get('description')
+    category_id = data.get('category_id')
+    xp_min = data.get('xp_min')
+    xp_max = data.get('xp_max')
+    order_in_category = data.get('order_in_category')
+    pass_threshold = data.get('pass_threshold')
+    ar_code = data.get('ar_code')
+    
+    # Title is only required if we're updating other fields (not just AR code)
+    if not title and not ar_code:
+        return jsonify({"error": "Title is required"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Handle AR code update
+        model_url = None
+        if ar_code:
+            # Save AR code as HTML file
+            filename = f"lesson_{lesson_id}_{int(time.time())}.html"
+            save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+            with open(save_path, 'w', encoding='utf-8') as f:
+                f.write(ar_code)
+            model_url = f"/uploads/{filename}"
+        
+        # Build dynamic update query
+        update_fields = []
+        update_values = []
+        
+        if title: 
+            update_fields.append("title = ?")
+            update_values.append(title)
+            # Update slug when title changes
+            update_fields.append("slug = ?")
+            update_values.append(create_slug(title))
+        if description is not None: 
+            update_fields.append("description = ?")
+            update_values.append(description)
+        if category_id: 
+            update_fields.append("category_id = ?")
+            update_values.append(category_id)
+        if xp_min is not None: 
+            update_fields.append("xp_min = ?")
+            update_values.append(xp_min)
+        if xp_max is not None: 
+            update_fields.append("xp_max = ?")
+            update_values.append(xp_max)
+        if order_in_category: 
+            update_fields.append("order_in_category = ?")
+            update_values.append(order_in_category)
+        if pass_threshold is not None: 
+            update_fields.append("pass_threshold = ?")
+            update_values.append(pass_threshold)
+        if model_url: 
+            update_fields.append("ar_model_url = ?")
+            update_values.append(model_url)
+        
+        # Don't try to update updated_at if column doesn't exist
+        # update_fields.append("updated_at = CURRENT_TIMESTAMP")
+        
+        update_values.append(lesson_id)
+        
+        query = f"UPDATE lessons SET {', '.join(update_fields)} WHERE id = ?"
+        cursor.execute(query, update_values)
+        
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Lesson not found"}), 404
+        
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Lesson updated successfully"}), 200
+        
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/lessons/<int:lesson_id>', methods=['DELETE'])
+@admin_required
+def delete_lesson(lesson_id):
+    """Delete a lesson and automatically reorder remaining lessons in the category."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Get lesson details before deletion
+        cursor.execute("SELECT category_id, order_in_category FROM lessons WHERE id = ?", (lesson_id,))
+        lesson_data = cursor.fetchone()
+        
+        if not lesson_data:
+            return jsonify({"error": "Lesson not found"}), 404
+        
+        category_id, deleted_order = lesson_data
+        
+        # Delete the lesson
+        cursor.execute("DELETE FROM lessons WHERE id = ?", (lesson_id,))
+        
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Lesson not found"}), 404
+        
+        # Reorder remaining lessons in the same category
+        cursor.execute(
+            """
+            UPDATE lessons 
+            SET order_in_category = order_in_category - 1
+            WHERE category_id = ? AND order_in_category > ?
+            """, (category_id, deleted_order)
+        )
+        
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Lesson deleted successfully and remaining lessons reordered"}), 200
+        
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/lessons/next-level', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def get_next_level():
+    """Get the next available level for a category."""
+    category_id = request.args.get('category_id')
+    
+    if not category_id:
+        return jsonify({"error": "Category ID is required"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COALESCE(MAX(order_in_category), 0) + 1 FROM lessons WHERE category_id = ?",
+            (category_id,)
+        )
+        next_level = cursor.fetchone()[0]
+        
+        return jsonify({"next_level": next_level}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- Category Management APIs ---
+@bp.route('/api/admin/categories', methods=['POST'])
+@admin_required
+def create_category():
+    """Create a new category."""
+    data = request.get_json()
+    name = data.get('name')
+    description = data.get('description', '')
+    color = data.get('color', '#3498db')
+    icon = data.get('icon', 'fas fa-tag')
+    slug = data.get('slug', '')
+    meta_description = data.get('meta_description', '')
+    
+    if not name:
+        return jsonify({"error": "Category name is required"}), 400
+    
+    # Generate slug from name if not provided
+    if not slug:
+        slug = create_slug(name)
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO categories (name, description, color, icon, slug, meta_description) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, description, color, icon, slug, meta_description)
+        )
+        category_id = cursor.lastrowid
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Category created successfully", "category_id": category_id}), 201
+    except sqlite3.Error as e:
+        conn.rollback()
+        if 'UNIQUE constraint failed' in str(e):  # Unique violation
+            return jsonify({"error": "Category name or slug already exists"}), 409
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/categories/<int:category_id>', methods=['PUT'])
+@admin_required
+def update_category(category_id):
+    """Update an existing category."""
+    data = request.get_json()
+    name = data.get('name')
+    description = data.get('description')
+    color = data.get('color')
+    icon = data.get('icon')
+    slug = data.get('slug')
+    meta_description = data.get('meta_description')
+    
+    if not name:
+        return jsonify({"error": "Category name is required"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Build dynamic update query
+        update_fields = []
+        update_values = []
+        
+        if name:
+            update_fields.append("name = ?")
+            update_values.append(name)
+        if description is not None:
+            update_fields.append("description = ?")
+            update_values.append(description)
+        if color:
+            update_fields.append("color = ?")
+            update_values.append(color)
+        if icon:
+            update_fields.append("icon = ?")
+            update_values.append(icon)
+        if slug:
+            update_fields.append("slug = ?")
+            update_values.append(slug)
+        if meta_description is not None:
+            update_fields.append("meta_description = ?")
+            update_values.append(meta_description)
+        
+        update_values.append(category_id)
+        
+        query = f"UPDATE categories SET {', '.join(update_fields)} WHERE id = ?"
+        cursor.execute(query, update_values)
+        
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Category not found"}), 404
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Category updated successfully"}), 200
+    except sqlite3.Error as e:
+        conn.rollback()
+        if 'UNIQUE constraint failed' in str(e):  # Unique violation
+            return jsonify({"error": "Category name or slug already exists"}), 409
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/categories/<int:category_id>', methods=['DELETE'])
+@admin_required
+def delete_category(category_id):
+    """Delete a category."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Category not found"}), 404
+        conn.commit()
+        shared_cache.invalidate('catalog')
+        return jsonify({"message": "Category deleted successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- Badge System APIs ---
+@bp.route('/api/admin/badges', methods=['POST'])
+@admin_required
+def create_badge():
+    """Create a new badge with optional icon image upload."""
+    try:
+        # Get form data - ensure we extract strings, not dict objects
+        name = str(request.form.get('name', ''))
+        description = str(request.form.get('description', ''))
+        xp_threshold = request.form.get('xp_threshold')
+        color = str(request.form.get('color', '#FFD700'))
+        
+        if not name or not xp_threshold:
+            return jsonify({"error": "Badge name and XP threshold are required"}), 400
+        
+        # Convert xp_threshold to integer
+        try:
+            xp_threshold = int(xp_threshold)
+        except (ValueError, TypeError):
+            return jsonify({"error": "XP threshold must be a number"}), 400
+        
+        # Handle badge icon upload - save in uploads/badges/
+        icon_url = ''
+        if 'badge_icon' in request.files and request.files['badge_icon'].filename:
+            file = request.files['badge_icon']
+            ext = os.path.splitext(file.filename)[1]
+            filename = secure_filename(f"badge_{name.replace(' ', '_')}_{int(time.time())}{ext}")
+            
+            # Create badges folder if it doesn't exist
+            badges_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'badges')
+            os.makedirs(badges_folder, exist_ok=True)
+            
+            save_path = os.path.join(badges_folder, filename)
+            file.save(save_path)
+            icon_url = f"/uploads/badges/{filename}"
+            print(f"✅ Badge icon saved: {icon_url}")
+        
+        conn = get_db_connection()
+        if not conn: return jsonify({"error": "Database connection failed"}), 500
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO badges (name, description, icon_url, xp_threshold, color) VALUES (?, ?, ?, ?, ?)",
+                (name, description, icon_url, xp_threshold, color)
+            )
+            badge_id = cursor.lastrowid
+            conn.commit()
+            shared_cache.invalidate('badges')
+            print(f"✅ Badge created: {name} (ID: {badge_id})")
+            return jsonify({"message": "Badge created successfully", "badge_id": badge_id}), 201
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Database error in create_badge: {str(e)}")
+            if 'UNIQUE constraint failed' in str(e):
+                return jsonify({"error": "Badge name already exists"}), 409
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            if conn: conn.close()
+    except Exception as e:
+        print(f"❌ Error in create_badge: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@bp.route('/api/admin/badges/<int:badge_id>', methods=['PUT'])
+@admin_required
+def update_badge(badge_id):
+    """Update an existing badge with optional icon image upload."""
+    try:
+        # Get form data - ensure we extract strings, not dict objects
+        name = request.form.get('name')
+        if name is not None:
+            name = str(name)
+        
+        description = request.form.get('description')
+        if description is not None:
+            description = str(description)
+        
+        xp_threshold = request.form.get('xp_threshold')
+        if xp_threshold is not None:
+            try:
+                xp_threshold = int(xp_threshold)
+            except (ValueError, TypeError):
+                return jsonify({"error": "XP threshold must be a number"}), 400
+        
+        color = request.form.get('color')
+        if color is not None:
+            color = str(color)
+        
+        is_active_str = request.form.get('is_active')
+        # Convert to integer for SQLite (0 or 1)
+        is_active = None
+        if is_active_str is not None:
+            is_active_str = str(is_active_str)
+            is_active = 1 if is_active_str.lower() in ['true', '1', 'yes'] else 0
+        
+        existing_icon_url = request.form.get('existing_icon_url')
+        if existing_icon_url is not None:
+            existing_icon_url = str(existing_icon_url)
+        
+        # Handle badge icon upload - save in uploads/badges/
+        icon_url = existing_icon_url  # Keep existing by default
+        if 'badge_icon' in request.files and request.files['badge_icon'].filename:
+            file = request.files['badge_icon']
+            ext = os.path.splitext(file.filename)[1]
+            # Use name if available, otherwise use badge_id
+            badge_name = name if name else f"badge_{badge_id}"
+            filename = secure_filename(f"badge_{badge_name.replace(' ', '_')}_{int(time.time())}{ext}")
+            
+            # Create badges folder if it doesn't exist
+            badges_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'badges')
+            os.makedirs(badges_folder, exist_ok=True)
+            
+            save_path = os.path.join(badges_folder, filename)
+            file.save(save_path)
+            icon_url = f"/uploads/badges/{filename}"
+            print(f"✅ Badge icon updated: {icon_url}")
+        
+        conn = get_db_connection()
+        if not conn: return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        update_fields = []
+        update_values = []
+        
+        if name:
+            update_fields.append("name = ?")
+            update_values.append(name)
+        if description is not None:
+            update_fields.append("description = ?")
+            update_values.append(description)
+        if icon_url is not None:
+            update_fields.append("icon_url = ?")
+            update_values.append(icon_url)
+        if xp_threshold is not None:
+            update_fields.append("xp_threshold = ?")
+            update_values.append(xp_threshold)
+        if color:
+            update_fields.append("color = ?")
+            update_values.append(color)
+        if is_active is not None:
+            update_fields.append("is_active = ?")
+            update_values.append(is_active)
+        
+        if not update_fields:
+            if conn: conn.close()
+            return jsonify({"error": "No fields to update"}), 400
+        
+        update_values.append(badge_id)
+        cursor.execute(
+            f"UPDATE badges SET {', '.join(update_fields)} WHERE id = ?",
+            update_values
+        )
+        if cursor.rowcount == 0:
+            if conn: conn.close()
+            return jsonify({"error": "Badge not found"}), 404
+        conn.commit()
+        conn.close()
+        shared_cache.invalidate('badges')
+        print(f"✅ Badge updated: ID {badge_id}")
+        return jsonify({"message": "Badge updated successfully"}), 200
+        
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+            conn.close()
+        print(f"❌ Database error in update_badge: {str(e)}")
+        if 'UNIQUE constraint failed' in str(e):
+            return jsonify({"error": "Badge name already exists"}), 409
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    except Exception as e:
+        if conn:
+            conn.rollback()
+            conn.close()
+        print(f"❌ Error in update_badge: {str(e)}")
+        print(f"   Name: {name}, Description: {description}, XP: {xp_threshold}, Color: {color}, Is Active: {is_active}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@bp.route('/api/admin/badges/<int:badge_id>', methods=['DELETE'])
+@admin_required
+def delete_badge(badge_id):
+    """Delete a badge."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM badges WHERE id = ?", (badge_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Badge not found"}), 404
+        conn.commit()
+        shared_cache.invalidate('badges')
+        return jsonify({"message": "Badge deleted successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- User Management APIs ---
+@bp.route('/api/admin/users', methods=['GET'])
+@admin_required
+@db_route(SNAPSHOT)
+def get_all_users():
+    """Get all users with their stats."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT u.id, u.name, u.email, u.xp, u.avatar_url, u.created_at,
+                   COALESCE(NULLIF(u.role, ''), 'user') as role,
+                   COUNT(lp.lesson_id) as completed_lessons,
+                   COUNT(ub.badge_id) as badges_earned
+            FROM users u
+            LEFT JOIN lesson_progress lp ON u.id = lp.user_id AND lp.is_completed = 1
+            LEFT JOIN user_badges ub ON u.id = ub.user_id
+            GROUP BY u.id, u.name, u.email, u.xp, u.avatar_url, u.created_at, u.role
+            ORDER BY u.xp DESC
+            """
+        )
+        users = row_dicts(cursor)
+        return ADMIN_USER_LIST.response(users), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/users/<int:user_id>/reset-progress', methods=['PUT'])
+@admin_required
+def reset_user_progress(user_id):
+    """Reset a user's progress (admin only)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Reset user XP to 0
+        cursor.execute("UPDATE users SET xp = 0 WHERE id = ?", (user_id,))
+        
+        # Delete all lesson progress
+        cursor.execute("DELETE FROM lesson_progress WHERE user_id = ?", (user_id,))
+        
+        # Delete all user badges
+        cursor.execute("DELETE FROM user_badges WHERE user_id = ?", (user_id,))
+        
+        # Delete all quiz attempts, their summaries and their archived copies
+        cursor.execute("DELETE FROM user_quiz_attempts WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM quiz_attempt_summaries WHERE user_id = ?", (user_id,))
+        
+        conn.commit()
+        forget_archived_attempts(user_id)
+        shared_cache.invalidate('leaderboard', f'user:{user_id}')
+        db_router.expire()
+        return jsonify({"message": "User progress reset successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/users/<int:user_id>/delete', methods=['DELETE'])
+@admin_required
+def delete_user(user_id):
+    """Delete a user permanently (admin only)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Check if user exists
+        cursor.execute("SELECT name FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        
+        # Delete all user-related data (cascading deletes should handle this, but being explicit)
+        cursor.execute("DELETE FROM user_quiz_attempts WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM quiz_attempt_summaries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM user_badges WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM lesson_progress WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        
+        conn.commit()
+        forget_archived_attempts(user_id)
+        shared_cache.invalidate('leaderboard', f'user:{user_id}')
+        db_router.expire()
+        return jsonify({"message": f"User {user[0]} deleted successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/users/<int:user_id>/promote', methods=['PUT'])
+@admin_required
+def promote_user(user_id):
+    """Promote a user to admin role (admin only)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Check if user exists and get current role
+        cursor.execute("SELECT name, role FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        
+        user_name, current_role = user
+        
+        # Check if already admin
+        if current_role == 'admin':
+            return jsonify({"error": "User is already an admin"}), 400
+        
+        # Promote to admin
+        cursor.execute("UPDATE users SET role = 'admin' WHERE id = ?", (user_id,))
+        
+        conn.commit()
+        shared_cache.invalidate(f'user:{user_id}')
+        db_router.expire()
+        return jsonify({"message": f"User {user_name} promoted to admin successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/users/<int:user_id>/award-badges', methods=['POST'])
+@admin_required
+def award_missing_badges(user_id):
+    """Award missing badges to a user based on their current XP (admin only)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Get user's current XP
+        cursor.execute("SELECT name, xp FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        
+        user_name, user_xp = user
+        
+        # Find badges this user should have earned but doesn't have
+        cursor.execute("""
+            SELECT b.id, b.name, b.xp_threshold 
+            FROM badges b 
+            WHERE b.xp_threshold <= ? 
+            AND b.is_active = 1
+            AND b.id NOT IN (
+                SELECT ub.badge_id FROM user_badges ub WHERE ub.user_id = ?
+            )
+            ORDER BY b.xp_threshold
+        """, (user_xp, user_id))
+        
+        missing_badges = cursor.fetchall()
+        
+        if not missing_badges:
+            return jsonify({"message": f"User {user_name} already has all eligible badges"}), 200
+        
+        # Award the missing badges
+        awarded_badges = []
+        for badge_id, badge_name, xp_threshold in missing_badges:
+            cursor.execute("""
+                INSERT INTO user_badges (user_id, badge_id, earned_at) 
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            """, (user_id, badge_id))
+            awarded_badges.append({"name": badge_name, "xp_threshold": xp_threshold})
+        
+        conn.commit()
+        publish_progress(cursor, user_id, 0, user_xp, awarded_badges)
+        db_router.expire()
+        return jsonify({
+            "message": f"Awarded {len(awarded_badges)} badges to {user_name}",
+            "awarded_badges": awarded_badges
+        }), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/users/<int:user_id>/activity', methods=['GET'])
+@admin_required
+@db_route(SNAPSHOT)
+def get_user_recent_activity(user_id):
+    """Get recent activity for a specific user (admin only)."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+
+        activities = []
+
+        # Registration
+        try:
+            cursor.execute("SELECT name, created_at FROM users WHERE id = ?", (user_id,))
+            row = cursor.fetchone()
+            if row and row['created_at']:
+                activities.append({
+                    "type": "registration",
+                    "title": "Joined the platform",
+                    "details": row['name'],
+                    "timestamp": row['created_at']
+                })
+        except Exception:
+            pass
+
+        # Lesson completions
+        try:
+            cursor.execute(
+                """
+                SELECT l.title as lesson_title, lp.completed_at, lp.xp_earned
+                FROM lesson_progress lp
+                JOIN lessons l ON l.id = lp.lesson_id
+                WHERE lp.user_id = ? AND lp.is_completed = 1 AND lp.completed_at IS NOT NULL
+                ORDER BY lp.completed_at DESC
+                LIMIT 20
+                """,
+                (user_id,)
+            )
+            for r in cursor.fetchall():
+                activities.append({
+                    "type": "completion",
+                    "title": f"Completed lesson",
+                    "details": r['lesson_title'],
+                    "xp": r['xp_earned'] or 0,
+                    "timestamp": r['completed_at']
+                })
+        except Exception:
+            pass
+
+        # Quiz attempts
+        try:
+            cursor.execute(
+                """
+                SELECT l.title as lesson_title, uqa.score, uqa.passed, uqa.attempted_at
+                FROM user_quiz_attempts uqa
+                JOIN lessons l ON l.id = uqa.lesson_id
+                WHERE uqa.user_id = ?
+                ORDER BY uqa.attempted_at DESC
+                LIMIT 20
+                """,
+                (user_id,)
+            )
+            for r in cursor.fetchall():
+                activities.append({
+                    "type": "quiz",
+                    "title": "Quiz attempted",
+                    "details": r['lesson_title'],
+                    "score": r['score'],
+                    "passed": bool(r['passed']),
+                    "timestamp": r['attempted_at']
+                })
+        except Exception:
+            pass
+
+        # Badges earned
+        try:
+            cursor.execute(
+                """
+                SELECT b.name as badge_name, ub.earned_at
+                FROM user_badges ub
+                JOIN badges b ON b.id = ub.badge_id
+                WHERE ub.user_id = ?
+                ORDER BY ub.earned_at DESC
+                LIMIT 20
+                """,
+                (user_id,)
+            )
+            for r in cursor.fetchall():
+                activities.append({
+                    "type": "badge",
+                    "title": "Badge earned",
+                    "details": r['badge_name'],
+                    "timestamp": r['earned_at']
+                })
+        except Exception:
+            pass
+
+        # Sort by timestamp (string in ISO-like format) descending and limit
+        activities.sort(key=lambda a: (a.get('timestamp') or ''), reverse=True)
+        activities = activities[:30]
+
+        return jsonify(activities), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn:
+            conn.close()
+
+# --- Dashboard Statistics APIs ---
+@bp.route('/api/admin/dashboard/stats', methods=['GET'])
+@admin_required
+@db_route(SNAPSHOT)
+def get_dashboard_stats():
+    """Get comprehensive dashboard statistics for admin panel."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Initialize default values
+        stats = {
+            "total_users": 0,
+            "total_lessons": 0,
+            "total_categories": 0,
+            "total_quiz_questions": 0,
+            "total_badges": 0,
+            "completed_lessons": 0,
+            "recent_users": 0,
+            "recent_completions": 0,
+            "total_xp_awarded": 0
+        }
+        
+        # Get total users (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM users")
+            stats["total_users"] = cursor.fetchone()[0]
+        except:
+            stats["total_users"] = 0
+        
+        # Get total lessons (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM lessons")
+            stats["total_lessons"] = cursor.fetchone()[0]
+        except:
+            stats["total_lessons"] = 0
+        
+        # Get total categories (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM categories")
+            stats["total_categories"] = cursor.fetchone()[0]
+        except:
+            stats["total_categories"] = 0
+        
+        # Get total quiz questions (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM quiz_questions")
+            stats["total_quiz_questions"] = cursor.fetchone()[0]
+        except:
+            stats["total_quiz_questions"] = 0
+        
+        # Get total badges (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM badges")
+            stats["total_badges"] = cursor.fetchone()[0]
+        except:
+            stats["total_badges"] = 0
+        
+        # Get completed lessons count (with error handling)
+        try:
+            cursor.execute("SELECT COUNT(*) FROM lesson_progress WHERE is_completed = TRUE")
+            stats["completed_lessons"] = cursor.fetchone()[0]
+        except:
+            stats["completed_lessons"] = 0
+        
+        # Get recent users (last 7 days) (with error handling)
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) FROM users 
+                WHERE created_at >= datetime('now', '-7 days')
+            """)
+            stats["recent_users"] = cursor.fetchone()[0]
+        except:
+            stats["recent_users"] = 0
+        
+        # Get recent lesson completions (last 7 days) (with error handling)
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) FROM lesson_progress 
+                WHERE completed_at >= datetime('now', '-7 days')
+            """)
+            stats["recent_completions"] = cursor.fetchone()[0]
+        except:
+            stats["recent_completions"] = 0
+        
+        # Get total XP awarded (with error handling)
+        try:
+            cursor.execute("SELECT COALESCE(SUM(xp), 0) FROM users")
+            stats["total_xp_awarded"] = cursor.fetchone()[0]
+        except:
+            stats["total_xp_awarded"] = 0
+        
+        return jsonify(stats), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/dashboard/recent-activity', methods=['GET'])
+@admin_required
+@db_route(SNAPSHOT)
+def get_recent_activity():
+    """Get recent activity for dashboard."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        activities = []
+        
+        # Get recent user registrations (with error handling)
+        try:
+            cursor.execute("""
+                SELECT 'registration' as type, name, created_at 
+                FROM users 
+                ORDER BY created_at DESC 
+                LIMIT 5
+            """)
+            recent_registrations = cursor.fetchall()
+            
+            for reg in recent_registrations:
+                activities.append({
+                    "type": "registration",
+                    "text": f"New user registered: {reg[1]}",
+                    "time": reg[2],
+                    "timestamp": reg[2]
+                })
+        except:
+            pass
+        
+        # Get recent lesson completions (with error handling)
+        try:
+            cursor.execute("""
+                SELECT 'completion' as type, u.name, l.title, lp.completed_at
+                FROM lesson_progress lp
+                JOIN users u ON lp.user_id = u.id
+                JOIN lessons l ON lp.lesson_id = l.id
+                WHERE lp.is_completed = TRUE
+                ORDER BY lp.completed_at DESC 
+                LIMIT 5
+            """)
+            recent_completions = cursor.fetchall()
+            
+            for comp in recent_completions:
+                activities.append({
+                    "type": "completion",
+                    "text": f"Lesson '{comp[2]}' completed by {comp[1]}",
+                    "time": comp[3],
+                    "timestamp": comp[3]
+                })
+        except:
+            pass
+        
+        # Get recent badge earnings (with error handling)
+        try:
+            cursor.execute("""
+                SELECT 'badge' as type, u.name, b.name as badge_name, ub.earned_at
+                FROM user_badges ub
+                JOIN users u ON ub.user_id = u.id
+                JOIN badges b ON ub.badge_id = b.id
+                ORDER BY ub.earned_at DESC 
+                LIMIT 5
+            """)
+            recent_badges = cursor.fetchall()
+            
+            for badge in recent_badges:
+                activities.append({
+                    "type": "badge",
+                    "text": f"Badge '{badge[2]}' earned by {badge[1]}",
+                    "time": badge[3],
+                    "timestamp": badge[3]
+                })
+        except:
+            pass
+        
+        # Sort by timestamp and limit to 10 most recent
+        activities.sort(key=lambda x: x["timestamp"], reverse=True)
+        activities = activities[:10]
+        
+        # Format timestamps to relative time
+        from datetime import datetime
+        now = datetime.now()
+        
+        for activity in activities:
+            if activity["timestamp"]:
+                diff = now - activity["timestamp"]
+                if diff.days > 0:
+                    activity["time"] = f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
+                elif diff.seconds > 3600:
+                    hours = diff.seconds // 3600
+                    activity["time"] = f"{hours} hour{'s' if hours > 1 else ''} ago"
+                elif diff.seconds > 60:
+                    minutes = diff.seconds // 60
+                    activity["time"] = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+                else:
+                    activity["time"] = "Just now"
+        
+        return jsonify(activities), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/dashboard/analytics', methods=['GET'])
+@admin_required
+@db_route(SNAPSHOT)
+def get_dashboard_analytics():
+    """Get analytics data for charts."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        analytics = {
+            "user_activity": [],
+            "completion_stats": {"total": 0, "completed": 0, "in_progress": 0},
+            "category_distribution": []
+        }
+        
+        # Get user activity over last 7 days (with error handling)
+        try:
+            cursor.execute("""
+                SELECT DATE(created_at) as date, COUNT(*) as count
+                FROM users 
+                WHERE created_at >= datetime('now', '-7 days')
+                GROUP BY DATE(created_at)
+                ORDER BY date
+            """)
+            user_activity = cursor.fetchall()
+            analytics["user_activity"] = [{"date": str(row[0]), "count": row[1]} for row in user_activity]
+        except:
+            analytics["user_activity"] = []
+        
+        # Get lesson completion rates (with error handling)
+        try:
+            cursor.execute("""
+                SELECT 
+                    COUNT(*) as total_attempts,
+                    COUNT(CASE WHEN is_completed = TRUE THEN 1 END) as completed,
+                    COUNT(CASE WHEN is_completed = FALSE THEN 1 END) as in_progress
+                FROM lesson_progress
+            """)
+            completion_data = cursor.fetchone()
+            analytics["completion_stats"] = {
+                "total": completion_data[0] or 0,
+                "completed": completion_data[1] or 0,
+                "in_progress": completion_data[2] or 0
+            }
+        except:
+            analytics["completion_stats"] = {"total": 0, "completed": 0, "in_progress": 0}
+        
+        # Get category distribution (with error handling)
+        try:
+            cursor.execute("""
+                SELECT c.name, COUNT(l.id) as lesson_count
+                FROM categories c
+                LEFT JOIN lessons l ON c.id = l.category_id
+                GROUP BY c.id, c.name
+                ORDER BY lesson_count DESC
+            """)
+            category_data = cursor.fetchall()
+            analytics["category_distribution"] = [{"name": row[0], "count": row[1]} for row in category_data]
+        except:
+            analytics["category_distribution"] = []
+        
+        return jsonify(analytics), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- Metrics APIs ---
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint. Requires METRICS_TOKEN as a bearer token when it is set."""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return jsonify({"error": "Invalid metrics token"}), 401
+    return current_app.response_class(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def get_admin_metrics():
+    """Per-route latency, status codes, SQL and Gemini stats for the admin panel."""
+    snapshot = metrics.snapshot()
+    snapshot["idempotency"] = idempotency_store.stats()
+    snapshot["events"] = event_bus.stats()
+    snapshot["llm"] = llm.stats()
+    snapshot["hint_cache"] = hint_cache.stats()
+    snapshot["hint_rules"] = hint_classifier.stats()
+    snapshot["rate_limits"] = limiter.stats()
+    snapshot["shared_cache"] = shared_cache.stats()
+    snapshot["compression"] = compressor.stats()
+    snapshot["db_routing"] = db_router.stats()
+    snapshot["maintenance"] = maintenance.stats()
+    return jsonify(snapshot), 200
+
+
+@bp.route('/api/admin/cache', methods=['GET', 'DELETE'])
+@admin_required
+def cache_report():
+    """Per-region cache policy and hit/miss/eviction counts for this worker (GET), or
+    invalidate regions or tags (DELETE ?region=catalog&region=user:42; all regions if none)."""
+    if request.method == 'DELETE':
+        names = request.args.getlist('region') or sorted(shared_cache.policies)
+        shared_cache.invalidate(*names)
+        return jsonify({"message": "Cache invalidated", "invalidated": names}), 200
+    report = shared_cache.stats()
+    report["hint_cache"] = hint_cache.stats()
+    return jsonify(report), 200
+
+
+@bp.route('/api/admin/sql-profile', methods=['GET', 'DELETE'])
+@admin_required
+def sql_profile_report():
+    """Per-endpoint SQL summary from the profiler (GET), or reset it (DELETE)."""
+    if request.method == 'DELETE':
+        profiler.reset()
+        return jsonify({"message": "SQL profile reset"}), 200
+    report = profiler.report()
+    if request.args.get('write') == '1':
+        report["written_to"] = profiler.write_report()
+    return jsonify(report), 200
+
+
+@bp.route('/api/admin/migrations', methods=['GET'])
+@admin_required
+def get_migration_status():
+    """Applied/pending schema migrations with their before/after query plans."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        return jsonify(migration_status(conn)), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/maintenance', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def get_maintenance_runs():
+    """Scheduler state and the latest maintenance runs with their task timings and plan changes."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        try:
+            runs = recent_runs(conn, limit)
+        except sqlite3.OperationalError:
+            runs = []  # migration 0006 not applied yet
+        return jsonify({"scheduler": maintenance.stats(), "tasks": list(MAINTENANCE_TASKS), "runs": runs}), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/maintenance/run', methods=['POST'])
+@admin_required
+def run_maintenance_now():
+    """Start a maintenance run in the background ({"tasks": [...]} optional; all configured tasks if none).
+    {"convert_auto_vacuum": true} lets this run VACUUM an auto_vacuum=NONE database into INCREMENTAL."""
+    data = request.get_json(silent=True) or {}
+    try:
+        started = maintenance.run_now(data.get('tasks'), data.get('convert_auto_vacuum'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not started:
+        return jsonify({"error": "A maintenance run is already in progress"}), 409
+    return jsonify({"message": "Maintenance started", "status_url": "/api/admin/maintenance"}), 202
+
+
+# --- Database Setup Route ---
+@bp.route('/setup-database')
+def setup_database_route():
+    """Route to setup database tables and sample data."""
+    if setup_database():
+        return jsonify({"message": "Database setup completed successfully!", "status": "success"})
+    else:
+        return jsonify({"message": "Database setup failed!", "status": "error"}), 500
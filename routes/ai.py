@@ -0,0 +1,312 @@
+"""AI routes: Gemini-powered hints, dialogue and lesson suggestions.
+
+Each endpoint plans its model call (see AIRequest) so asgi.py can run the same
+plan asynchronously.
+"""
+import collections
+
+from flask import Blueprint, request, jsonify
+
+from hint_cache import cache as hint_cache
+from hint_rules import classifier as hint_classifier
+from llm import provider_from_env
+from rate_limit import rate_limited
+from core import login_required
+
+bp = Blueprint('ai', __name__)
+
+# --- NEW: Configure the AI model provider (Gemini by default, see llm.py) ---
+llm = provider_from_env()
+
+
+# --- AI model requests ---
+# Each AI endpoint first plans its model call (prompt, default model, fallback payload), so the
+# same plan can run synchronously here or through llm.agenerate in asgi.py.
+AIRequest = collections.namedtuple('AIRequest', 'endpoint model contents fallback finish')
+
+
+def run_ai_request(plan):
+    """Runs a planned model call synchronously; any failure returns the fallback payload."""
+    if not plan.contents:
+        return plan.fallback
+    try:
+        text = llm.generate(plan.endpoint, plan.model, plan.contents)
+        return plan.finish(text) if text else plan.fallback
+    except Exception as e:
+        print(f"❌ AI {plan.endpoint} error: {e}")
+        return plan.fallback
+
+
+def clean_model_text(text):
+    """Strips whitespace and any quotes the model wrapped around its reply."""
+    return text.strip().strip('"').strip("'")
+
+
+# Lightweight AI hint proxy (no API key on frontend)
+@bp.route('/api/hint', methods=['POST'])
+@rate_limited('ai')
+def ai_hint():
+    """Gemini AI-powered hints - IMPORTANT: Auto-triggers when student makes mistakes"""
+    return jsonify(build_hint(request.get_json(silent=True) or {})), 200
+
+
+def build_hint(data):
+    """Builds the /api/hint payload. Runs outside the request context (see batch sync)."""
+    key = hint_cache_key(data)
+    # Common mistakes are answered locally (hint_rules.py); the rest go to the cache, then the model
+    diagnosis = hint_classifier.diagnose(*key)
+    if diagnosis:
+        return {"hint": diagnosis.hint}
+    cached = hint_cache.get(*key) if llm.available else None
+    if cached:
+        return cached
+    plan = plan_hint(data)
+    payload = run_ai_request(plan)
+    if payload is not plan.fallback:
+        hint_cache.put(*key, payload["hint"])
+    return payload
+
+
+def hint_cache_key(data):
+    """(code, topic, challenge, student_name) for hint_rules and hint_cache, with plan_hint's defaults."""
+    return ((data.get('code') or '').strip(), data.get('topic', 'print'),
+            data.get('challenge', 1), data.get('student_name', 'Student'))
+
+
+def plan_hint(data):
+    """Plans the Gemini call behind /api/hint."""
+    code = (data.get('code') or '').strip()
+    student_name = data.get('student_name', 'Student')
+    challenge = data.get('challenge', 1)
+    topic = data.get('topic', 'print')  # NEW: Topic parameter (print, variables, loops, etc.)
+    
+    # Topic-specific default hints
+    topic_hints = {
+        'print': {
+            1: f'Hey {student_name}! Start with print, then add parentheses ( ), and put your text in quotes like "Hi!"',
+            2: f'Remember {student_name}, numbers like 20 don\'t need quotes. Just: print(20)'
+        },
+        'variables': {
+            1: f'Hey {student_name}! Store a number: variable_name = 3 (no quotes for numbers!)',
+            2: f'Remember {student_name}, text needs quotes: variable_name = "text here"',
+            3: f'{student_name}, use print(variable_name) to display what\'s stored!'
+        },
+        'input': {
+            1: f'Hey {student_name}! Use input() to ask: name = input("What is your name? ")',
+            2: f'Remember {student_name}, join text with +: print("Hello " + name)',
+            3: f'{student_name}, ask another question: age = input("How old are you? ")'
+        },
+        'loops': {
+            1: f'Hey {student_name}! Start with: for i in range(5):',
+            2: f'Remember {student_name}, indent your code inside the loop!'
+        }
+    }
+    
+    # Get appropriate default hint
+    if topic in topic_hints and challenge in topic_hints[topic]:
+        default_hint = topic_hints[topic][challenge]
+    else:
+        default_hint = f'Hey {student_name}! Check your syntax and try again!'
+    
+    fallback = {"hint": default_hint}
+    if not llm.available:
+        return AIRequest('hint', None, None, fallback, None)
+    
+    # Build topic-specific context and goals
+    if topic == 'print':
+        if challenge == 1:
+            goal = 'help them type print() with ANY text in quotes, like print("Hi!")'
+            context = f'{student_name} is learning to use print() with strings (text in quotes)'
+        else:
+            goal = 'help them type print() with a number (NO quotes), like print(20)'
+            context = f'{student_name} is learning to use print() with numbers (no quotes)'
+            
+    elif topic == 'variables':
+        if challenge == 1:
+            goal = 'help them store a NUMBER in a variable: variable_name = 3 (NO quotes!)'
+            context = f'{student_name} is learning to STORE NUMBERS in variables using the = operator'
+        elif challenge == 2:
+            goal = 'help them store TEXT in a variable: variable_name = "text" (quotes REQUIRED for text!)'
+            context = f'{student_name} is learning to STORE TEXT in variables using quotes'
+        else:
+            goal = 'help them PRINT a variable using: print(variable_name)'
+            context = f'{student_name} is learning to DISPLAY stored variables using print()'
+    
+    elif topic == 'input':
+        if challenge == 1:
+            goal = 'help them ASK for user input and STORE it: name = input("What is your name? ")'
+            context = f'{student_name} is learning to use input() to ask questions and store answers in variables'
+        elif challenge == 2:
+            goal = 'help them JOIN text with a variable using +: print("Hello " + name)'
+            context = f'{student_name} is learning to concatenate (join) strings with variables using the + operator'
+        else:
+            goal = 'help them ask another question with input(): age = input("How old are you? ")'
+            context = f'{student_name} is practicing input() to collect different information from the user'
+            
+    elif topic == 'loops':
+        if challenge == 1:
+            goal = 'help them write a for loop: for i in range(5):'
+            context = f'{student_name} is learning to create for loops'
+        else:
+            goal = 'help them indent code inside the loop'
+            context = f'{student_name} is learning about loop indentation'
+    else:
+        # Generic
+        goal = 'help them with their Python code'
+        context = f'{student_name} is learning Python'
+    
+    system = f'''You are Donki, a friendly female Python coding assistant for high school students.
+CURRENT TOPIC: {topic.upper()}
+{context}
+
+CRITICAL RULES:
+1. Address the student as "{student_name}" in your hint
+2. Keep hints SHORT (1-2 sentences max)
+3. Be encouraging and friendly with a warm, supportive tone
+4. DON'T give the full answer - guide them step by step
+5. Point out their specific mistake if you can identify it
+6. Stay STRICTLY on topic - ONLY teach about {topic.upper()}, NOT other Python concepts!
+7. If they're learning variables, DON'T talk about print() - focus on assignment (=)
+8. If they're learning print(), focus on print() syntax, NOT variables
+
+Be like a helpful friend, not a teacher!'''
+    
+    prompt = f'''TOPIC: {topic.upper()}
+Student {student_name} typed: "{code or '(nothing yet)'}"
+
+Their CURRENT goal: {goal}
+
+What mistake did they make? Give {student_name} a friendly, specific hint about {topic.upper()} ONLY.'''
+    
+    return AIRequest('hint', 'gemini-2.0-flash-exp', [system, prompt], fallback,
+                     lambda text: {"hint": clean_model_text(text)})
+
+
+# NEW: AI-powered personalized dialogue generator
+@bp.route('/api/dialogue', methods=['POST'])
+@rate_limited('ai')
+def ai_dialogue():
+    """Generate personalized, context-aware dialogue using Gemini AI"""
+    return jsonify(build_dialogue(request.get_json(silent=True) or {})), 200
+
+
+def build_dialogue(data):
+    """Builds the /api/dialogue payload. Runs outside the request context (see batch sync)."""
+    return run_ai_request(plan_dialogue(data))
+
+
+def plan_dialogue(data):
+    """Plans the Gemini call behind /api/dialogue."""
+    student_name = data.get('student_name', 'Student')
+    stage = data.get('stage', 'greeting')  # greeting, string_response, age_question, age_response
+    user_input = data.get('user_input', '')
+    challenge = data.get('challenge', 1)  # 1 for string, 2 for number
+    
+    default_responses = {
+        'greeting': f'Hello {student_name}! How are you?',
+        'string_response': 'I\'m doing well!',
+        'age_question': f'That\'s great {student_name}! How old are you?',
+        'age_response': 'I\'m 20 years old!',
+        'celebration': 'Awesome! You\'ve mastered print()!'
+    }
+    
+    fallback = {"dialogue": default_responses.get(stage, '...'), "should_continue": True}
+    if not llm.available:
+        return AIRequest('dialogue', None, None, fallback, None)
+    
+    # Build context-aware prompts
+    if stage == 'greeting':
+        system_prompt = f"""You are Sam, a friendly character in a Python learning game. 
+The student's name is {student_name}. Alex (another character) just greeted you and asked how you are.
+Respond naturally as Sam in ONE short sentence (max 8 words). Be friendly and conversational.
+Example: "Hello {student_name}! I'm doing great!" or "Hi {student_name}! I'm good, thanks!"
+Keep it natural and vary your response."""
+        prompt = f"Generate Sam's greeting response to {student_name}"
+        
+    elif stage == 'string_response':
+        system_prompt = f"""You are Sam in a Python learning game. {student_name} just helped you speak by typing: print("{user_input}")
+You need to respond naturally to what they made you say. If they said something creative or funny, acknowledge it!
+Respond in ONE short sentence (max 10 words). Be enthusiastic and natural.
+Examples: 
+- If they said "Hi!": "Thanks {student_name}! That worked!"
+- If they said something funny: "Haha! That's creative {student_name}!"
+Stay on topic of learning Python print()."""
+        prompt = f'{student_name} made you say: "{user_input}". Respond naturally as Sam.'
+        
+    elif stage == 'age_question':
+        system_prompt = f"""You are Alex in a Python learning game teaching {student_name} about Python print().
+Sam just responded: "{user_input}"
+Now ask {student_name} about their age in ONE short, friendly sentence (max 10 words).
+Make it natural and conversational. Don't be too formal.
+Examples: 
+- "Nice! {student_name}, how old are you?"
+- "Cool! What's your age {student_name}?"
+- "{student_name}, tell me your age!"
+Vary your response naturally."""
+        prompt = f'Sam said "{user_input}". Now ask {student_name} their age naturally.'
+        
+    elif stage == 'age_response':
+        # Check if user input is a valid number
+        try:
+            age = int(user_input.strip())
+            system_prompt = f"""You are Sam in a Python learning game. {student_name} just taught you to print your age: {age}
+Respond enthusiastically in ONE short sentence (max 10 words).
+Examples:
+- "I'm {age} years old!"
+- "Yes! I'm {age}!"
+- "{age}! That's my age!"
+Be natural and excited."""
+            prompt = f"{student_name} helped you print the number {age}. Respond as Sam saying your age."
+        except:
+            system_prompt = f"""You are Sam. {student_name} typed something but it's not working correctly yet.
+Respond confused in ONE short sentence (max 8 words).
+Examples: "Hmm, that's not quite right..." or "I'm a bit confused..."
+Stay friendly and encouraging."""
+            prompt = f"{student_name} is trying to help. Respond confused but friendly."
+            
+    elif stage == 'celebration':
+        system_prompt = f"""You are Alex celebrating {student_name}'s success in learning Python print().
+They mastered BOTH printing strings (with quotes) and numbers (without quotes).
+Respond enthusiastically in ONE short sentence (max 12 words).
+Examples:
+- "Awesome {student_name}! You're a Python star!"
+- "Fantastic work {student_name}! You've got this!"
+- "Amazing {student_name}! You mastered print()!"
+Be very encouraging and celebratory."""
+        prompt = f"Celebrate {student_name}'s success in mastering Python print()"
+    else:
+        return AIRequest('dialogue', None, None, fallback, None)
+    
+    return AIRequest('dialogue', 'gemini-2.0-flash-exp', [system_prompt, prompt], fallback,
+                     lambda text: {"dialogue": clean_model_text(text), "should_continue": True})
+
+
+@bp.route('/api/ai-suggestion', methods=['POST'])
+@login_required
+@rate_limited('ai')
+def get_ai_suggestion():
+    """Gets a simple learning tip from Gemini based on a lesson title."""
+    data = request.get_json()
+    lesson_title = data.get('title')
+    
+    if not lesson_title:
+        return jsonify({"error": "Missing lesson title"}), 400
+        
+    return jsonify(run_ai_request(plan_ai_suggestion(lesson_title))), 200
+
+
+def plan_ai_suggestion(lesson_title):
+    """Plans the Gemini call behind /api/ai-suggestion."""
+    # Provide a fallback tip if the API fails
+    fallback = {"suggestion": "Great job on finishing the lesson! Make sure to practice what you've learned."}
+    if not llm.available:
+        return AIRequest('ai_suggestion', None, None, fallback, None)
+    prompt = f"""
+        I am a student learning programming on a gamified AR/VR platform called Codedonki.
+        I just finished a lesson called "{lesson_title}".
+        Give me one short, helpful tip (about 1-2 sentences) related to this topic
+        to help me remember it. Start the tip directly, e.g., "Remember that..."
+        or "A great way to practice...". Do not use markdown.
+        """
+    return AIRequest('ai_suggestion', 'gemini-pro', [prompt], fallback,
+                     lambda text: {"suggestion": text})
@@ -0,0 +1,260 @@
+"""Lesson routes: categories, lesson catalog, per-user lesson status and completion.
+"""
+from flask import Blueprint, request, jsonify
+
+from db_router import READ_ONLY, db_route
+from idempotency import idempotent
+from shared_cache import cached, cached_response
+from core import create_slug, get_db_connection, login_required, publish_progress, record_lesson_completion
+from serializers import CATEGORY_LIST, LESSON_LIST, row_dicts
+
+bp = Blueprint('lessons', __name__)
+
+
+def current_user_tags():
+    """Per-user entries are dropped by invalidate('user:<id>') and by any catalog change."""
+    return (f"user:{request.current_user['user_id']}", 'catalog')
+
+
+@bp.route('/api/categories', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('catalog', key=lambda: 'categories.json')
+def get_categories():
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, description, color, icon, slug, meta_description, created_at FROM categories ORDER BY name")
+        categories = row_dicts(cursor)
+        return CATEGORY_LIST.response(categories), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/lessons', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('catalog', key=lambda: 'lessons.json')
+def get_lessons():
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.id, l.title, l.description, COALESCE(NULLIF(c.name, ''), 'General') as category, l.category_id,
+                   l.xp_min, l.xp_max, l.ar_model_url, l.order_in_category, l.pass_threshold, l.slug
+            FROM lessons l
+            LEFT JOIN categories c ON l.category_id = c.id
+            ORDER BY l.category_id, l.order_in_category
+            """
+        )
+        lessons_list = row_dicts(cursor)
+        for lesson in lessons_list:
+            if not lesson['slug']:
+                lesson['slug'] = create_slug(lesson['title'])
+        return LESSON_LIST.response(lessons_list), 200
+    except Exception as e:
+        print(f"❌ ERROR in get_lessons: {e}") 
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- Your New Endpoints (ID and Slug) ---
+@cached('catalog', key=lambda field, value: f"lesson:{field}:{value}")
+def get_lesson_by_field(field, value):
+    """Helper function to fetch a lesson by ID or Slug."""
+    sql_query = """
+        SELECT title, description, ar_model_url, xp_min, xp_max, id, slug
+        FROM lessons WHERE 
+    """
+    if field == 'id':
+        sql_query += "id = ?"
+    elif field == 'slug':
+        sql_query += "slug = ?"
+    else:
+        return None
+
+    conn = get_db_connection()
+    if not conn: return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql_query, (value,))
+        lesson = cursor.fetchone()
+        if not lesson: return None
+        return {
+            "title": lesson['title'], 
+            "description": lesson['description'],
+            "ar_model_url": lesson['ar_model_url'], 
+            "xp_min": lesson['xp_min'], 
+            "xp_max": lesson['xp_max'],
+            "id": lesson['id'], 
+            "slug": lesson['slug']
+        }
+    except Exception as e:
+        print(f"❌ ERROR in get_lesson_by_field: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/lessons/<int:lesson_id>', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+def get_lesson_by_id_route(lesson_id):
+    lesson = get_lesson_by_field('id', lesson_id)
+    if not lesson: return jsonify({"error": "Lesson not found"}), 404
+    return jsonify(lesson), 200
+
+
+@bp.route('/api/lessons/slug/<lesson_slug>', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+def get_lesson_by_slug_route(lesson_slug):
+    lesson = get_lesson_by_field('slug', lesson_slug)
+    if not lesson: return jsonify({"error": "Lesson not found"}), 404
+    return jsonify(lesson), 200
+
+
+@bp.route('/api/lessons/complete', methods=['POST'])
+@login_required
+@idempotent
+def complete_lesson():
+    """Marks a lesson as complete for a user and awards XP."""
+    user_id = request.current_user['user_id']
+    data = request.get_json()
+    lesson_id = data.get('lesson_id')
+    xp_to_award = data.get('xp', 20) # Get XP from request, default to 20
+
+    if not lesson_id:
+        return jsonify({"error": "Missing lesson_id"}), 400
+
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    
+    try:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        new_xp = record_lesson_completion(cursor, user_id, lesson_id, xp_to_award)
+        if new_xp is None:
+            conn.rollback()
+            return jsonify({"message": "Lesson already completed"}), 200
+        
+        conn.commit()
+        publish_progress(cursor, user_id, xp_to_award, new_xp)
+        return jsonify({"message": "Lesson completed!", "new_xp": new_xp}), 201
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ ERROR in complete_lesson: {e}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- NEW: Enhanced Admin APIs ---
+
+@bp.route('/api/lessons/unlocked', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+def get_unlocked_lessons():
+    """Get lessons that are unlocked for the current user."""
+    user_id = request.current_user['user_id']
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.id, l.title, l.description, c.name as category_name, l.xp_min, l.xp_max,
+                   l.ar_model_url, l.order_in_category, l.slug,
+                   COALESCE(lp.is_completed, false) as is_completed,
+                   COALESCE(lp.is_unlocked, 
+                       CASE WHEN l.order_in_category = 1 THEN true ELSE false END
+                   ) as is_unlocked
+            FROM lessons l
+            LEFT JOIN categories c ON l.category_id = c.id
+            LEFT JOIN lesson_progress lp ON l.id = lp.lesson_id AND lp.user_id = %s
+            WHERE COALESCE(lp.is_unlocked, 
+                CASE WHEN l.order_in_category = 1 THEN true ELSE false END
+            ) = true
+            ORDER BY c.name, l.order_in_category
+            """, (user_id,)
+        )
+        lessons = []
+        for row in cursor.fetchall():
+            lessons.append({
+                "id": row['id'], 
+                "title": row['title'], 
+                "description": row['description'],
+                "category": row['category_name'], 
+                "xp_min": row['xp_min'], 
+                "xp_max": row['xp_max'],
+                "ar_model_url": row['ar_model_url'], 
+                "order_in_category": row['order_in_category'],
+                "is_completed": row['is_completed'], 
+                "is_unlocked": row['is_unlocked'],
+                "slug": row['slug'] if row['slug'] else create_slug(row['title'])
+            })
+        return jsonify(lessons), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- New: All lessons with per-user status (locked + unlocked) ---
+@bp.route('/api/lessons/all-status', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('user_progress', key=lambda: f"user:{request.current_user['user_id']}", tags=current_user_tags)
+def get_all_lessons_with_status():
+    """Get all lessons for the current user with unlocked/completed flags.
+    Defaults: first lesson in a category is unlocked if no explicit record exists.
+    """
+    user_id = request.current_user['user_id']
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.id, l.title, l.description, c.name as category_name, l.xp_min, l.xp_max,
+                   l.ar_model_url, l.category_id, l.order_in_category, l.slug,
+                   COALESCE(lp.is_completed, false) as is_completed,
+                   COALESCE(lp.is_unlocked,
+                       CASE WHEN l.order_in_category = 1 THEN true ELSE false END
+                   ) as is_unlocked
+            FROM lessons l
+            LEFT JOIN categories c ON l.category_id = c.id
+            LEFT JOIN lesson_progress lp ON l.id = lp.lesson_id AND lp.user_id = ?
+            ORDER BY c.name, l.order_in_category
+            """,
+            (user_id,)
+        )
+        lessons = []
+        for row in cursor.fetchall():
+            lessons.append({
+                "id": row['id'], 
+                "title": row['title'], 
+                "description": row['description'],
+                "category": row['category_name'], 
+                "xp_min": row['xp_min'], 
+                "xp_max": row['xp_max'],
+                "ar_model_url": row['ar_model_url'], 
+                "category_id": row['category_id'],
+                "order_in_category": row['order_in_category'],
+                "is_completed": row['is_completed'], 
+                "is_unlocked": row['is_unlocked'],
+                "slug": row['slug'] if row['slug'] else create_slug(row['title'])
+            })
+        return jsonify(lessons), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
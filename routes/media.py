@@ -0,0 +1,162 @@
+"""Media routes: uploaded file serving, avatars and the admin media library.
+"""
+import os
+import mimetypes
+import datetime
+import time
+
+from flask import Blueprint, request, jsonify, send_from_directory, current_app
+from werkzeug.utils import secure_filename
+
+from shared_cache import cache as shared_cache
+from core import admin_required, get_db_connection, login_required
+
+bp = Blueprint('media', __name__)
+
+@bp.route('/api/profile/avatar', methods=['POST'])
+@login_required
+def upload_avatar():
+    """Uploads a new profile picture for the user."""
+    user_id = request.current_user['user_id']
+    
+    if 'avatar' not in request.files:
+        return jsonify({"error": "No avatar file provided"}), 400
+        
+    file = request.files['avatar']
+    
+    if file.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    if file:
+        # Create a unique filename to avoid conflicts
+        # e.g., "avatar_1_timestamp.jpg"
+        ext = os.path.splitext(file.filename)[1]
+        filename = secure_filename(f"avatar_{user_id}_{int(datetime.datetime.now().timestamp())}{ext}")
+        
+        save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        file.save(save_path)
+        
+        # This is the public URL we will store in the DB
+        avatar_url = f"/uploads/{filename}" 
+
+        conn = get_db_connection()
+        if not conn: return jsonify({"error": "Database connection failed"}), 500
+        try:
+            cursor = conn.cursor()
+            # Update the user's avatar_url in the database
+            cursor.execute(
+                "UPDATE users SET avatar_url = ? WHERE id = ?",
+                (avatar_url, user_id)
+            )
+            conn.commit()
+            shared_cache.invalidate('leaderboard', f'user:{user_id}')
+            return jsonify({"message": "Avatar updated successfully", "avatar_url": avatar_url}), 200
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            if conn: conn.close()
+            
+    return jsonify({"error": "File upload failed"}), 500
+
+
+# --- File Serving Route ---
+@bp.route('/uploads/<path:filename>')
+def serve_uploaded_file(filename):
+    """Serves files from the 'uploads' directory, including subdirectories."""
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+
+
+# --- Media Library APIs ---
+@bp.route('/api/admin/media', methods=['GET'])
+@admin_required
+def list_media_files():
+    """List all files under the uploads directory (recursively)."""
+    root = current_app.config['UPLOAD_FOLDER']
+    media = []
+    try:
+        for dirpath, dirnames, filenames in os.walk(root):
+            for fname in filenames:
+                full_path = os.path.join(dirpath, fname)
+                rel_path = os.path.relpath(full_path, root).replace('\\', '/')
+                url = f"/uploads/{rel_path}"
+                size = os.path.getsize(full_path)
+                mime, _ = mimetypes.guess_type(full_path)
+                media.append({
+                    "name": fname,
+                    "path": rel_path,
+                    "url": url,
+                    "size": size,
+                    "mime": mime or "application/octet-stream"
+                })
+        # Sort by name (could sort by mtime if needed)
+        media.sort(key=lambda x: x['name'].lower())
+        return jsonify(media), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to list media: {str(e)}"}), 500
+
+
+@bp.route('/api/admin/media/upload', methods=['POST'])
+@admin_required
+def upload_media_files():
+    """Upload one or more media files to uploads/ (supports any file type)."""
+    if 'files' not in request.files:
+        return jsonify({"error": "No files part in request"}), 400
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({"error": "No files selected"}), 400
+
+    saved = []
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    timestamp = int(time.time())
+    try:
+        for idx, f in enumerate(files):
+            if not f or not f.filename:
+                continue
+            base, ext = os.path.splitext(f.filename)
+            safe = secure_filename(base) or 'file'
+            filename = f"{safe}_{timestamp}_{idx}{ext}"
+            dest = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+            f.save(dest)
+            rel_path = filename
+            url = f"/uploads/{rel_path}"
+            size = os.path.getsize(dest)
+            mime, _ = mimetypes.guess_type(dest)
+            saved.append({
+                "name": filename,
+                "path": rel_path,
+                "url": url,
+                "size": size,
+                "mime": mime or "application/octet-stream"
+            })
+        return jsonify({"message": "Files uploaded", "files": saved}), 201
+    except Exception as e:
+        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
+
+
+@bp.route('/api/admin/media/delete', methods=['DELETE'])
+@admin_required
+def delete_media_file():
+    """Delete a media file from uploads/ directory."""
+    data = request.get_json()
+    file_path = data.get('path')
+    
+    if not file_path:
+        return jsonify({"error": "File path is required"}), 400
+    
+    try:
+        # Security: ensure the path is within uploads folder
+        full_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_path)
+        normalized = os.path.normpath(full_path)
+        
+        if not normalized.startswith(os.path.normpath(current_app.config['UPLOAD_FOLDER'])):
+            return jsonify({"error": "Invalid file path"}), 400
+        
+        if not os.path.exists(normalized):
+            return jsonify({"error": "File not found"}), 404
+        
+        os.remove(normalized)
+        return jsonify({"message": "File deleted successfully"}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Delete failed: {str(e)}"}), 500
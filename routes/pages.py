@@ -0,0 +1,259 @@
+"""Page routes: the server-rendered HTML pages.
+
+The learner pages (lesson, quiz, archive, profile) inline the API state they open
+with, for the session user, as window.CODEDONKI_BOOTSTRAP, so the first paint needs
+no API round trip. Each entry is the body the API itself would return, read through
+the same shared_cache entries. They also send Link preload headers for their CSS/JS.
+"""
+import json
+
+import jwt
+
+from flask import Blueprint, request, render_template, g, redirect, url_for, session, current_app, make_response
+from markupsafe import Markup
+
+from core import set_user_session_from_token
+from routes import auth, lessons, progress, quiz
+
+bp = Blueprint('pages', __name__)
+
+# Stylesheets and scripts every learner page loads (base.html's, plus api.js)
+BASE_ASSETS = ('css/theme.css', 'css/main.css', 'css/header.css', 'css/footer.css', 'css/leaderboard.css',
+               'css/alerts.css', 'js/header.js', 'js/alerts.js', 'js/api.js')
+# Characters that could end the inline <script>, escaped the way JSON allows
+_SCRIPT_SAFE = str.maketrans({'<': '\\u003c', '>': '\\u003e', '&': '\\u0026', "'": '\\u0027',
+                              '\u2028': '\\u2028', '\u2029': '\\u2029'})
+
+
+# --- Bootstrap State ---
+def api_state(view, **view_args):
+    """JSON body the API view returns the session user, or None unless it is a 200.
+    The session already names the user, so the view's login_required is skipped."""
+    if not g.user or not current_app.config.get("PAGE_BOOTSTRAP", True):
+        return None
+    request.current_user = g.user
+    try:
+        response = current_app.make_response(view.__wrapped__(**view_args))
+    except Exception as e:
+        print(f"❌ Bootstrap {view.__name__} failed: {e}")
+        return None
+    if response.status_code != 200 or not response.is_json:
+        return None
+    return response.get_data(as_text=True)
+
+
+def render_page(template, assets, **state):
+    """Render a learner page with `state` (name -> JSON body, None to let the page fetch it)
+    inlined, and Link preloads for the base assets plus `assets`."""
+    entries = [f'{json.dumps(name)}:{body}' for name, body in state.items() if body is not None]
+    bootstrap = Markup('{' + ','.join(entries).translate(_SCRIPT_SAFE) + '}') if entries else None
+    response = make_response(render_template(template, bootstrap=bootstrap))
+    response.headers['Link'] = ', '.join(
+        f"<{url_for('static', filename=path)}>; rel=preload; as={'style' if path.endswith('.css') else 'script'}"
+        for path in BASE_ASSETS + assets
+    )
+    return response
+
+
+# --- Main Route ---
+@bp.route('/')
+def home_page():
+    return render_template('home.html')
+
+
+@bp.route('/lessons')
+def lessons_page():
+    # Check if category_id is provided in query parameters
+    category_id = request.args.get('category_id')
+    if not category_id:
+        return redirect(url_for('.archive_page'))
+    return render_template('lessons.html')
+
+
+@bp.route('/lesson')
+def lesson_page():
+    """Handle lesson page with either ID or slug parameter."""
+    lesson_id = request.args.get('id')
+    lesson_slug = request.args.get('slug')
+    
+    if not lesson_id and not lesson_slug:
+        return redirect(url_for('.archive_page'))
+    
+    if lesson_id:
+        lesson = api_state(lessons.get_lesson_by_id_route, lesson_id=int(lesson_id)) if lesson_id.isdigit() else None
+    else:
+        lesson = api_state(lessons.get_lesson_by_slug_route, lesson_slug=lesson_slug)
+    return render_page('lesson.html', ('css/lesson.css', 'js/lesson.js'),
+                       profile=api_state(auth.get_profile), lesson=lesson)
+
+
+@bp.route('/quiz')
+def quiz_page():
+    """Handle quiz page."""
+    lesson_id = request.args.get('lesson_id')
+    lesson_title = request.args.get('title')
+    lesson_slug = request.args.get('slug')
+    
+    if not lesson_id:
+        return redirect(url_for('.archive_page'))
+    
+    questions = api_state(quiz.get_quiz_for_user, lesson_id=int(lesson_id)) if lesson_id.isdigit() else None
+    return render_page('quiz.html', ('css/quiz.css', 'js/quiz.js'),
+                       profile=api_state(auth.get_profile), quiz=questions)
+
+
+@bp.route('/leaderboard')
+def leaderboard_page():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    return render_template('leaderboard.html')
+
+
+@bp.route('/games')
+def games_page():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    return render_template('games.html')
+
+
+@bp.route('/profile')
+def profile_page():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    return render_page('profile.html', ('css/profile.css', 'js/profile.js'),
+                       profile=api_state(auth.get_profile), badges=api_state(progress.get_user_badges))
+
+
+@bp.route('/archive')
+def archive_page():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    return render_page('archive.html', ('js/auth.js',), profile=api_state(auth.get_profile),
+                       categories=api_state(lessons.get_categories), lessons=api_state(lessons.get_lessons))
+
+
+@bp.route('/admin-login')
+def admin_login_test():
+    """Test route to log in as admin for testing purposes"""
+    # Create a test token for admin user
+    from datetime import datetime, timedelta
+    admin_token = jwt.encode({
+        'user_id': 1,
+        'role': 'admin',
+        'exp': datetime.utcnow() + timedelta(hours=24)
+    }, current_app.config["JWT_SECRET_KEY"], algorithm="HS256")
+    
+    # Set user session
+    if set_user_session_from_token(admin_token):
+        return redirect(url_for('.admin_panel'))
+    else:
+        return "Failed to create admin session", 500
+
+
+@bp.route('/admin')
+def admin_panel():
+    if not g.user:
+        print("DEBUG: No user in session, redirecting to auth")
+        return redirect(url_for('.auth_page'))
+    
+    print(f"DEBUG: User in session: {g.user}")
+    print(f"DEBUG: User role: {g.user.get('role')}")
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        print("DEBUG: User is not admin, redirecting to home")
+        return redirect(url_for('.home_page'))
+    
+    print("DEBUG: User is admin, rendering admin panel")
+    return render_template('admin/index.html')
+
+
+@bp.route('/admin/lessons')
+def admin_lessons():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    
+    return render_template('admin/lessons.html')
+
+
+@bp.route('/admin/quiz')
+def admin_quiz():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    
+    return render_template('admin/quiz.html')
+
+
+@bp.route('/admin/categories')
+def admin_categories():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    
+    return render_template('admin/categories.html')
+
+
+@bp.route('/admin/badges')
+def admin_badges():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    
+    return render_template('admin/badges.html')
+
+
+@bp.route('/admin/users')
+def admin_users():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    
+    # Check if user is admin
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    
+    return render_template('admin/users.html')
+
+
+@bp.route('/admin/media')
+def admin_media():
+    if not g.user:
+        return redirect(url_for('.auth_page'))
+    if g.user.get('role') != 'admin':
+        return redirect(url_for('.home_page'))
+    return render_template('admin/media.html')
+
+
+# Backward-compat: redirect /archive.html → /archive
+@bp.route('/archive.html')
+def archive_html_redirect():
+    return redirect(url_for('.archive_page'))
+
+
+@bp.route('/auth', methods=['GET', 'POST'])
+def auth_page():
+    if request.method == 'POST':
+        token = request.form.get('token')
+        if token and set_user_session_from_token(token):
+            return redirect(url_for('.archive_page'))
+        return render_template('auth.html'), 401
+    return render_template('auth.html')
+
+
+@bp.route('/logout', methods=['POST'])
+def logout_page():
+    session.pop('user', None)
+    return redirect(url_for('.home_page'))
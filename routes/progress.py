@@ -0,0 +1,316 @@
+"""Progress routes: leaderboard, badges, live event stream and batch sync for the lesson games.
+"""
+import os
+import jwt
+import math
+import threading
+
+from flask import Blueprint, request, jsonify, session, Response, current_app
+
+from db_router import READ_ONLY, db_route
+from events import bus as event_bus, format_sse
+from rate_limit import limiter, request_client
+from shared_cache import cached_response
+from core import get_db_connection, get_jwt_identity, login_required, publish_progress, record_lesson_completion
+from routes.ai import build_dialogue, build_hint
+from serializers import EARNED_BADGE_LIST, row_dicts
+
+bp = Blueprint('progress', __name__)
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+
+@bp.route('/api/leaderboard', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('leaderboard', key=lambda: 'top50.json')
+def get_leaderboard():
+    """Fetches top 50 users by XP."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, xp, avatar_url FROM users ORDER BY xp DESC LIMIT 50")
+        leaderboard = []
+        for row in cursor.fetchall():
+            avatar_url = row['avatar_url']
+            # Use default profile picture if no avatar is set
+            if not avatar_url:
+                avatar_url = "/uploads/profile.png"
+            leaderboard.append({
+                "name": row['name'], 
+                "xp": row['xp'],
+                "avatar_url": avatar_url
+            })
+        return jsonify(leaderboard), 200
+    except Exception as e:
+        print(f"❌ ERROR in get_leaderboard: {e}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/events/stream', methods=['GET'])
+def event_stream():
+    """Server-Sent Events stream of the user's XP, rank and badge changes."""
+    user = session.get('user')
+    user_id = user.get('user_id') if user else None
+    token = request.args.get('token')
+    if token:
+        # EventSource cannot send an Authorization header, so the JWT comes in the query string
+        try:
+            user_id = jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"]).get('user_id')
+        except jwt.InvalidTokenError:
+            return jsonify({"error": "Invalid token"}), 401
+    if not user_id:
+        return jsonify({"error": "Login required"}), 401
+
+    # Each open stream holds one of the worker's threads (see SSE_MAX_WSGI_STREAMS)
+    subscriber = event_bus.subscribe(user_id, holds_thread=True)
+    if subscriber is None:
+        return jsonify({"error": "Too many live connections, fall back to polling"}), 503
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                events = subscriber.get(SSE_HEARTBEAT_SECONDS)
+                if not events:
+                    # Comment line keeps proxies from closing the idle connection and
+                    # lets the server notice clients that went away
+                    yield ": keepalive\n\n"
+                for event in events:
+                    yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+
+# --- Batch Sync API for the AR/3D lesson games ---
+# One POST carries a game's queued operations. DB operations run in order inside a
+# single transaction (each in its own savepoint); hint/dialogue calls fan out concurrently.
+SYNC_MAX_OPERATIONS = int(os.getenv("SYNC_MAX_OPERATIONS", "50"))
+
+_sync_model_pool = None
+_sync_model_pool_lock = threading.Lock()
+
+SYNC_DB_OPERATIONS = ('user_info', 'progress', 'complete')
+
+SYNC_MODEL_OPERATIONS = {'hint': build_hint, 'dialogue': build_dialogue}
+
+SYNC_MODEL_ENDPOINTS = {'hint': 'ai.ai_hint', 'dialogue': 'ai.ai_dialogue'}  # share their rate limit buckets
+
+
+def get_sync_model_pool():
+    """Thread pool for a batch's model calls, created on first use so workers start fast."""
+    global _sync_model_pool
+    with _sync_model_pool_lock:
+        if _sync_model_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _sync_model_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SYNC_MODEL_WORKERS", "4")),
+                                                  thread_name_prefix='sync-ai')
+        return _sync_model_pool
+
+
+def get_sync_user_id():
+    """The batch's user: from the Bearer token if one is sent, otherwise the session."""
+    if request.headers.get('Authorization'):
+        identity, _ = get_jwt_identity()
+        return identity.get('user_id') if identity else None
+    user = session.get('user')
+    return user.get('user_id') if user else None
+
+
+def run_sync_db_operation(cursor, user_id, op):
+    """Runs one DB operation from a sync batch. Returns (status, payload)."""
+    kind = op['op']
+    if kind == 'user_info':
+        cursor.execute("SELECT name, xp FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+        if not row:
+            return 404, {"error": "User not found"}
+        return 200, {"name": row['name'], "xp": row['xp']}
+
+    lesson_id = op.get('lesson_id')
+    if not lesson_id:
+        return 400, {"error": "Missing lesson_id"}
+
+    if kind == 'progress':
+        # Checkpoint only: never changes unlock/completion state of an existing row, and a
+        # new row is only unlocked where the lesson list would show it unlocked anyway
+        cursor.execute(
+            """
+            INSERT INTO lesson_progress (user_id, lesson_id, is_unlocked, last_challenge, updated_at)
+            SELECT ?, id, CASE WHEN order_in_category = 1 THEN 1 ELSE 0 END, ?, CURRENT_TIMESTAMP
+            FROM lessons WHERE id = ?
+            ON CONFLICT(user_id, lesson_id) DO UPDATE SET
+                last_challenge = MAX(COALESCE(last_challenge, 0), excluded.last_challenge),
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING last_challenge, is_completed
+            """, (user_id, int(op.get('challenge', 0)), lesson_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return 404, {"error": "Lesson not found"}
+        return 200, {"lesson_id": lesson_id, "last_challenge": row[0], "is_completed": bool(row[1])}
+
+    # kind == 'complete'
+    new_xp = record_lesson_completion(cursor, user_id, lesson_id, op.get('xp', 20))
+    if new_xp is None:
+        return 200, {"message": "Lesson already completed"}
+    return 201, {"message": "Lesson completed!", "new_xp": new_xp}
+
+
+@bp.route('/api/sync', methods=['POST'])
+def sync_batch():
+    """Executes a batch of game operations and returns their results in request order."""
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > SYNC_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {SYNC_MAX_OPERATIONS} operations per batch"}), 413
+
+    results = [None] * len(operations)
+    db_ops, model_ops = [], []
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind in SYNC_DB_OPERATIONS:
+            db_ops.append((index, op))
+        elif kind in SYNC_MODEL_OPERATIONS:
+            model_ops.append((index, op))
+        else:
+            results[index] = {"op": kind, "status": 400, "data": {"error": f"Unknown operation: {kind}"}}
+
+    # Start model calls first so they overlap with the DB transaction
+    client = request_client()
+    futures = []
+    for index, op in model_ops:
+        wait = limiter.check('ai', SYNC_MODEL_ENDPOINTS[op['op']], client)
+        if wait:
+            results[index] = {"op": op['op'], "status": 429,
+                              "data": {"error": "Too many requests, please slow down", "retry_after": math.ceil(wait)}}
+            continue
+        futures.append((index, op['op'], get_sync_model_pool().submit(SYNC_MODEL_OPERATIONS[op['op']], op)))
+
+    if db_ops:
+        user_id = get_sync_user_id()
+        conn = get_db_connection() if user_id else None
+        if not user_id or not conn:
+            status, error = (401, "Login required") if not user_id else (500, "Database connection failed")
+            for index, op in db_ops:
+                results[index] = {"op": op['op'], "status": status, "data": {"error": error}}
+        else:
+            try:
+                cursor = conn.cursor()
+                if any(op['op'] != 'user_info' for _, op in db_ops):
+                    cursor.execute("BEGIN IMMEDIATE")
+                for index, op in db_ops:
+                    cursor.execute("SAVEPOINT sync_op")
+                    try:
+                        status, payload = run_sync_db_operation(cursor, user_id, op)
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT sync_op")
+                        status, payload = 500, {"error": f"An error occurred: {str(e)}"}
+                    cursor.execute("RELEASE SAVEPOINT sync_op")
+                    results[index] = {"op": op['op'], "status": status, "data": payload}
+                conn.commit()
+                for index, op in db_ops:
+                    if op['op'] == 'complete' and results[index]['status'] == 201:
+                        publish_progress(cursor, user_id, op.get('xp', 20), results[index]['data']['new_xp'])
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ ERROR in sync_batch: {e}")
+                for index, op in db_ops:
+                    results[index] = {"op": op['op'], "status": 500, "data": {"error": f"An error occurred: {str(e)}"}}
+            finally:
+                conn.close()
+
+    for index, kind, future in futures:
+        try:
+            results[index] = {"op": kind, "status": 200, "data": future.result()}
+        except Exception as e:
+            print(f"❌ ERROR in sync_batch {kind}: {e}")
+            results[index] = {"op": kind, "status": 500, "data": {"error": f"An error occurred: {str(e)}"}}
+
+    return jsonify({"results": results}), 200
+
+
+@bp.route('/api/badges', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('badges', key=lambda: 'all' if request.current_user.get('role') == 'admin' else 'active')
+def get_all_badges():
+    """Get all badges (active only for regular users, all for admins)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        # Check if user is admin
+        identity, error_msg = get_jwt_identity()
+        is_admin = False
+        if identity:
+            # Get role directly from JWT identity instead of querying database
+            is_admin = identity.get('role') == 'admin'
+        
+        cursor = conn.cursor()
+        # Show all badges for admins, only active badges for regular users
+        if is_admin:
+            cursor.execute("SELECT id, name, description, icon_url, xp_threshold, color, is_active FROM badges ORDER BY xp_threshold")
+        else:
+            cursor.execute("SELECT id, name, description, icon_url, xp_threshold, color, is_active FROM badges WHERE is_active = 1 ORDER BY xp_threshold")
+        
+        badges = []
+        for row in cursor.fetchall():
+            badge_data = {
+                "id": row['id'], 
+                "name": row['name'], 
+                "description": row['description'],
+                "icon_url": row['icon_url'], 
+                "xp_threshold": row['xp_threshold'], 
+                "color": row['color']
+            }
+            if is_admin:
+                badge_data['is_active'] = bool(row['is_active'])
+            badges.append(badge_data)
+        
+        print(f"✅ Loaded {len(badges)} badges for {'admin' if is_admin else 'user'}")
+        return jsonify(badges), 200
+    except Exception as e:
+        print(f"❌ Error in get_all_badges: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/profile/badges', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('badges', key=lambda: f"user:{request.current_user['user_id']}",
+                 tags=lambda: (f"user:{request.current_user['user_id']}",))
+def get_user_badges():
+    """Get badges earned by the current user."""
+    user_id = request.current_user['user_id']
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT b.id, b.name, b.description, b.icon_url, b.xp_threshold, b.color, ub.earned_at
+            FROM badges b
+            INNER JOIN user_badges ub ON b.id = ub.badge_id
+            WHERE ub.user_id = ? AND b.is_active = 1
+            ORDER BY ub.earned_at DESC
+            """, (user_id,)
+        )
+        badges = row_dicts(cursor)
+        return EARNED_BADGE_LIST.response(badges), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
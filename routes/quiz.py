@@ -0,0 +1,512 @@
+"""Quiz routes: quiz questions (admin) and quiz taking and submission (students).
+"""
+
+from flask import Blueprint, request, jsonify
+
+from db_router import READ_ONLY, db_route
+from idempotency import idempotent
+from shared_cache import cache as shared_cache, cached_response
+from core import admin_required, decode_cursor, encode_cursor, get_db_connection, login_required, publish_progress
+from serializers import QUIZ_PAGE, QUIZ_QUESTION_LIST
+
+bp = Blueprint('quiz', __name__)
+
+# --- Admin quiz bank listing ---
+# Without ?limit= the admin listings return every matching question, as they always have. With
+# ?limit= they return one page and an opaque next_cursor: keyset pagination on the sort key, so
+# a page deep into a 50k-question bank costs the same as the first. ?fields= picks the columns
+# (id is always included), ?sort= orders on the server, ?lesson_id= / ?category_id= filter.
+QUIZ_FIELDS = {
+    'id': 'q.id',
+    'lesson_id': 'q.lesson_id',
+    'lesson_title': 'l.title',
+    'category_id': 'l.category_id',
+    'question_text': 'q.question_text',
+    'option_a': 'q.option_a',
+    'option_b': 'q.option_b',
+    'option_c': 'q.option_c',
+    'option_d': 'q.option_d',
+    'correct_answer': 'q.correct_answer',
+    'explanation': 'q.explanation',
+    'has_explanation': "COALESCE(q.explanation, '') != ''",
+}
+QUIZ_JOINED_FIELDS = ('lesson_title', 'category_id')
+QUIZ_DEFAULT_FIELDS = ('id', 'lesson_id', 'question_text', 'option_a', 'option_b', 'option_c',
+                       'option_d', 'correct_answer', 'explanation')
+QUIZ_LESSON_DEFAULT_FIELDS = tuple(f for f in QUIZ_DEFAULT_FIELDS if f != 'lesson_id')
+# Sort name -> key columns, ending in the unique id; "-name" sorts descending
+QUIZ_SORTS = {
+    'id': ('q.id',),
+    'lesson': ('q.lesson_id', 'q.id'),
+    'question_text': ('q.question_text', 'q.id'),
+}
+QUIZ_MAX_LIMIT = 500
+
+
+def parse_quiz_fields(default_fields):
+    text = request.args.get('fields')
+    if not text:
+        return default_fields
+    fields = ['id'] + [f.strip() for f in text.split(',') if f.strip() and f.strip() != 'id']
+    unknown = [f for f in fields if f not in QUIZ_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(fields))
+
+
+def list_quiz_questions(conn, fields, sort='id', lesson_id=None, category_id=None, limit=None, cursor=None):
+    """(questions, next_cursor_values, total) for the admin quiz listings."""
+    descending = sort.startswith('-')
+    keys = QUIZ_SORTS[sort.lstrip('-')]
+    joined = category_id is not None or any(f in QUIZ_JOINED_FIELDS for f in fields)
+    from_sql = "FROM quiz_questions q" + (" LEFT JOIN lessons l ON l.id = q.lesson_id" if joined else "")
+    where, params = [], []
+    if lesson_id is not None:
+        where.append("q.lesson_id = ?")
+        params.append(lesson_id)
+    if category_id is not None:
+        where.append("l.category_id = ?")
+        params.append(category_id)
+
+    total = None
+    if limit is not None:
+        count_sql = f"SELECT COUNT(*) {from_sql}" + (f" WHERE {' AND '.join(where)}" if where else "")
+        total = conn.execute(count_sql, params).fetchone()[0]
+    if cursor is not None:
+        where.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})")
+        params.extend(cursor)
+
+    columns = [f"{QUIZ_FIELDS[f]} AS {f}" for f in fields] + [f"{key} AS sort_key_{i}" for i, key in enumerate(keys)]
+    sql = f"SELECT {', '.join(columns)} {from_sql}"
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    sql += " ORDER BY " + ', '.join(f"{key}{' DESC' if descending else ''}" for key in keys)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    result = conn.execute(sql, params)
+    result.row_factory = None
+    rows = result.fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = list(rows[-1][len(fields):])
+    # zip() stops at the last field, leaving out the trailing sort key columns
+    questions = [dict(zip(fields, row)) for row in rows]
+    if 'has_explanation' in fields:
+        for question in questions:
+            question['has_explanation'] = bool(question['has_explanation'])
+    return questions, next_cursor, total
+
+
+def quiz_listing_response(default_fields, lesson_id=None):
+    """Parse the listing options from the query string and run list_quiz_questions()."""
+    try:
+        fields = parse_quiz_fields(default_fields)
+        sort = request.args.get('sort', 'lesson' if lesson_id is None else 'id')
+        if sort.lstrip('-') not in QUIZ_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(QUIZ_SORTS)} (prefix - for descending)")
+        if lesson_id is None:
+            lesson_id = request.args.get('lesson_id', type=int)
+        category_id = request.args.get('category_id', type=int)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            limit = limit or 50
+            cursor_sort, *cursor = decode_cursor(cursor)
+            if cursor_sort != sort or len(cursor) != len(QUIZ_SORTS[sort.lstrip('-')]):
+                raise ValueError("cursor does not match this sort")
+        if limit is not None:
+            limit = min(max(limit, 1), QUIZ_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid listing options: {e}"}), 400
+
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        questions, next_cursor, total = list_quiz_questions(conn, fields, sort, lesson_id, category_id,
+                                                            limit, cursor)
+        if limit is None:
+            return QUIZ_QUESTION_LIST.response(questions), 200
+        return QUIZ_PAGE.response({
+            "questions": questions,
+            "total": total,
+            "limit": limit,
+            "sort": sort,
+            "next_cursor": encode_cursor([sort] + next_cursor) if next_cursor else None,
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+# --- Quiz Management APIs ---
+@bp.route('/api/admin/quiz', methods=['GET', 'POST'])
+@admin_required
+def manage_quiz_questions():
+    """List quiz questions (filtered, paginated) or create a new quiz question."""
+    
+    # GET: All quiz questions, or one page of them with ?limit= (see list_quiz_questions)
+    if request.method == 'GET':
+        return quiz_listing_response(QUIZ_DEFAULT_FIELDS)
+    
+    # POST: Create a new quiz question
+    data = request.get_json()
+    lesson_id = data.get('lesson_id')
+    question_text = data.get('question_text')
+    option_a = data.get('option_a')
+    option_b = data.get('option_b')
+    option_c = data.get('option_c')
+    option_d = data.get('option_d')
+    correct_answer = data.get('correct_answer')
+    explanation = data.get('explanation', '')
+    
+    if not all([lesson_id, question_text, option_a, option_b, option_c, option_d, correct_answer]):
+        return jsonify({"error": "Missing required fields"}), 400
+    
+    if correct_answer not in ['A', 'B', 'C', 'D']:
+        return jsonify({"error": "Correct answer must be A, B, C, or D"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO quiz_questions (lesson_id, question_text, option_a, option_b, 
+                                      option_c, option_d, correct_answer, explanation)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (lesson_id, question_text, option_a, option_b, option_c, option_d, correct_answer, explanation)
+        )
+        question_id = cursor.lastrowid
+        conn.commit()
+        shared_cache.invalidate('quiz')
+        return jsonify({"message": "Quiz question created successfully", "question_id": question_id}), 201
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/quiz/<int:question_id>', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def get_quiz_question(question_id):
+    """Get one quiz question with its options, answer and explanation."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        columns = ', '.join(f"{QUIZ_FIELDS[f]} AS {f}" for f in QUIZ_DEFAULT_FIELDS)
+        row = conn.execute(f"SELECT {columns} FROM quiz_questions q WHERE q.id = ?", (question_id,)).fetchone()
+        if not row:
+            return jsonify({"error": "Quiz question not found"}), 404
+        return jsonify({f: row[f] for f in QUIZ_DEFAULT_FIELDS}), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/quiz/<int:question_id>', methods=['PUT'])
+@admin_required
+def update_quiz_question(question_id):
+    """Update an existing quiz question."""
+    data = request.get_json()
+    question_text = data.get('question_text')
+    option_a = data.get('option_a')
+    option_b = data.get('option_b')
+    option_c = data.get('option_c')
+    option_d = data.get('option_d')
+    correct_answer = data.get('correct_answer')
+    explanation = data.get('explanation', '')
+    
+    if correct_answer and correct_answer not in ['A', 'B', 'C', 'D']:
+        return jsonify({"error": "Correct answer must be A, B, C, or D"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        update_fields = []
+        update_values = []
+        
+        if question_text:
+            update_fields.append("question_text = ?")
+            update_values.append(question_text)
+        if option_a:
+            update_fields.append("option_a = ?")
+            update_values.append(option_a)
+        if option_b:
+            update_fields.append("option_b = ?")
+            update_values.append(option_b)
+        if option_c:
+            update_fields.append("option_c = ?")
+            update_values.append(option_c)
+        if option_d:
+            update_fields.append("option_d = ?")
+            update_values.append(option_d)
+        if correct_answer:
+            update_fields.append("correct_answer = ?")
+            update_values.append(correct_answer)
+        if explanation is not None:
+            update_fields.append("explanation = ?")
+            update_values.append(explanation)
+        
+        if not update_fields:
+            return jsonify({"error": "No fields to update"}), 400
+        
+        update_values.append(question_id)
+        cursor.execute(
+            f"UPDATE quiz_questions SET {', '.join(update_fields)} WHERE id = ?",
+            update_values
+        )
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Quiz question not found"}), 404
+        conn.commit()
+        shared_cache.invalidate('quiz')
+        return jsonify({"message": "Quiz question updated successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/quiz/<int:question_id>', methods=['DELETE'])
+@admin_required
+def delete_quiz_question(question_id):
+    """Delete a quiz question."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM quiz_questions WHERE id = ?", (question_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Quiz question not found"}), 404
+        conn.commit()
+        shared_cache.invalidate('quiz')
+        return jsonify({"message": "Quiz question deleted successfully"}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/lessons/<int:lesson_id>/quiz', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def get_lesson_quiz_questions(lesson_id):
+    """Get the quiz questions for a specific lesson (same options as GET /api/admin/quiz)."""
+    return quiz_listing_response(QUIZ_LESSON_DEFAULT_FIELDS, lesson_id=lesson_id)
+
+
+@bp.route('/api/quiz/<int:lesson_id>', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+@cached_response('catalog', key=lambda lesson_id: f"quiz:{lesson_id}.json", tags=lambda lesson_id: ('quiz',))
+def get_quiz_for_user(lesson_id):
+    """Get quiz questions for a user (without correct answers)."""
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, question_text, option_a, option_b, option_c, option_d FROM quiz_questions WHERE lesson_id = ? ORDER BY id",
+            (lesson_id,)
+        )
+        questions = []
+        for row in cursor.fetchall():
+            questions.append({
+                "id": row['id'], 
+                "question_text": row['question_text'], 
+                "option_a": row['option_a'],
+                "option_b": row['option_b'], 
+                "option_c": row['option_c'], 
+                "option_d": row['option_d']
+            })
+        return jsonify(questions), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/quiz/submit', methods=['POST'])
+@login_required
+@idempotent
+def submit_quiz():
+    """Submit quiz answers and calculate score with time-based XP bonus."""
+    user_id = request.current_user['user_id']
+    data = request.get_json()
+    lesson_id = data.get('lesson_id')
+    answers = data.get('answers')  # Should be {question_id: 'A', question_id: 'B', ...}
+    time_taken = data.get('time_taken', 0)  # Time in seconds
+    
+    if not lesson_id or not answers:
+        return jsonify({"error": "Missing lesson_id or answers"}), 400
+    
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        
+        # Get all questions for this lesson with correct answers
+        cursor.execute(
+            "SELECT id, correct_answer FROM quiz_questions WHERE lesson_id = ?",
+            (lesson_id,)
+        )
+        questions = cursor.fetchall()
+        
+        if not questions:
+            return jsonify({"error": "No quiz questions found for this lesson"}), 404
+        
+        # Calculate score
+        correct_count = 0
+        total_questions = len(questions)
+        
+        for question_id, correct_answer in questions:
+            user_answer = answers.get(str(question_id))
+            if user_answer == correct_answer:
+                correct_count += 1
+        
+        score = int((correct_count / total_questions) * 100)
+        
+        # Get lesson details for pass threshold, XP range, category and order
+        cursor.execute(
+            "SELECT pass_threshold, xp_min, xp_max, category_id, order_in_category FROM lessons WHERE id = ?",
+            (lesson_id,)
+        )
+        lesson_details = cursor.fetchone()
+        if not lesson_details:
+            return jsonify({"error": "Lesson not found"}), 404
+        
+        pass_threshold, xp_min, xp_max, category_id, order_in_category = lesson_details
+        passed = score >= pass_threshold
+        
+        # Calculate XP to award with time-based bonus if passed
+        import random
+        base_xp = random.randint(xp_min, xp_max) if passed else 0
+        time_bonus = 0
+        
+        if passed and time_taken > 0:
+            # Time-based bonus calculation
+            # Formula: Faster completion = more bonus XP
+            # Expected time: 30 seconds per question as baseline
+            expected_time = total_questions * 30
+            
+            if time_taken < expected_time:
+                # Fast completion: Award bonus
+                time_saved = expected_time - time_taken
+                # Bonus: up to 50% of base XP for very fast completion
+                max_bonus = base_xp * 0.5
+                time_bonus = int(max_bonus * (time_saved / expected_time))
+                # Cap bonus at max_bonus
+                time_bonus = min(time_bonus, int(max_bonus))
+            elif time_taken > expected_time * 2:
+                # Very slow completion: Apply penalty (reduce XP)
+                time_penalty = int(base_xp * 0.2)  # Max 20% penalty
+                time_bonus = -time_penalty
+        
+        xp_awarded = max(base_xp + time_bonus, 0)  # Ensure XP never goes negative
+        
+        # Grading is done; all writes happen in one short IMMEDIATE transaction so that
+        # concurrent submissions serialize on the write lock instead of interleaving.
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # Store quiz attempt
+        cursor.execute(
+            """
+            INSERT INTO user_quiz_attempts (user_id, lesson_id, quiz_questions, user_answers, score, passed, xp_awarded)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, lesson_id, str(questions), str(answers), score, passed, xp_awarded)
+        )
+        
+        # If passed, update user XP and lesson progress
+        if passed:
+            # Update user XP and read the new total from the same statement
+            cursor.execute(
+                "UPDATE users SET xp = xp + ? WHERE id = ? RETURNING xp",
+                (xp_awarded, user_id)
+            )
+            new_total_xp = cursor.fetchone()['xp']
+            
+            # Upsert keeps the existing row (and its id) instead of deleting and re-inserting it
+            cursor.execute(
+                """
+                INSERT INTO lesson_progress (user_id, lesson_id, is_completed, is_unlocked, xp_earned, completed_at)
+                VALUES (?, ?, 1, 1, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id, lesson_id) DO UPDATE SET
+                    is_completed = 1,
+                    is_unlocked = 1,
+                    xp_earned = excluded.xp_earned,
+                    completed_at = excluded.completed_at
+                """, (user_id, lesson_id, xp_awarded)
+            )
+            
+            # Award every active badge the new total qualifies for; the UNIQUE(user_id, badge_id)
+            # constraint skips ones already held, and RETURNING lists only the new ones
+            cursor.execute(
+                """
+                INSERT INTO user_badges (user_id, badge_id)
+                SELECT ?, b.id FROM badges b
+                WHERE b.xp_threshold <= ? AND b.is_active = 1
+                ON CONFLICT(user_id, badge_id) DO NOTHING
+                RETURNING badge_id
+                """, (user_id, new_total_xp)
+            )
+            new_badge_ids = [row[0] for row in cursor.fetchall()]
+            new_badges = []
+            if new_badge_ids:
+                placeholders = ', '.join('?' for _ in new_badge_ids)
+                cursor.execute(
+                    f"SELECT id, name, description, icon_url FROM badges WHERE id IN ({placeholders}) ORDER BY xp_threshold",
+                    new_badge_ids
+                )
+                new_badges = cursor.fetchall()
+            
+            # Unlock next lesson in same category when passed, without touching its
+            # completion state if the student already finished it
+            cursor.execute(
+                """
+                INSERT INTO lesson_progress (user_id, lesson_id, is_unlocked)
+                SELECT ?, id, 1 FROM lessons
+                WHERE category_id = ? AND order_in_category = ? + 1
+                LIMIT 1
+                ON CONFLICT(user_id, lesson_id) DO UPDATE SET is_unlocked = 1
+                """,
+                (user_id, category_id, order_in_category)
+            )
+
+            conn.commit()
+            new_badges = [{"id": b[0], "name": b[1], "description": b[2], "icon_url": b[3]} for b in new_badges]
+            publish_progress(cursor, user_id, xp_awarded, new_total_xp, new_badges)
+
+            return jsonify({
+                "message": "Quiz submitted successfully",
+                "score": score,
+                "passed": passed,
+                "xp_awarded": xp_awarded,
+                "base_xp": base_xp,
+                "time_bonus": time_bonus,
+                "new_total_xp": new_total_xp,
+                "new_badges": new_badges
+            }), 200
+        else:
+            conn.commit()
+            return jsonify({
+                "message": "Quiz submitted successfully",
+                "score": score,
+                "passed": passed,
+                "xp_awarded": 0,
+                "retry_message": "You need to score at least 70% to pass. You can retry the quiz."
+            }), 200
+            
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
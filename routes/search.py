@@ -0,0 +1,68 @@
+"""Search routes: ranked, highlighted, paginated full-text search (see search.py).
+"""
+from flask import Blueprint, request, jsonify
+
+from db_router import READ_ONLY, db_route
+from core import admin_required, get_db_connection, get_page_args, login_required
+from search import match_query, search_categories, search_lessons, search_quiz_questions
+
+bp = Blueprint('search', __name__)
+
+SEARCH_MAX_PER_PAGE = 50
+
+
+def search_response(query, kind, page, per_page, total, results):
+    return jsonify({"query": query, "type": kind, "page": page, "per_page": per_page,
+                    "total": total, "results": results}), 200
+
+
+@bp.route('/api/search', methods=['GET'])
+@login_required
+@db_route(READ_ONLY)
+def search_catalog():
+    """Search lessons (default) or categories: ?q=&type=lessons|categories&category_id=&page=&per_page="""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type', 'lessons')
+    if kind not in ('lessons', 'categories'):
+        return jsonify({"error": "type must be 'lessons' or 'categories'"}), 400
+    match = match_query(query)
+    if not match:
+        return jsonify({"error": "Missing search query"}), 400
+    page, per_page = get_page_args(max_per_page=SEARCH_MAX_PER_PAGE)
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        if kind == 'categories':
+            total, results = search_categories(conn, match, page, per_page)
+        else:
+            category_id = request.args.get('category_id', type=int)
+            total, results = search_lessons(conn, match, page, per_page, category_id)
+        return search_response(query, kind, page, per_page, total, results)
+    except Exception as e:
+        print(f"❌ ERROR in search_catalog: {e}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
+
+
+@bp.route('/api/admin/quiz/search', methods=['GET'])
+@admin_required
+@db_route(READ_ONLY)
+def search_quiz():
+    """Search quiz questions and options: ?q=&lesson_id=&page=&per_page="""
+    query = request.args.get('q', '').strip()
+    match = match_query(query)
+    if not match:
+        return jsonify({"error": "Missing search query"}), 400
+    page, per_page = get_page_args(max_per_page=SEARCH_MAX_PER_PAGE)
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        lesson_id = request.args.get('lesson_id', type=int)
+        total, results = search_quiz_questions(conn, match, page, per_page, lesson_id)
+        return search_response(query, 'quiz', page, per_page, total, results)
+    except Exception as e:
+        print(f"❌ ERROR in search_quiz: {e}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    finally:
+        if conn: conn.close()
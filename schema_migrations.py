@@ -0,0 +1,135 @@
+"""Versioned schema migrations for codedonki.db.
+
+Migrations live in migrations/ as NNNN_description.sql and are applied in
+order, each in its own transaction, and recorded in the schema_migrations
+table. A migration can declare probe queries with "-- probe: <SQL>" lines;
+their EXPLAIN QUERY PLAN output is stored before and after the migration so
+the effect of new indexes is visible. Migrations that cannot run inside a
+transaction (e.g. changing auto_vacuum) start with "-- no-transaction".
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME = re.compile(r'^(\d{4})_([a-z0-9_]+)\.sql$')
+_PROBE = re.compile(r'^--\s*probe:\s*(.+)$', re.MULTILINE)
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] sorted by version."""
+    found = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    found.sort()
+    return found
+
+
+def explain_plan(conn, sql):
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def probe_plans(conn, probes):
+    return {sql: explain_plan(conn, sql) for sql in probes}
+
+
+def declared_probes(directory=MIGRATIONS_DIR):
+    """Every probe query declared by the migrations, in migration order (see maintenance.py)."""
+    probes = []
+    for _, _, path in discover(directory):
+        with open(path, 'r', encoding='utf-8') as f:
+            probes.extend(p.strip() for p in _PROBE.findall(f.read()))
+    return probes
+
+
+def ensure_migrations_table(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL,
+            plan_before TEXT,
+            plan_after TEXT
+        )
+        """
+    )
+    conn.commit()
+
+
+def applied_versions(conn):
+    ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def apply_migration(conn, version, name, path):
+    """Apply one migration file and record it. Raises on failure after rolling back."""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    probes = [p.strip() for p in _PROBE.findall(script)]
+    transactional = not script.lstrip().startswith('-- no-transaction')
+
+    plan_before = probe_plans(conn, probes)
+    started = time.perf_counter()
+    try:
+        if transactional:
+            conn.executescript(f"BEGIN;\n{script}\nCOMMIT;")
+        else:
+            conn.executescript(script)
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    duration_ms = (time.perf_counter() - started) * 1000
+    plan_after = probe_plans(conn, probes)
+
+    conn.execute(
+        """
+        INSERT INTO schema_migrations (version, name, duration_ms, plan_before, plan_after)
+        VALUES (?, ?, ?, ?, ?)
+        """, (version, name, duration_ms, json.dumps(plan_before), json.dumps(plan_after))
+    )
+    conn.commit()
+    return {"version": version, "name": name, "duration_ms": round(duration_ms, 2),
+            "plan_before": plan_before, "plan_after": plan_after}
+
+
+def run_migrations(conn, directory=MIGRATIONS_DIR):
+    """Apply every pending migration in order. Returns the list of applied migrations."""
+    done = applied_versions(conn)
+    applied = []
+    for version, name, path in discover(directory):
+        if version in done:
+            continue
+        result = apply_migration(conn, version, name, path)
+        print(f"[SUCCESS] Applied migration {version:04d}_{name} ({result['duration_ms']} ms)")
+        applied.append(result)
+    return applied
+
+
+def migration_status(conn, directory=MIGRATIONS_DIR):
+    """Applied and pending migrations, with recorded query plans."""
+    ensure_migrations_table(conn)
+    rows = conn.execute(
+        "SELECT version, name, applied_at, duration_ms, plan_before, plan_after "
+        "FROM schema_migrations ORDER BY version"
+    ).fetchall()
+    applied = [{
+        "version": r[0],
+        "name": r[1],
+        "applied_at": r[2],
+        "duration_ms": r[3],
+        "plan_before": json.loads(r[4]) if r[4] else {},
+        "plan_after": json.loads(r[5]) if r[5] else {},
+    } for r in rows]
+    done = {a["version"] for a in applied}
+    pending = [{"version": v, "name": n} for v, n, _ in discover(directory) if v not in done]
+    return {"applied": applied, "pending": pending}
@@ -0,0 +1,140 @@
+"""Full-text search over lessons, categories and quiz questions (SQLite FTS5).
+
+migrations/0003_full_text_search.sql creates lessons_fts, categories_fts and
+quiz_questions_fts and keeps them in sync with triggers, so nothing here
+writes to the indexes.
+
+Free text is turned into a safe MATCH expression: every word must match, the
+last one also as a prefix (search as you type), and FTS5 syntax in the input
+is never interpreted. Results are ranked with bm25, with titles and question
+text weighted above descriptions and options, and come back one page at a
+time with the total match count. Matches are wrapped in <mark> in the *_html
+fields; everything else in those fields is HTML-escaped, so the UI can insert
+them as markup.
+"""
+import html
+import re
+
+_WORD = re.compile(r'\w+')
+MAX_TERMS = 8
+MAX_QUERY_LENGTH = 200
+
+# highlight()/snippet() markers, replaced with <mark> after the text is escaped
+_OPEN, _CLOSE = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+
+def match_query(text):
+    """FTS5 MATCH expression for user-typed text, or None if it contains no words."""
+    terms = _WORD.findall((text or '')[:MAX_QUERY_LENGTH])[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def marked_html(text):
+    """Escaped HTML for highlight()/snippet() output, with matches in <mark>."""
+    if text is None:
+        return None
+    return html.escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def _page(conn, select_sql, from_sql, params, page, per_page):
+    """(total, rows) for one page of a MATCH query, best match first."""
+    total = conn.execute(f"SELECT COUNT(*) {from_sql}", params).fetchone()[0]
+    rows = conn.execute(f"{select_sql} {from_sql} ORDER BY score LIMIT ? OFFSET ?",
+                        params + [per_page, (page - 1) * per_page]).fetchall() if total else []
+    return total, rows
+
+
+def search_lessons(conn, match, page=1, per_page=20, category_id=None):
+    select_sql = f"""
+        SELECT l.id, l.title, l.slug, l.category_id, c.name AS category_name, l.xp_min, l.xp_max,
+               highlight(lessons_fts, 0, '{_OPEN}', '{_CLOSE}') AS title_marked,
+               snippet(lessons_fts, 1, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_TOKENS}) AS description_marked,
+               bm25(lessons_fts, 10.0, 1.0) AS score
+    """
+    from_sql = """
+        FROM lessons_fts
+        JOIN lessons l ON l.id = lessons_fts.rowid
+        LEFT JOIN categories c ON c.id = l.category_id
+        WHERE lessons_fts MATCH ?
+    """
+    params = [match]
+    if category_id is not None:
+        from_sql += " AND l.category_id = ?"
+        params.append(category_id)
+    total, rows = _page(conn, select_sql, from_sql, params, page, per_page)
+    return total, [{
+        "id": row['id'],
+        "title": row['title'],
+        "slug": row['slug'],
+        "category_id": row['category_id'],
+        "category": row['category_name'] or 'General',
+        "xp_min": row['xp_min'],
+        "xp_max": row['xp_max'],
+        "title_html": marked_html(row['title_marked']),
+        "description_html": marked_html(row['description_marked']),
+    } for row in rows]
+
+
+def search_categories(conn, match, page=1, per_page=20):
+    select_sql = f"""
+        SELECT c.id, c.name, c.slug, c.color, c.icon,
+               highlight(categories_fts, 0, '{_OPEN}', '{_CLOSE}') AS name_marked,
+               snippet(categories_fts, 1, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_TOKENS}) AS description_marked,
+               bm25(categories_fts, 10.0, 1.0) AS score
+    """
+    from_sql = """
+        FROM categories_fts
+        JOIN categories c ON c.id = categories_fts.rowid
+        WHERE categories_fts MATCH ?
+    """
+    total, rows = _page(conn, select_sql, from_sql, [match], page, per_page)
+    return total, [{
+        "id": row['id'],
+        "name": row['name'],
+        "slug": row['slug'],
+        "color": row['color'],
+        "icon": row['icon'],
+        "name_html": marked_html(row['name_marked']),
+        "description_html": marked_html(row['description_marked']),
+    } for row in rows]
+
+
+def search_quiz_questions(conn, match, page=1, per_page=20, lesson_id=None):
+    """Admin search: full question rows (including the answer) plus highlights."""
+    select_sql = f"""
+        SELECT q.id, q.lesson_id, l.title AS lesson_title, q.question_text, q.option_a, q.option_b,
+               q.option_c, q.option_d, q.correct_answer, q.explanation,
+               highlight(quiz_questions_fts, 0, '{_OPEN}', '{_CLOSE}') AS question_marked,
+               snippet(quiz_questions_fts, -1, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_TOKENS}) AS match_marked,
+               bm25(quiz_questions_fts, 5.0, 2.0, 2.0, 2.0, 2.0, 1.0) AS score
+    """
+    from_sql = """
+        FROM quiz_questions_fts
+        JOIN quiz_questions q ON q.id = quiz_questions_fts.rowid
+        LEFT JOIN lessons l ON l.id = q.lesson_id
+        WHERE quiz_questions_fts MATCH ?
+    """
+    params = [match]
+    if lesson_id is not None:
+        from_sql += " AND q.lesson_id = ?"
+        params.append(lesson_id)
+    total, rows = _page(conn, select_sql, from_sql, params, page, per_page)
+    return total, [{
+        "id": row['id'],
+        "lesson_id": row['lesson_id'],
+        "lesson_title": row['lesson_title'],
+        "question_text": row['question_text'],
+        "option_a": row['option_a'],
+        "option_b": row['option_b'],
+        "option_c": row['option_c'],
+        "option_d": row['option_d'],
+        "correct_answer": row['correct_answer'],
+        "explanation": row['explanation'],
+        "question_html": marked_html(row['question_marked']),
+        "match_html": marked_html(row['match_marked']),
+    } for row in rows]
@@ -0,0 +1,125 @@
+"""Typed response models and a fast JSON path for the large listings.
+
+jsonify builds the response with the stdlib json encoder, after the route has
+already built a dict per sqlite3.Row. For listings of thousands of rows both
+steps dominate the request. Here each response shape is a TypedDict, and
+pydantic_core compiles a serializer for it once at import: row_dicts() zips the
+raw row tuples with their column names (no sqlite3.Row objects), and the
+serializer writes JSON bytes straight from those dicts in Rust. pydantic is
+imported, and each serializer compiled, on first use, so worker start-up does
+not pay for listings it never serves (see benchmarks/startup_time.py).
+
+The models describe what the API returns, not what it accepts: nothing here
+validates input. Keys a model does not declare are left out of the output, and
+a value of an unexpected type is encoded as-is rather than raising.
+"""
+from typing import List, Optional
+
+from flask import current_app
+from typing_extensions import TypedDict
+
+
+class CategoryOut(TypedDict):
+    id: int
+    name: str
+    description: Optional[str]
+    color: Optional[str]
+    icon: Optional[str]
+    slug: Optional[str]
+    meta_description: Optional[str]
+    created_at: Optional[str]
+
+
+class LessonOut(TypedDict):
+    id: int
+    title: str
+    description: Optional[str]
+    category: str
+    category_id: Optional[int]
+    xp_min: int
+    xp_max: int
+    ar_model_url: Optional[str]
+    order_in_category: Optional[int]
+    pass_threshold: Optional[int]
+    slug: str
+
+
+class EarnedBadgeOut(TypedDict):
+    id: int
+    name: str
+    description: Optional[str]
+    icon_url: Optional[str]
+    xp_threshold: int
+    color: Optional[str]
+    earned_at: Optional[str]
+
+
+class AdminUserOut(TypedDict):
+    id: int
+    name: str
+    email: str
+    xp: int
+    avatar_url: Optional[str]
+    created_at: Optional[str]
+    role: str
+    completed_lessons: int
+    badges_earned: int
+
+
+class QuizQuestionOut(TypedDict, total=False):
+    """Any subset of these, depending on ?fields= (see routes/quiz.py)."""
+    id: int
+    lesson_id: int
+    lesson_title: Optional[str]
+    category_id: Optional[int]
+    question_text: str
+    option_a: str
+    option_b: str
+    option_c: str
+    option_d: str
+    correct_answer: str
+    explanation: Optional[str]
+    has_explanation: bool
+
+
+class QuizPageOut(TypedDict):
+    questions: List[QuizQuestionOut]
+    total: int
+    limit: int
+    sort: str
+    next_cursor: Optional[str]
+
+
+class JSONSerializer:
+    """Compiled JSON encoder for one response type."""
+
+    def __init__(self, response_type):
+        self.response_type = response_type
+        self._adapter = None
+
+    def dumps(self, value):
+        """JSON bytes for value."""
+        if self._adapter is None:
+            from pydantic import TypeAdapter
+            self._adapter = TypeAdapter(self.response_type)
+        return self._adapter.dump_json(value, warnings=False)
+
+    def response(self, value):
+        """A JSON response, as jsonify(value) would return (pair it with a status as usual)."""
+        return current_app.response_class(self.dumps(value), mimetype='application/json')
+
+
+CATEGORY_LIST = JSONSerializer(List[CategoryOut])
+LESSON_LIST = JSONSerializer(List[LessonOut])
+EARNED_BADGE_LIST = JSONSerializer(List[EarnedBadgeOut])
+ADMIN_USER_LIST = JSONSerializer(List[AdminUserOut])
+QUIZ_QUESTION_LIST = JSONSerializer(List[QuizQuestionOut])
+QUIZ_PAGE = JSONSerializer(QuizPageOut)
+
+
+def row_dicts(cursor):
+    """Remaining rows of an executed cursor as dicts keyed by column name (alias the
+    columns to match the response model), built from the raw row tuples."""
+    cursor.row_factory = None
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
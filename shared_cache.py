@@ -0,0 +1,360 @@
+"""Cache shared by all worker processes on one box, with version-stamped invalidation.
+
+Values live in named regions (catalog, user_progress, leaderboard, badges,
+hint), each with its own TTL and per-process size limit (REGION_DEFAULTS,
+overridden from config). An entry may also carry tags, such as 'user:42' or
+another region's name. Regions and tags share one namespace of version
+numbers: invalidate(name) bumps one, and an entry is only served while the sum
+of its region's and tags' versions is the one it was stored under. A value
+computed from data that changed while it was being loaded is stored under the
+old stamp and never served, so a worker cannot re-cache a stale page after
+another worker's write.
+
+With a path (SHARED_CACHE_PATH) versions and entries live in a small SQLite
+file that every gunicorn worker opens; each worker also keeps the values it
+has read in a local LRU and only pays one primary-key lookup per get() to check
+the region's version. Without a path everything is process-local, which is
+what the single-process dev server needs.
+
+cached() and cached_response() wrap helpers and JSON routes. Hits, misses,
+evictions and expirations are counted per region (see stats()).
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache
+from flask import current_app
+
+from metrics import metrics
+
+# region -> (ttl_seconds, max_entries per process); a TTL of 0 keeps entries until they are
+# invalidated or evicted. app.create_app() overrides these from <REGION>_CACHE_TTL/_SIZE.
+REGION_DEFAULTS = {
+    'catalog': (300, 256),
+    'user_progress': (120, 2048),
+    'leaderboard': (30, 16),
+    'badges': (300, 2048),
+    'hint': (7 * 24 * 3600, 1024),
+}
+# Shared entries of a region are pruned back to its size limit every this many writes
+PRUNE_EVERY = 100
+_COUNTERS = ('hits', 'misses', 'expired', 'stale', 'sets', 'evictions', 'invalidations')
+
+
+class _RegionLRU(LRUCache):
+    """LRUCache that counts the entries it evicts to make room."""
+
+    def __init__(self, maxsize, counters):
+        super().__init__(maxsize=maxsize)
+        self.counters = counters
+
+    def popitem(self):
+        item = super().popitem()
+        self.counters['evictions'] += 1
+        return item
+
+
+class SharedCache:
+    """Region -> key -> JSON-serializable value, shared through SQLite when a path is set."""
+
+    def __init__(self, path=None, local_entries=1024, enabled=True, regions=None):
+        self._lock = threading.Lock()
+        self._thread = threading.local()
+        self.configure(path, local_entries, enabled, regions)
+
+    def configure(self, path=None, local_entries=1024, enabled=True, regions=None):
+        """`regions` maps region -> {"ttl": seconds, "max_entries": n}, over REGION_DEFAULTS.
+        Regions not listed anywhere get no TTL of their own and `local_entries`."""
+        with self._lock:
+            self.path = path
+            self.enabled = enabled
+            self.local_entries = local_entries
+            self.policies = {region: {"ttl": ttl, "max_entries": size}
+                             for region, (ttl, size) in REGION_DEFAULTS.items()}
+            for region, policy in (regions or {}).items():
+                self.policies.setdefault(region, {"ttl": 0, "max_entries": local_entries}).update(policy)
+            self._versions = {}     # region or tag -> version, process-local mode only
+            self._local = {}        # region -> _RegionLRU(key -> (stamp, expires_at, value, tags))
+            self._counters = {}     # region -> {counter: n}, this process only
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_regions (
+                    region TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    region TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    value TEXT NOT NULL,
+                    tags TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (region, key)
+                )
+                """
+            )
+            # Cache files written before entries had tags
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")]
+            if 'tags' not in columns:
+                conn.execute("ALTER TABLE cache_entries ADD COLUMN tags TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self):
+        conn = getattr(self._thread, 'conn', None)
+        # A connection must not cross a fork: reopen in each worker process
+        if conn is None or getattr(self._thread, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._thread.conn = conn
+            self._thread.pid = os.getpid()
+        return conn
+
+    def policy(self, region):
+        return self.policies.get(region) or {"ttl": 0, "max_entries": self.local_entries}
+
+    def _region_counters(self, region):
+        # Caller holds self._lock
+        counters = self._counters.get(region)
+        if counters is None:
+            counters = self._counters[region] = dict.fromkeys(_COUNTERS, 0)
+        return counters
+
+    def _count(self, region, counter, n=1):
+        # Caller holds self._lock
+        self._region_counters(region)[counter] += n
+
+    def version(self, region, tags=()):
+        """Current version stamp of a region and tags; -1 (never served) if the store is unreadable."""
+        names = (region,) + tuple(tags)
+        if not self.path:
+            return sum(self._versions.get(name, 0) for name in names)
+        try:
+            row = self._connect().execute(
+                f"SELECT COALESCE(SUM(version), 0) FROM cache_regions WHERE region IN ({', '.join('?' * len(names))})",
+                names
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"❌ WARNING: Shared cache version read failed for {region}: {e}")
+            return -1
+        return row[0]
+
+    def _local_region(self, region):
+        # Caller holds self._lock
+        local = self._local.get(region)
+        if local is None:
+            local = self._local[region] = _RegionLRU(max(self.policy(region)["max_entries"], 1),
+                                                     self._region_counters(region))
+        return local
+
+    def get(self, region, key, default=None):
+        """Value stored under the current stamp of its region and tags, or `default`."""
+        missing = object()
+        value = self.peek(region, key, missing)
+        hit = value is not missing
+        with self._lock:
+            self._count(region, 'hits' if hit else 'misses')
+        metrics.record_cache(region, hit)
+        return value if hit else default
+
+    def peek(self, region, key, default=None):
+        """get() without recording a cache hit or miss."""
+        if not self.enabled:
+            return default
+        try:
+            now = time.time()
+            with self._lock:
+                entry = self._local_region(region).get(key)
+            if entry is not None and not self._live(region, entry, now):
+                entry = None
+            if entry is None and self.path:
+                row = self._connect().execute(
+                    "SELECT version, expires_at, value, tags FROM cache_entries WHERE region = ? AND key = ?",
+                    (region, key)
+                ).fetchone()
+                if row:
+                    tags = tuple(row[3].split()) if row[3] else ()
+                    entry = (row[0], row[1], None, tags)
+                    if self._live(region, entry, now):
+                        entry = (row[0], row[1], json.loads(row[2]), tags)
+                        with self._lock:
+                            self._local_region(region)[key] = entry
+                    else:
+                        entry = None
+        except sqlite3.Error as e:
+            print(f"❌ WARNING: Shared cache read failed for {region}/{key}: {e}")
+            entry = None
+        return default if entry is None else entry[2]
+
+    def _live(self, region, entry, now):
+        """Whether an entry is unexpired and stored under its current stamp; counts why not."""
+        stamp, expires_at, _value, tags = entry
+        if expires_at <= now:
+            reason = 'expired'
+        else:
+            version = self.version(region, tags)
+            if version >= 0 and stamp == version:
+                return True
+            reason = 'stale'
+        with self._lock:
+            self._count(region, reason)
+        return False
+
+    def set(self, region, key, value, ttl_seconds=None, version=None, tags=()):
+        """Store `value` for ttl_seconds (default: the region's TTL; 0 = until invalidated).
+        Pass the version(region, tags) read before computing it to avoid caching stale data."""
+        if not self.enabled:
+            return
+        try:
+            tags = tuple(tags)
+            if version is None:
+                version = self.version(region, tags)
+            if version < 0:
+                return
+            if ttl_seconds is None:
+                ttl_seconds = self.policy(region)["ttl"]
+            expires_at = time.time() + ttl_seconds if ttl_seconds else float('inf')
+            with self._lock:
+                self._local_region(region)[key] = (version, expires_at, value, tags)
+                self._count(region, 'sets')
+                prune = self._counters[region]['sets'] % PRUNE_EVERY == 0
+            if self.path:
+                conn = self._connect()
+                conn.execute(
+                    """
+                    INSERT INTO cache_entries (region, key, version, expires_at, value, tags) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(region, key) DO UPDATE SET version = excluded.version,
+                        expires_at = excluded.expires_at, value = excluded.value, tags = excluded.tags
+                    WHERE excluded.version >= cache_entries.version
+                    """, (region, key, version, expires_at, json.dumps(value), ' '.join(tags))
+                )
+                if prune:
+                    self._prune(conn, region)
+        except sqlite3.Error as e:
+            print(f"❌ WARNING: Shared cache write failed for {region}/{key}: {e}")
+
+    def _prune(self, conn, region):
+        """Drop a region's expired shared entries and any beyond its size limit."""
+        deleted = conn.execute(
+            """
+            DELETE FROM cache_entries WHERE region = ? AND (expires_at <= ? OR key NOT IN (
+                SELECT key FROM cache_entries WHERE region = ? ORDER BY expires_at DESC LIMIT ?))
+            """, (region, time.time(), region, self.policy(region)["max_entries"])
+        ).rowcount
+        if deleted:
+            with self._lock:
+                self._count(region, 'evictions', deleted)
+
+    def get_or_set(self, region, key, loader, ttl_seconds=None, tags=()):
+        """Cached value, or loader() stored under the stamp seen before it ran (None is not cached)."""
+        missing = object()
+        value = self.get(region, key, missing)
+        if value is not missing:
+            return value
+        version = self.version(region, tags) if self.enabled else 0
+        value = loader()
+        if value is not None:
+            self.set(region, key, value, ttl_seconds, version, tags)
+        return value
+
+    def invalidate(self, *names):
+        """Bump the version of each region or tag in every process, dropping the entries that
+        depend on it. A region's own entries are deleted outright; tagged ones are never served again."""
+        with self._lock:
+            for name in names:
+                if self._local.pop(name, None) is not None or name in self.policies:
+                    self._count(name, 'invalidations')
+                if not self.path:
+                    self._versions[name] = self._versions.get(name, 0) + 1
+        if self.path:
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    """
+                    INSERT INTO cache_regions (region, version) VALUES (?, 1)
+                    ON CONFLICT(region) DO UPDATE SET version = version + 1
+                    """, [(name,) for name in names]
+                )
+                conn.executemany("DELETE FROM cache_entries WHERE region = ?", [(name,) for name in names])
+            except sqlite3.Error as e:
+                print(f"❌ WARNING: Shared cache invalidation failed for {', '.join(names)}: {e}")
+        for name in names:
+            # Label by kind ('user' for 'user:42') to keep the metric's label set small
+            metrics.increment('cache_invalidations_total', name.split(':')[0])
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        if self.path:
+            self._connect().execute("DELETE FROM cache_entries")
+
+    def stats(self):
+        """Policy, entry counts, versions and this process's counters per region."""
+        regions = {}
+        with self._lock:
+            for region in set(self.policies) | set(self._counters):
+                counters = self._counters.get(region) or dict.fromkeys(_COUNTERS, 0)
+                lookups = counters['hits'] + counters['misses']
+                regions[region] = dict(self.policy(region), **counters,
+                                       hit_rate=round(counters['hits'] / lookups, 4) if lookups else 0.0,
+                                       local_entries=len(self._local.get(region) or ()))
+        if self.path:
+            conn = self._connect()
+            for region, version in conn.execute("SELECT region, version FROM cache_regions WHERE region NOT LIKE '%:%'"):
+                regions.setdefault(region, {})["version"] = version
+            for region, count in conn.execute("SELECT region, COUNT(*) FROM cache_entries GROUP BY region"):
+                regions.setdefault(region, {})["shared_entries"] = count
+        else:
+            for region, version in self._versions.items():
+                if ':' not in region:
+                    regions.setdefault(region, {})["version"] = version
+        return {"enabled": self.enabled, "backend": 'sqlite' if self.path else 'memory',
+                "path": self.path, "pid": os.getpid(), "regions": regions}
+
+
+cache = SharedCache()
+
+
+def cached(region, key, tags=None, ttl_seconds=None):
+    """Cache a helper's JSON-serializable return value. key(*args, **kwargs) names the entry
+    within the region and tags(*args, **kwargs) lists the tags it depends on."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            entry_tags = tuple(tags(*args, **kwargs)) if tags else ()
+            return cache.get_or_set(region, key(*args, **kwargs), lambda: func(*args, **kwargs),
+                                    ttl_seconds, entry_tags)
+        return wrapper
+    return decorator
+
+
+def cached_response(region, key, tags=None, ttl_seconds=None):
+    """Cache a JSON route's 200 responses (the body text). key(**view_args) and tags(**view_args)
+    run inside the request, so place this below login_required to use request.current_user."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache_key = key(**kwargs)
+            entry_tags = tuple(tags(**kwargs)) if tags else ()
+            body = cache.get(region, cache_key)
+            if body is not None:
+                return current_app.response_class(body, mimetype='application/json')
+            version = cache.version(region, entry_tags) if cache.enabled else 0
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.is_json:
+                cache.set(region, cache_key, response.get_data(as_text=True), ttl_seconds, version, entry_tags)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,35 @@
+"""Production WSGI entry point for multi-process serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+gunicorn.conf.py runs `python wsgi.py` once in the master before any worker
+starts, so the schema and migrations are applied by a single process. Each
+worker then builds the app on its own (no preload): SQLite connections, thread
+pools and the event bus relay are created per process and never cross a fork.
+
+State that must agree across workers is kept outside the process:
+- sessions are signed cookies, so every worker needs the same FLASK_SECRET_KEY
+- the response caches (catalog, user progress, leaderboard, badges, hints) go through SHARED_CACHE_PATH
+- Idempotency-Key records go through SHARED_CACHE_PATH, so a retry is replayed by any worker
+- live events are fanned out through SHARED_CACHE_PATH, so a stream sees writes from every worker;
+  each stream holds a gthread thread, capped per worker by SSE_MAX_WSGI_STREAMS
+- rate limit buckets go through RATE_LIMIT_DB (RATE_LIMIT_BACKEND=sqlite)
+"""
+import sys
+
+from app import create_app
+from core import setup_database, test_db_connection
+
+
+def create_application():
+    """The Flask app, after checking that the database is reachable."""
+    test_db_connection()
+    return create_app()
+
+
+application = create_application()
+
+
+if __name__ == '__main__':
+    # Prepare the database once before the workers start (see gunicorn.conf.py)
+    sys.exit(0 if setup_database() else 1)